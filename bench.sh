@@ -0,0 +1,3 @@
+#!/usr/bin/env bash
+export PYTHONPATH=$PYTHONPATH:$PWD/src:$PWD/benchmarks
+python3 benchmarks/run.py "$@"
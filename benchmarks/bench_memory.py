@@ -0,0 +1,49 @@
+"""
+Measures the memory used per TextNode, LeafNode and ParentNode instance.
+
+Usage: PYTHONPATH=src python3 benchmarks/bench_memory.py [count]
+
+Object layouts differ between interpreter versions, so the results are
+labelled with the interpreter they were measured on.
+"""
+
+import platform
+import sys
+import tracemalloc
+from collections.abc import Callable
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+
+def bytes_per_instance(factory: Callable[[int], object], count: int) -> float:
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    instances: list[object] = [factory(i) for i in range(count)]
+    after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    list_overhead: int = sys.getsizeof(instances)
+    return (after - before - list_overhead) / len(instances)
+
+
+FACTORIES: dict[str, Callable[[int], object]] = {
+    "TextNode": lambda i: TextNode("text", TextType.TEXT),
+    "LeafNode (text)": lambda i: LeafNode(None, "text"),
+    "LeafNode (link)": lambda i: LeafNode("a", "text", {"href": "/"}),
+    "ParentNode": lambda i: ParentNode("p", [LEAF]),
+}
+LEAF: LeafNode = LeafNode(None, "text")
+
+
+def main() -> None:
+    count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(
+        f"{platform.python_implementation()} {platform.python_version()}, "
+        + f"{count} nodes each"
+    )
+    for name, factory in FACTORIES.items():
+        print(f"{name:<18} {bytes_per_instance(factory, count):8.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
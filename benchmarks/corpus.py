@@ -0,0 +1,106 @@
+"""Deterministic synthetic markdown content for benchmarks."""
+
+import random
+from pathlib import Path
+
+# fmt: off
+WORDS: tuple[str, ...] = (
+    "hobbit", "ring", "shire", "wizard", "elf", "dwarf", "mountain", "river",
+    "forest", "king", "sword", "journey", "shadow", "light", "tower", "song",
+    "road", "fellowship", "ancient", "silver", "stone", "council", "horn", "gate",
+)
+# fmt: on
+
+
+class CorpusConfig:
+    """
+    Shape of the generated site.
+
+    Densities are probabilities: link/image density per sentence, list/code
+    density per block.
+    """
+
+    def __init__(
+        self,
+        pages: int = 200,
+        blocks_per_page: int = 40,
+        sentences_per_paragraph: int = 5,
+        link_density: float = 0.2,
+        image_density: float = 0.05,
+        list_density: float = 0.15,
+        code_density: float = 0.05,
+        seed: int = 42,
+    ) -> None:
+        self.pages: int = pages
+        self.blocks_per_page: int = blocks_per_page
+        self.sentences_per_paragraph: int = sentences_per_paragraph
+        self.link_density: float = link_density
+        self.image_density: float = image_density
+        self.list_density: float = list_density
+        self.code_density: float = code_density
+        self.seed: int = seed
+
+
+def _sentence(rng: random.Random, config: CorpusConfig) -> str:
+    words: list[str] = rng.choices(WORDS, k=rng.randint(6, 14))
+    words[0] = words[0].capitalize()
+    position: int = rng.randrange(len(words))
+    match rng.randrange(4):
+        case 0:
+            words[position] = f"**{words[position]}**"
+        case 1:
+            words[position] = f"_{words[position]}_"
+        case 2:
+            words[position] = f"`{words[position]}`"
+        case _:
+            pass
+    if rng.random() < config.link_density:
+        words.append(f"[{rng.choice(WORDS)}](/page-{rng.randrange(config.pages)})")
+    if rng.random() < config.image_density:
+        words.append(f"![{rng.choice(WORDS)}](/images/img-{rng.randrange(10)}.png)")
+    return " ".join(words) + "."
+
+
+def _block(rng: random.Random, config: CorpusConfig) -> str:
+    roll: float = rng.random()
+    if roll < config.list_density:
+        items: int = rng.randint(2, 8)
+        if rng.random() < 0.5:
+            return "\n".join(f"- {_sentence(rng, config)}" for _ in range(items))
+        return "\n".join(
+            f"{number}. {_sentence(rng, config)}" for number in range(1, items + 1)
+        )
+    roll -= config.list_density
+    if roll < config.code_density:
+        lines: list[str] = [
+            f"    {rng.choice(WORDS)} = {rng.randrange(100)}"
+            for _ in range(rng.randint(2, 10))
+        ]
+        return "```\n" + "\n".join(lines) + "\n```"
+    roll -= config.code_density
+    if roll < 0.05:
+        return f"{'#' * rng.randint(2, 4)} {_sentence(rng, config)[:-1]}"
+    if roll < 0.1:
+        return f"> {_sentence(rng, config)}\n> {_sentence(rng, config)}"
+    return " ".join(
+        _sentence(rng, config) for _ in range(config.sentences_per_paragraph)
+    )
+
+
+def generate_markdown(config: CorpusConfig, index: int) -> str:
+    """Returns the markdown of page 'index'; the same for the same seed and index."""
+    rng: random.Random = random.Random(f"{config.seed}-{index}")
+    blocks: list[str] = [f"# Page {index}"]
+    blocks.extend(_block(rng, config) for _ in range(config.blocks_per_page))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root: Path, config: CorpusConfig) -> list[Path]:
+    """Writes config.pages pages below root, 50 per directory."""
+    paths: list[Path] = []
+    for index in range(config.pages):
+        path: Path = root.joinpath(f"section-{index // 50}", f"page-{index}.md")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _ = path.write_text(generate_markdown(config, index))
+        paths.append(path)
+    return paths
@@ -0,0 +1,241 @@
+"""
+Times the hot paths of the generator on a synthetic corpus.
+
+Results are written as JSON and can be compared against a stored baseline:
+
+    ./bench.sh --output bench.json
+    ./bench.sh --baseline bench.json --threshold 0.15
+
+A baseline recorded with other corpus settings is refused.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any
+
+from corpus import CorpusConfig, generate_corpus, generate_markdown
+
+from block_markdown import block_to_block_type, markdown_to_blocks, markdown_to_html
+from block_memo import BlockMemo
+from gen_content import generate_page, generate_pages_recursive
+from htmlnode import ParentNode
+from inline_markdown import text_to_text_nodes
+from manifest import BuildManifest
+from static_sync import sync_static
+
+TEMPLATE: str = """<!doctype html>
+<html>
+    <head>
+        <title>{{ Title }}</title>
+        <link href="/index.css" rel="stylesheet" />
+    </head>
+    <body>
+        <article>{{ Content }}</article>
+    </body>
+</html>
+"""
+
+
+def time_call(function: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Runs function 'repeat' times and returns timing statistics in seconds."""
+    timings: list[float] = []
+    for _ in range(repeat):
+        start: int = time.perf_counter_ns()
+        _ = function()
+        timings.append((time.perf_counter_ns() - start) / 1e9)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(config: CorpusConfig, repeat: int) -> dict[str, dict[str, float]]:
+    sample_pages: list[str] = [
+        generate_markdown(config, index) for index in range(min(config.pages, 20))
+    ]
+    blocks: list[str] = [
+        block for page in sample_pages for block in markdown_to_blocks(page)
+    ]
+    paragraphs: list[str] = [
+        block.replace("\n", " ")
+        for block in blocks
+        if not block.startswith(("#", "```", "- ", "1. ", ">"))
+    ]
+    trees: list[ParentNode] = [markdown_to_html(page) for page in sample_pages]
+
+    results: dict[str, dict[str, float]] = {}
+
+    def bench(name: str, function: Callable[[], object]) -> None:
+        print(f"Running {name}", file=sys.stderr)
+        results[name] = time_call(function, repeat)
+
+    bench("markdown_to_blocks", lambda: [markdown_to_blocks(p) for p in sample_pages])
+    bench("block_to_block_type", lambda: [block_to_block_type(b) for b in blocks])
+    bench("text_to_text_nodes", lambda: [text_to_text_nodes(p) for p in paragraphs])
+    bench("markdown_to_html", lambda: [markdown_to_html(p) for p in sample_pages])
+    memo: BlockMemo = BlockMemo()
+    _ = [markdown_to_html(p, memo=memo) for p in sample_pages]
+    bench(
+        "markdown_to_html (warm memo)",
+        lambda: [markdown_to_html(p, memo=memo) for p in sample_pages],
+    )
+    bench("ParentNode.to_html", lambda: [tree.to_html() for tree in trees])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root: Path = Path(tmp)
+        content: Path = root.joinpath("content")
+        _ = generate_corpus(content, config)
+        static: Path = root.joinpath("static")
+        static.joinpath("images").mkdir(parents=True)
+        for index in range(10):
+            image: Path = static.joinpath("images", f"img-{index}.png")
+            _ = image.write_bytes(bytes(range(256)) * 64)
+        _ = static.joinpath("index.css").write_text("body { margin: 0; }\n" * 50)
+        template: Path = root.joinpath("template.html")
+        _ = template.write_text(TEMPLATE)
+        page: Path = content.joinpath("section-0", "page-0.md")
+
+        bench(
+            "generate_page",
+            lambda: generate_page(page, template, root.joinpath("page.html"), "/"),
+        )
+
+        build_number: list[int] = [0]
+
+        def build(to_dir: Path, manifest: BuildManifest) -> None:
+            _ = sync_static(static, to_dir, manifest)
+            generate_pages_recursive(content, template, to_dir, "/", manifest)
+            _ = manifest.prune_pages(to_dir)
+            manifest.save()
+
+        def full_build() -> None:
+            build_number[0] += 1
+            to_dir: Path = root.joinpath(f"full-{build_number[0]}")
+            build(to_dir, BuildManifest(to_dir.joinpath(".build", "manifest.json")))
+
+        incremental_dir: Path = root.joinpath("incremental")
+        incremental_manifest: Path = root.joinpath(".build", "manifest.json")
+        build(incremental_dir, BuildManifest(incremental_manifest))
+
+        bench("build_full", full_build)
+        bench(
+            "build_incremental",
+            lambda: build(incremental_dir, BuildManifest(incremental_manifest)),
+        )
+
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Returns the names of benchmarks whose median regressed past the threshold."""
+    regressions: list[str] = []
+    print(f"{'benchmark':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, timing in results.items():
+        if name not in baseline:
+            print(f"{name:<22}{'-':>12}{timing['median']:>12.6f}{'new':>10}")
+            continue
+        before: float = baseline[name]["median"]
+        change: float = timing["median"] / before - 1 if before else 0.0
+        flag: str = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<22}{before:>12.6f}{timing['median']:>12.6f}{change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def corpus_mismatch(corpus: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Returns the corpus settings that differ from those of the baseline."""
+    return [
+        f"{key}={baseline.get(key)!r} (baseline) vs {corpus.get(key)!r}"
+        for key in sorted(corpus.keys() | baseline.keys())
+        if corpus.get(key) != baseline.get(key)
+    ]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the site generator.")
+    _ = parser.add_argument("--pages", type=int, default=200)
+    _ = parser.add_argument("--blocks-per-page", type=int, default=40)
+    _ = parser.add_argument("--sentences-per-paragraph", type=int, default=5)
+    _ = parser.add_argument("--link-density", type=float, default=0.2)
+    _ = parser.add_argument("--image-density", type=float, default=0.05)
+    _ = parser.add_argument("--list-density", type=float, default=0.15)
+    _ = parser.add_argument("--code-density", type=float, default=0.05)
+    _ = parser.add_argument("--seed", type=int, default=42)
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    _ = parser.add_argument("--output", type=Path, help="write results JSON here")
+    _ = parser.add_argument("--baseline", type=Path, help="results JSON to compare")
+    _ = parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed relative slowdown of the median before failing (default 0.1)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args: argparse.Namespace = parse_args()
+    config = CorpusConfig(
+        pages=args.pages,
+        blocks_per_page=args.blocks_per_page,
+        sentences_per_paragraph=args.sentences_per_paragraph,
+        link_density=args.link_density,
+        image_density=args.image_density,
+        list_density=args.list_density,
+        code_density=args.code_density,
+        seed=args.seed,
+    )
+    baseline: dict[str, Any] | None = None
+    if args.baseline is not None:
+        with args.baseline.open("r") as baseline_file:
+            baseline = json.load(baseline_file)
+        # Timings of different corpora are not comparable.
+        mismatch: list[str] = corpus_mismatch(vars(config), baseline.get("corpus", {}))
+        if mismatch:
+            print(f"Baseline was recorded on another corpus: {', '.join(mismatch)}")
+            return 2
+    # The generator reports every file it touches; keep that out of the results.
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results: dict[str, dict[str, float]] = run_benchmarks(config, args.repeat)
+    report: dict[str, Any] = {
+        "python": platform.python_version(),
+        "corpus": vars(config),
+        "results": results,
+    }
+    if args.output is not None:
+        with args.output.open("w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if baseline is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 0
+
+    regressions: list[str] = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"Regressed past {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
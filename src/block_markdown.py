@@ -1,8 +1,10 @@
 import re
+from collections.abc import Iterable, Iterator
 from enum import Enum
+from typing import override
 
-from helpers import rgx_extract_match
-from htmlnode import LeafNode, ParentNode
+from block_memo import BlockMemo
+from htmlnode import HtmlNode, LeafNode, ParentNode
 from inline_markdown import text_to_text_nodes
 from textnode import text_node_to_html_node
 
@@ -16,112 +18,213 @@ class BlockType(Enum):
     ORDERED_LIST = "."
 
 
+HEADING_RGX = re.compile(rf"^{BlockType.HEADING.value}{{1,6}}\s")
+ORDERED_ITEM_RGX = re.compile(rf"^\d+\{BlockType.ORDERED_LIST.value}\s")
+CODE_FENCE: str = 3 * BlockType.CODE.value
+
+
+class Block:
+    """
+    A classified markdown block.
+
+    'content' holds the heading text, code body, joined quote lines or paragraph
+    text, 'items' the text of each list item and 'level' the heading level.
+    """
+
+    def __init__(
+        self,
+        block_type: BlockType,
+        text: str,
+        content: str = "",
+        items: list[str] | None = None,
+        level: int = 0,
+    ) -> None:
+        self.block_type: BlockType = block_type
+        self.text: str = text
+        self.content: str = content
+        self.items: list[str] = items or []
+        self.level: int = level
+
+    @override
+    def __repr__(self) -> str:
+        return f"Block({self.block_type}, {self.text!r})"
+
+
+def scan_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """
+    Groups markdown lines into blocks separated by empty lines and classifies
+    each block as soon as it is complete. Accepts lines with or without their
+    trailing newline, so a file object can be scanned directly.
+    """
+    block_lines: list[str] = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line:
+            block_lines.append(line)
+        elif block_lines:
+            block: Block | None = _lines_to_block(block_lines)
+            if block is not None:
+                yield block
+            block_lines = []
+    if block_lines:
+        block = _lines_to_block(block_lines)
+        if block is not None:
+            yield block
+
+
+def _lines_to_block(lines: list[str]) -> Block | None:
+    start: int = 0
+    end: int = len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    if start == end:
+        return None
+
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return classify_block("\n".join(lines), lines)
+
+
+def parse_block(block: str) -> Block:
+    block = block.strip()
+    return classify_block(block, block.split("\n"))
+
+
+def classify_block(text: str, lines: list[str]) -> Block:
+    """Classifies a stripped block given its text and its lines."""
+    heading = HEADING_RGX.match(text)
+    if heading is not None:
+        marker: str = heading.group().strip()
+        return Block(
+            BlockType.HEADING,
+            text,
+            content=text.replace(marker, "").strip(),
+            level=len(marker),
+        )
+    if text.startswith(CODE_FENCE) and text.endswith(CODE_FENCE):
+        code: str = text.lstrip(BlockType.CODE.value).rstrip(BlockType.CODE.value)
+        return Block(BlockType.CODE, text, content=code.strip("\n"))
+    if all(line.strip().startswith(BlockType.QUOTE.value) for line in lines):
+        quote_lines: Iterator[str] = (
+            line.lstrip(BlockType.QUOTE.value).strip() for line in lines
+        )
+        return Block(
+            BlockType.QUOTE,
+            text,
+            content=" ".join(line for line in quote_lines if line),
+        )
+    unordered_marker: str = BlockType.UNORDERED_LIST.value + " "
+    if all(line.strip().startswith(unordered_marker) for line in lines):
+        return Block(
+            BlockType.UNORDERED_LIST,
+            text,
+            items=[
+                line.strip().lstrip(BlockType.UNORDERED_LIST.value).strip()
+                for line in lines
+            ],
+        )
+    if ORDERED_ITEM_RGX.match(text) is not None and _is_ordered_list(lines):
+        return Block(
+            BlockType.ORDERED_LIST,
+            text,
+            items=[ORDERED_ITEM_RGX.sub("", line.strip()) for line in lines],
+        )
+    return Block(BlockType.PARAGRAPH, text, content=text)
+
+
+def _is_ordered_list(lines: list[str]) -> bool:
+    increment: int = 1
+    for line in lines:
+        if not line.startswith(f"{increment}{BlockType.ORDERED_LIST.value} "):
+            break
+        if increment < len(lines):
+            increment += 1
+    return increment == len(lines)
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
     """Converts a markdown string to a list of TextNodes."""
-    blocks: list[str] = markdown.split("\n\n")
-    return [block.strip() for block in blocks if block.strip()]
+    return [block.text for block in scan_blocks(markdown.split("\n"))]
 
 
 def block_to_block_type(block: str) -> BlockType:
-    block = block.strip()
-    lines = block.split("\n")
-
-    if isinstance(re.match(rf"^{BlockType.HEADING.value}{{1,6}}\s", block), re.Match):
-        return BlockType.HEADING
-    elif block.startswith(3 * BlockType.CODE.value) and block.endswith(
-        3 * BlockType.CODE.value
-    ):
-        return BlockType.CODE
-    elif all([b.strip().startswith(BlockType.QUOTE.value) for b in lines]):
-        return BlockType.QUOTE
-    elif all(
-        [b.strip().startswith(BlockType.UNORDERED_LIST.value + " ") for b in lines]
-    ):
-        return BlockType.UNORDERED_LIST
-    elif isinstance(
-        re.match(rf"^\d+\{BlockType.ORDERED_LIST.value}\s", block), re.Match
-    ):
-        increment: int = 1
-        for line in lines:
-            if not line.startswith(f"{increment}{BlockType.ORDERED_LIST.value} "):
-                break
-            if increment < len(lines):
-                increment += 1
-
-        if increment == len(lines):
-            return BlockType.ORDERED_LIST
-
-    return BlockType.PARAGRAPH
-
-
-def text_to_children(block: str) -> list[LeafNode]:
+    return parse_block(block).block_type
+
+
+def text_to_children(block: str, basepath: str = "/") -> list[LeafNode]:
     text: str = block.replace("\n", " ")
-    return [text_node_to_html_node(text_node) for text_node in text_to_text_nodes(text)]
+    return [
+        text_node_to_html_node(text_node, basepath)
+        for text_node in text_to_text_nodes(text)
+    ]
+
+
+def block_to_html_node(block: str, basepath: str = "/") -> ParentNode:
+    return render_block(parse_block(block), basepath)
 
 
-def block_to_html_node(block: str) -> ParentNode:
-    block_type: BlockType = block_to_block_type(block)
-    match block_type:
+def render_block(block: Block, basepath: str = "/") -> ParentNode:
+    match block.block_type:
         case BlockType.HEADING:
-            heading: str | None = rgx_extract_match(
-                regex=rf"^{BlockType.HEADING.value}{{1,6}}\s", text=block
+            return ParentNode(
+                tag=f"h{block.level}",
+                children=text_to_children(block.content, basepath),
             )
-            if heading is not None:
-                heading = heading.strip()
-                return ParentNode(
-                    tag=f"h{len(heading)}",
-                    children=text_to_children(block.replace(heading, "").strip()),
-                )
         case BlockType.CODE:
-            code_block_delimeter: str = BlockType.CODE.value * 3
-            pure_code_block: str = (
-                block.strip()
-                .lstrip(code_block_delimeter)
-                .rstrip(code_block_delimeter)
-                .strip("\n")
-            )
             return ParentNode(
-                tag="pre", children=[LeafNode(tag="code", value=pure_code_block)]
+                tag="pre", children=[LeafNode(tag="code", value=block.content)]
             )
         case BlockType.QUOTE:
-            quote_lines: list[str] = []
-            for line in block.split("\n"):
-                line = line.lstrip(">").strip()
-                if line:
-                    quote_lines.append(line)
             return ParentNode(
                 tag="blockquote",
-                children=text_to_children(" ".join(quote_lines)),
+                children=text_to_children(block.content, basepath),
             )
         case BlockType.UNORDERED_LIST:
-            unordered_list_items: list[str] = [
-                line.strip().lstrip("-").strip() for line in block.split("\n")
-            ]
             return ParentNode(
                 tag="ul",
                 children=[
-                    ParentNode(tag="li", children=text_to_children(item))
-                    for item in unordered_list_items
+                    ParentNode(tag="li", children=text_to_children(item, basepath))
+                    for item in block.items
                 ],
             )
         case BlockType.ORDERED_LIST:
-            ordered_list_items: list[str] = [
-                re.sub(r"^\d+\.\s", "", line.strip()) for line in block.split("\n")
-            ]
             return ParentNode(
                 tag="ol",
                 children=[
-                    ParentNode(tag="li", children=text_to_children(item))
-                    for item in ordered_list_items
+                    ParentNode(tag="li", children=text_to_children(item, basepath))
+                    for item in block.items
                 ],
             )
         case BlockType.PARAGRAPH:
-            return ParentNode(tag="p", children=text_to_children(block))
+            return ParentNode(
+                tag="p", children=text_to_children(block.content, basepath)
+            )
 
-    return ParentNode(tag="p", children=text_to_children(block))
 
+def render_block_memoized(block: Block, basepath: str, memo: BlockMemo) -> HtmlNode:
+    """Renders a block through the memo, as a raw leaf holding its HTML."""
+    html: str | None = memo.get(block.text, basepath)
+    if html is None:
+        html = render_block(block, basepath).to_html()
+        memo.put(block.text, basepath, html)
+    return LeafNode(tag=None, value=html)
 
-def markdown_to_html(markdown: str) -> ParentNode:
-    blocks: list[str] = markdown_to_blocks(markdown)
-    children: list[ParentNode] = [block_to_html_node(block) for block in blocks]
+
+def blocks_to_html(
+    blocks: Iterable[Block], basepath: str = "/", memo: BlockMemo | None = None
+) -> ParentNode:
+    children: list[HtmlNode]
+    if memo is None:
+        children = [render_block(block, basepath) for block in blocks]
+    else:
+        children = [render_block_memoized(block, basepath, memo) for block in blocks]
     return ParentNode(tag="div", children=children)
+
+
+def markdown_to_html(
+    markdown: str, basepath: str = "/", memo: BlockMemo | None = None
+) -> ParentNode:
+    return blocks_to_html(scan_blocks(markdown.split("\n")), basepath, memo)
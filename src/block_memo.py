@@ -0,0 +1,92 @@
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from constants import PARSER_VERSION
+
+DEFAULT_MEMO_SIZE: int = 4096
+
+# Lookups and new entries of a memo copy, as sent back by a pool worker.
+type MemoUpdate = tuple[int, int, dict[str, str]]
+
+
+class BlockMemo:
+    """
+    Bounded LRU of rendered block HTML, keyed by a hash of the block text.
+
+    A block renders the same wherever it appears, so repeated blocks across
+    pages (and unchanged blocks of an edited page) are rendered once. Entries
+    can be saved to disk and loaded by the next build.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MEMO_SIZE) -> None:
+        if maxsize < 1:
+            raise ValueError("BlockMemo maxsize must be at least 1")
+        self.maxsize: int = maxsize
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self._added: dict[str, str] = {}
+
+    @staticmethod
+    def key(text: str, basepath: str) -> str:
+        return hashlib.sha256(f"{len(basepath)}:{basepath}{text}".encode()).hexdigest()
+
+    def get(self, text: str, basepath: str) -> str | None:
+        key: str = self.key(text, basepath)
+        html: str | None = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, text: str, basepath: str, html: str) -> None:
+        key: str = self.key(text, basepath)
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        self._added[key] = html
+        while len(self.entries) > self.maxsize:
+            _ = self.entries.popitem(last=False)
+
+    def take_update(self) -> MemoUpdate:
+        """Returns and resets the lookups and entries since the last update."""
+        update: MemoUpdate = (self.hits, self.misses, self._added)
+        self.hits, self.misses, self._added = 0, 0, {}
+        return update
+
+    def apply_update(self, update: MemoUpdate) -> None:
+        hits, misses, added = update
+        self.hits += hits
+        self.misses += misses
+        for key, html in added.items():
+            self.entries[key] = html
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            _ = self.entries.popitem(last=False)
+
+    def load(self, path: Path) -> None:
+        try:
+            with path.open("r") as memo_file:
+                data: dict[str, Any] = json.load(memo_file)
+        except OSError, ValueError:
+            return
+        if data.get("version") != PARSER_VERSION:
+            return
+        for key, html in data.get("entries", {}).items():
+            self.entries[key] = html
+        while len(self.entries) > self.maxsize:
+            _ = self.entries.popitem(last=False)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w") as memo_file:
+            json.dump({"version": PARSER_VERSION, "entries": self.entries}, memo_file)
+        _ = tmp_path.replace(path)
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self.entries)} entries"
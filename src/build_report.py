@@ -0,0 +1,64 @@
+import json
+from enum import Enum
+from pathlib import Path
+
+from precompress import PrecompressResult
+from static_sync import SyncResult
+
+
+class Change(Enum):
+    ADDED = "added"
+    CHANGED = "changed"
+    REMOVED = "removed"
+
+
+class BuildReport:
+    """
+    Output files a build added, changed or removed, relative to out_dir.
+
+    Outputs whose content did not change are not written and not listed, so
+    the report is exactly what a deploy needs to upload or delete.
+    """
+
+    def __init__(self, out_dir: Path) -> None:
+        self.out_dir: Path = out_dir
+        self.changes: dict[Change, set[str]] = {change: set() for change in Change}
+
+    def record(self, path: Path, change: Change) -> None:
+        name: str = (
+            path.relative_to(self.out_dir).as_posix()
+            if path.is_relative_to(self.out_dir)
+            else str(path)
+        )
+        for other in Change:
+            self.changes[other].discard(name)
+        self.changes[change].add(name)
+
+    def record_sync(self, result: SyncResult) -> None:
+        added: set[Path] = set(result.added)
+        for dest in result.copied:
+            self.record(dest, Change.ADDED if dest in added else Change.CHANGED)
+        for dest in result.removed:
+            self.record(dest, Change.REMOVED)
+
+    def record_precompress(self, result: PrecompressResult) -> None:
+        added: set[Path] = set(result.added)
+        for sidecar in result.written:
+            self.record(sidecar, Change.ADDED if sidecar in added else Change.CHANGED)
+        for sidecar in result.removed:
+            self.record(sidecar, Change.REMOVED)
+
+    def to_json(self) -> dict[str, list[str]]:
+        return {change.value: sorted(self.changes[change]) for change in Change}
+
+    def write_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w") as report_file:
+            json.dump(self.to_json(), report_file, indent=1)
+        _ = tmp_path.replace(path)
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{len(self.changes[change])} {change.value}" for change in Change
+        )
@@ -8,3 +8,18 @@ DOCS = ROOT_DIR.joinpath("docs").resolve()
 CONTENT = ROOT_DIR.joinpath("content").resolve()
 PUB_INDEX_HTML = PUBLIC.joinpath("index.html").resolve()
 HTML_TEMPLATE = ROOT_DIR.joinpath("template.html").resolve()
+BUILD_DIR = ROOT_DIR.joinpath(".build").resolve()
+BUILD_MANIFEST = BUILD_DIR.joinpath("manifest.json").resolve()
+BUILD_GRAPH = BUILD_DIR.joinpath("graph.json").resolve()
+BUILD_CHANGES = BUILD_DIR.joinpath("changes.json").resolve()
+BUILD_LINKS = BUILD_DIR.joinpath("links.json").resolve()
+
+# Build caches
+# Bump when a change to the markdown parser or renderer changes page bodies.
+PARSER_VERSION = "1"
+PAGE_CACHE = BUILD_DIR.joinpath("pages").resolve()
+BLOCK_MEMO = BUILD_DIR.joinpath("blocks.json").resolve()
+ASSET_CACHE = BUILD_DIR.joinpath("assets").resolve()
+CRITICAL_CSS = BUILD_DIR.joinpath("critical.json").resolve()
+SEARCH_CACHE = BUILD_DIR.joinpath("search.json").resolve()
+PAGE_METADATA = BUILD_DIR.joinpath("metadata.json").resolve()
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import posixpath
+import re
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+from urllib.parse import SplitResult, urlsplit
+
+from minify import minify_css
+
+# Bump when a change to CssInliner.critical changes its output.
+CRITICAL_VERSION: str = "2"
+
+STYLESHEET_RGX = re.compile(r'<link\b[^>]*\brel="stylesheet"[^>]*>')
+ROOT_HREF_RGX = re.compile(r'\bhref="/([^"]*)"')
+ELEMENT_RGX = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)")
+CSS_URL_RGX = re.compile(
+    r"""(url\(\s*["']?|@import\s*["'])([^"')\s]*)""", re.IGNORECASE
+)
+
+# At-rules holding rules rather than declarations; their rules are filtered
+NESTED_AT_RULES: frozenset[str] = frozenset(
+    {"@media", "@supports", "@layer", "@container", "@document"}
+)
+
+
+def rebase_urls(css: str, path: str, basepath: str) -> str:
+    """
+    Rewrites the relative url() and @import URLs of the stylesheet at path,
+    relative to the output directory, to site-root URLs under basepath, so
+    they resolve the same from a page the stylesheet is inlined into.
+    """
+
+    def rebase(match: re.Match[str]) -> str:
+        url: str = match.group(2)
+        parts: SplitResult = urlsplit(url)
+        if not url or url.startswith(("/", "#")) or parts.scheme or parts.netloc:
+            return match.group()
+        # Rooted, so that '..' past the site root stays at the root like in browsers
+        target: str = posixpath.normpath(
+            posixpath.join("/", posixpath.dirname(path), url)
+        )
+        return match.group(1) + basepath + target[1:]
+
+    return CSS_URL_RGX.sub(rebase, css)
+
+
+def page_tags(html: Iterable[str]) -> set[str]:
+    """Returns the lowercase names of the elements in html, given in chunks."""
+    tags: set[str] = set()
+    for chunk in html:
+        tags.update(name.lower() for name in ELEMENT_RGX.findall(chunk))
+    return tags
+
+
+class Rule:
+    """
+    A CSS rule: a prelude with a declaration block, a block of nested rules
+    (@media, ...) or no block (@import, ...).
+    """
+
+    def __init__(self, prelude: str, block: str | list[Rule] | None) -> None:
+        self.prelude: str = prelude
+        self.block: str | list[Rule] | None = block
+
+    def to_css(self) -> str:
+        if self.block is None:
+            return f"{self.prelude};"
+        if isinstance(self.block, str):
+            return f"{self.prelude}{{{self.block}}}"
+        return self.prelude + "{" + "".join(rule.to_css() for rule in self.block) + "}"
+
+
+def _skip_string(css: str, position: int) -> int:
+    """Returns the position after the string starting at position."""
+    quote: str = css[position]
+    position += 1
+    while position < len(css) and css[position] != quote:
+        position += 2 if css[position] == "\\" else 1
+    return position + 1
+
+
+def _block_end(css: str, position: int) -> int:
+    """Returns the position of the '}' closing the block opened at position."""
+    depth: int = 0
+    while position < len(css):
+        char: str = css[position]
+        if char in "\"'":
+            position = _skip_string(css, position)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    return position
+
+
+def _parse(css: str, position: int) -> tuple[list[Rule], int]:
+    """Parses rules up to the '}' closing their block, or the end of css."""
+    rules: list[Rule] = []
+    start: int = position
+    while position < len(css):
+        char: str = css[position]
+        if char in "\"'":
+            position = _skip_string(css, position)
+            continue
+        if char == "}":
+            break
+        if char == ";":
+            if css[start:position].strip():
+                rules.append(Rule(css[start:position].strip(), None))
+        elif char == "{":
+            prelude: str = css[start:position].strip()
+            if re.split(r"[\s(]", prelude, maxsplit=1)[0].lower() in NESTED_AT_RULES:
+                children: list[Rule]
+                children, position = _parse(css, position + 1)
+                rules.append(Rule(prelude, children))
+            else:
+                end: int = _block_end(css, position)
+                rules.append(Rule(prelude, css[position + 1 : end]))
+                position = end
+        else:
+            position += 1
+            continue
+        position += 1
+        start = position
+    return rules, position
+
+
+def parse_rules(css: str) -> list[Rule]:
+    rules, _ = _parse(minify_css(css), 0)
+    return rules
+
+
+def _split_selectors(selectors: str) -> list[str]:
+    """Splits a selector list at the commas outside of parentheses."""
+    parts: list[str] = []
+    depth: int = 0
+    start: int = 0
+    for position, char in enumerate(selectors):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(selectors[start:position])
+            start = position + 1
+    parts.append(selectors[start:])
+    return parts
+
+
+def type_selectors(selector: str) -> set[str]:
+    """Returns the element names a complex selector requires, in lowercase."""
+    previous: str = ""
+    while previous != selector:
+        previous = selector
+        selector = re.sub(r"\([^()]*\)|\[[^\[\]]*\]", "", selector)
+    selector = re.sub(r"::?[\w-]+", "", selector)
+    names: set[str] = set()
+    for compound in re.split(r"[\s>+~]+", selector):
+        match: re.Match[str] | None = re.match(r"[a-zA-Z][\w-]*", compound)
+        if match is not None:
+            names.add(match.group().lower())
+    return names
+
+
+def selector_used(selectors: str, tags: set[str] | frozenset[str]) -> bool:
+    """Whether any selector of the list can match with only the given elements."""
+    return any(
+        type_selectors(selector) <= tags for selector in _split_selectors(selectors)
+    )
+
+
+def used_rules(rules: list[Rule], tags: set[str] | frozenset[str]) -> list[Rule]:
+    """
+    The rules that can apply to a page with the given elements. At-rules
+    without nested rules (@font-face, @keyframes, ...) are always kept.
+    """
+    used: list[Rule] = []
+    for rule in rules:
+        if isinstance(rule.block, list):
+            children: list[Rule] = used_rules(rule.block, tags)
+            if children:
+                used.append(Rule(rule.prelude, children))
+        elif rule.prelude.startswith("@") or selector_used(rule.prelude, tags):
+            used.append(rule)
+    return used
+
+
+class CssInliner:
+    """
+    Critical CSS of the stylesheets in out_dir, for pages with a given set of
+    elements.
+
+    With used_only, the critical CSS of a page is the rules whose selectors
+    can match the elements it contains, otherwise the whole stylesheet.
+    Relative URLs in stylesheets are rewritten to site-root URLs under
+    basepath (see rebase_urls). Results are cached by stylesheet hash and
+    element set, and can be saved to disk and loaded by the next build.
+    """
+
+    def __init__(
+        self, out_dir: Path, used_only: bool = True, basepath: str = "/"
+    ) -> None:
+        self.out_dir: Path = out_dir
+        self.used_only: bool = used_only
+        self.basepath: str = basepath
+        # Stylesheet path, relative to out_dir -> its hash and rules
+        self.sheets: dict[str, tuple[str, list[Rule]]] = {}
+        # Stylesheet hash -> element set -> critical CSS
+        self.subsets: dict[str, dict[str, str]] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def accepts(self, path: str) -> bool:
+        """Whether path is a stylesheet in out_dir, loading it if so."""
+        if path in self.sheets:
+            return True
+        stylesheet: Path = self.out_dir.joinpath(path)
+        if stylesheet.suffix != ".css" or not stylesheet.is_file():
+            return False
+        css: str = rebase_urls(stylesheet.read_text(), path, self.basepath)
+        sheet_hash: str = hashlib.sha256(
+            f"{CRITICAL_VERSION}:{self.used_only}:{css}".encode()
+        ).hexdigest()
+        self.sheets[path] = (sheet_hash, parse_rules(css))
+        _ = self.subsets.setdefault(sheet_hash, {})
+        return True
+
+    @property
+    def digest(self) -> str:
+        """Changes whenever the CSS inlined into a page may change."""
+        hashes: list[str] = sorted(sheet_hash for sheet_hash, _ in self.sheets.values())
+        return hashlib.sha256(json.dumps(hashes).encode()).hexdigest()
+
+    def critical(self, path: str, tags: set[str] | frozenset[str]) -> str:
+        """Returns the CSS of the accepted stylesheet path for a page."""
+        sheet_hash, rules = self.sheets[path]
+        key: str = ",".join(sorted(tags)) if self.used_only else ""
+        subsets: dict[str, str] = self.subsets[sheet_hash]
+        css: str | None = subsets.get(key)
+        if css is not None:
+            self.hits += 1
+            return css
+        self.misses += 1
+        if self.used_only:
+            rules = used_rules(rules, tags)
+        css = "".join(rule.to_css() for rule in rules)
+        subsets[key] = css
+        return css
+
+    def load(self, path: Path) -> None:
+        try:
+            with path.open("r") as cache_file:
+                data: dict[str, Any] = json.load(cache_file)
+        except OSError, ValueError:
+            return
+        for sheet_hash, subsets in data.items():
+            self.subsets.setdefault(sheet_hash, {}).update(subsets)
+
+    def save(self, path: Path) -> None:
+        """Saves the results of the stylesheets used by this build."""
+        used: set[str] = {sheet_hash for sheet_hash, _ in self.sheets.values()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w") as cache_file:
+            json.dump(
+                {key: value for key, value in self.subsets.items() if key in used},
+                cache_file,
+            )
+        _ = tmp_path.replace(path)
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
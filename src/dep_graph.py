@@ -0,0 +1,209 @@
+import json
+from collections.abc import Callable, Iterable
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+GRAPH_VERSION: int = 1
+
+
+class EdgeKind(Enum):
+    SOURCE = "source"
+    TEMPLATE = "template"
+    STATIC = "static"
+    ASSET = "asset"
+    LISTS = "lists"
+
+
+# Edges whose target output must be rebuilt when the dependency changes. Pages
+# embed only their source and the template, and static outputs are copies of
+# their source; asset and listing edges are recorded for inspection and for
+# features that inline their targets.
+REBUILD_KINDS: frozenset[EdgeKind] = frozenset(
+    {EdgeKind.SOURCE, EdgeKind.TEMPLATE, EdgeKind.STATIC}
+)
+
+
+class DependencyGraph:
+    """
+    Maps every build output to the paths it was built from.
+
+    Nodes are file paths: markdown sources, the template, static files and the
+    outputs in out_dir. Input files are fingerprinted when an edge to them is
+    recorded, so the graph can tell which inputs changed since the last build
+    and which outputs they affect.
+    """
+
+    def __init__(self, path: Path, out_dir: Path) -> None:
+        self.path: Path = path
+        self.out_dir: Path = out_dir
+        self.edges: dict[str, dict[str, EdgeKind]] = {}
+        self.fingerprints: dict[str, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("r") as graph_file:
+                data: dict[str, Any] = json.load(graph_file)
+            if data.get("version") != GRAPH_VERSION:
+                return
+            self.edges = {
+                target: {dep: EdgeKind(kind) for dep, kind in deps.items()}
+                for target, deps in data["edges"].items()
+            }
+            self.fingerprints = data["fingerprints"]
+        except OSError, ValueError, KeyError:
+            print(f"Ignoring unreadable dependency graph {self.path.name}")
+            self.edges, self.fingerprints = {}, {}
+
+    def save(self) -> None:
+        referenced: set[str] = {dep for deps in self.edges.values() for dep in deps}
+        self.fingerprints = {
+            name: fingerprint
+            for name, fingerprint in self.fingerprints.items()
+            if name in referenced
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w") as graph_file:
+            json.dump(self.to_json(), graph_file, indent=1)
+        _ = tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.edges.clear()
+        self.fingerprints.clear()
+
+    def add(
+        self,
+        target: Path,
+        dependency: Path,
+        kind: EdgeKind,
+        fingerprint: str | None = None,
+    ) -> None:
+        self.edges.setdefault(str(target), {})[str(dependency)] = kind
+        if fingerprint is not None:
+            self.fingerprints[str(dependency)] = fingerprint
+
+    def remove(self, target: Path) -> None:
+        _ = self.edges.pop(str(target), None)
+
+    def record_page(
+        self,
+        from_path: Path,
+        template_path: Path,
+        to_path: Path,
+        digest: Callable[[Path], str],
+        targets: Iterable[str] = (),
+    ) -> None:
+        """
+        Replaces the edges of a page output with those of its latest build.
+        targets are the paths relative to out_dir that the page links to, as
+        recorded while it was rendered. Links to pages are listing edges only
+        from an index page to the pages below it, so back links and navigation
+        do not tie every page to the home page.
+        """
+        self.remove(to_path)
+        self.add(to_path, from_path, EdgeKind.SOURCE, digest(from_path))
+        self.add(to_path, template_path, EdgeKind.TEMPLATE, digest(template_path))
+        for target in targets:
+            dependency: Path = self.url_to_output(target)
+            if dependency == to_path:
+                continue
+            if dependency.suffix != ".html":
+                self.add(to_path, dependency, EdgeKind.ASSET)
+            elif to_path.name == "index.html" and dependency.is_relative_to(
+                to_path.parent
+            ):
+                self.add(to_path, dependency, EdgeKind.LISTS)
+
+    def record_static(
+        self, assets: dict[str, str], aliases: dict[str, str] | None = None
+    ) -> None:
+        """
+        Replaces all static edges with the synced dest -> source pairs, and the
+        path -> fingerprinted path aliases under out_dir, which pages link to.
+        """
+        for target in [t for t, deps in self.edges.items() if _is_static(deps)]:
+            del self.edges[target]
+        for dest, source in assets.items():
+            self.add(Path(dest), Path(source), EdgeKind.STATIC)
+        for name, fingerprinted in (aliases or {}).items():
+            self.add(
+                self.out_dir.joinpath(name),
+                self.out_dir.joinpath(fingerprinted),
+                EdgeKind.STATIC,
+            )
+
+    def url_to_output(self, url: str) -> Path:
+        """Maps a root-relative URL to the output file it is served from."""
+        path: str = url.split("#", 1)[0].split("?", 1)[0].strip("/")
+        output: Path = self.out_dir.joinpath(path)
+        if not output.suffix:
+            output = output.joinpath("index.html")
+        return output
+
+    def dependents(self) -> dict[str, set[tuple[str, EdgeKind]]]:
+        reverse: dict[str, set[tuple[str, EdgeKind]]] = {}
+        for target, deps in self.edges.items():
+            for dep, kind in deps.items():
+                reverse.setdefault(dep, set()).add((target, kind))
+        return reverse
+
+    def affected(
+        self, changed: Iterable[Path | str], kinds: Iterable[EdgeKind] | None = None
+    ) -> set[str]:
+        """
+        Returns every output that transitively depends on a changed path along
+        edges of the given kinds, by default those that force a rebuild.
+        """
+        follow: frozenset[EdgeKind] = frozenset(kinds or REBUILD_KINDS)
+        reverse: dict[str, set[tuple[str, EdgeKind]]] = self.dependents()
+        stack: list[str] = [str(path) for path in changed]
+        seen: set[str] = set()
+        while stack:
+            for target, kind in reverse.get(stack.pop(), ()):
+                if kind in follow and target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    def changed_inputs(self, digest: Callable[[Path], str]) -> set[str]:
+        """Returns the fingerprinted inputs that are gone or no longer match."""
+        changed: set[str] = set()
+        for name, fingerprint in self.fingerprints.items():
+            path: Path = Path(name)
+            if not path.is_file() or digest(path) != fingerprint:
+                changed.add(name)
+        return changed
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "version": GRAPH_VERSION,
+            "edges": {
+                target: {dep: kind.value for dep, kind in sorted(deps.items())}
+                for target, deps in sorted(self.edges.items())
+            },
+            "fingerprints": dict(sorted(self.fingerprints.items())),
+        }
+
+    def to_dot(self) -> str:
+        lines: list[str] = ["digraph build {", "  rankdir=LR;"]
+        for target, deps in sorted(self.edges.items()):
+            for dep, kind in sorted(deps.items()):
+                lines.append(f'  "{dep}" -> "{target}" [label="{kind.value}"];')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        """Writes the graph as DOT if path ends in '.dot', as JSON otherwise."""
+        with path.open("w") as dump_file:
+            if path.suffix == ".dot":
+                _ = dump_file.write(self.to_dot())
+            else:
+                json.dump(self.to_json(), dump_file, indent=1)
+
+
+def _is_static(deps: dict[str, EdgeKind]) -> bool:
+    return EdgeKind.STATIC in deps.values()
@@ -0,0 +1,118 @@
+import errno
+import os
+import shutil
+from collections.abc import Callable
+from enum import Enum
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows has no ioctl, reflinks are skipped there
+    fcntl = None
+
+# ioctl request cloning a whole file on Linux (btrfs, xfs, overlayfs, ...)
+FICLONE: int = 0x40049409
+
+# Errors meaning a strategy is not available between these files; the next one
+# in the chain is tried instead.
+UNSUPPORTED_ERRNOS: frozenset[int] = frozenset(
+    {
+        errno.EXDEV,
+        errno.EOPNOTSUPP,
+        errno.ENOTSUP,
+        errno.EINVAL,
+        errno.ENOSYS,
+        errno.EPERM,
+        errno.ENOTTY,
+    }
+)
+
+
+class CopyStrategy(Enum):
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    COPY_FILE_RANGE = "copy_file_range"
+    COPY = "copy"
+
+    @classmethod
+    def chain(cls, strategy: CopyStrategy) -> list[CopyStrategy]:
+        """The strategies tried, in order, when strategy is requested."""
+        strategies: list[CopyStrategy] = list(cls)
+        return strategies[strategies.index(strategy) :]
+
+
+# Reflinks and copy_file_range share or copy data in the kernel and never
+# alias the output with its source, unlike hardlinks.
+DEFAULT_STRATEGY: CopyStrategy = CopyStrategy.REFLINK
+
+
+def copy_file(
+    source: Path,
+    dest: Path,
+    strategy: CopyStrategy = DEFAULT_STRATEGY,
+    unsupported: set[CopyStrategy] | None = None,
+) -> CopyStrategy:
+    """
+    Atomically replaces dest with a copy of source, preserving its mtime, with
+    the first strategy of strategy's chain that works for these files.
+
+    Strategies failing as unsupported are added to unsupported and skipped
+    when the same set is passed again. Returns the strategy used.
+    """
+    if unsupported is None:
+        unsupported = set()
+    tmp_path: Path = dest.with_name(dest.name + ".tmp")
+    for candidate in CopyStrategy.chain(strategy):
+        if candidate in unsupported:
+            continue
+        tmp_path.unlink(missing_ok=True)
+        try:
+            _COPIERS[candidate](source, tmp_path)
+        except OSError as error:
+            tmp_path.unlink(missing_ok=True)
+            if candidate is CopyStrategy.COPY or error.errno not in UNSUPPORTED_ERRNOS:
+                raise
+            unsupported.add(candidate)
+            continue
+        _ = tmp_path.replace(dest)
+        return candidate
+    raise AssertionError("CopyStrategy.COPY is always tried")
+
+
+def _hardlink(source: Path, tmp_path: Path) -> None:
+    os.link(source, tmp_path)
+
+
+def _reflink(source: Path, tmp_path: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "ioctl is not available")
+    with source.open("rb") as source_file, tmp_path.open("wb") as tmp_file:
+        _ = fcntl.ioctl(tmp_file.fileno(), FICLONE, source_file.fileno())
+    shutil.copystat(source, tmp_path)
+
+
+def _copy_file_range(source: Path, tmp_path: Path) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    with source.open("rb") as source_file, tmp_path.open("wb") as tmp_file:
+        remaining: int = os.fstat(source_file.fileno()).st_size
+        while remaining > 0:
+            copied: int = os.copy_file_range(
+                source_file.fileno(), tmp_file.fileno(), remaining
+            )
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(source, tmp_path)
+
+
+def _copy(source: Path, tmp_path: Path) -> None:
+    _ = shutil.copy2(source, tmp_path)
+
+
+_COPIERS: dict[CopyStrategy, Callable[[Path, Path], None]] = {
+    CopyStrategy.HARDLINK: _hardlink,
+    CopyStrategy.REFLINK: _reflink,
+    CopyStrategy.COPY_FILE_RANGE: _copy_file_range,
+    CopyStrategy.COPY: _copy,
+}
@@ -0,0 +1,55 @@
+import hashlib
+import json
+from pathlib import PurePosixPath
+
+# Length of the content hash put in fingerprinted file names
+HASH_LENGTH: int = 8
+
+# Files that are requested by fixed names and are never fingerprinted
+FIXED_NAMES: frozenset[str] = frozenset(
+    {"robots.txt", "favicon.ico", "CNAME", ".nojekyll", "asset-manifest.json"}
+)
+
+
+def fingerprinted_name(path: str, content_hash: str) -> str:
+    """Inserts a content hash before the suffix: 'a/x.css' -> 'a/x.<hash>.css'."""
+    posix: PurePosixPath = PurePosixPath(path)
+    return str(
+        posix.with_name(f"{posix.stem}.{content_hash[:HASH_LENGTH]}{posix.suffix}")
+    )
+
+
+def should_fingerprint(path: str) -> bool:
+    posix: PurePosixPath = PurePosixPath(path)
+    return posix.name not in FIXED_NAMES and posix.suffix != ".html"
+
+
+class AssetMap:
+    """
+    Maps site-root-relative asset paths to their fingerprinted paths.
+
+    Fingerprints are derived from file contents, so an unchanged asset keeps
+    its name, and its long-lived cache entries, from one build to the next.
+    """
+
+    def __init__(self, paths: dict[str, str] | None = None) -> None:
+        self.paths: dict[str, str] = dict(sorted((paths or {}).items()))
+        self.digest: str = hashlib.sha256(json.dumps(self.paths).encode()).hexdigest()
+
+    def rewrite(self, url_path: str) -> str:
+        """Rewrites the path of a root-relative URL without its leading '/'."""
+        end: int = len(url_path)
+        for separator in "?#":
+            position: int = url_path.find(separator)
+            if position != -1:
+                end = min(end, position)
+        fingerprinted: str | None = self.paths.get(url_path[:end])
+        if fingerprinted is None:
+            return url_path
+        return fingerprinted + url_path[end:]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {f"/{path}": f"/{target}" for path, target in self.paths.items()},
+            indent=1,
+        )
@@ -1,91 +1,662 @@
+import filecmp
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from shutil import copy, rmtree
 
 from block_markdown import (
+    Block,
     BlockType,
-    block_to_block_type,
-    markdown_to_blocks,
-    markdown_to_html,
+    blocks_to_html,
+    render_block,
+    render_block_memoized,
+    scan_blocks,
 )
+from block_memo import BlockMemo, MemoUpdate
+from build_report import BuildReport, Change
+from critical_css import CssInliner, page_tags
+from dep_graph import REBUILD_KINDS, DependencyGraph
+from fingerprint import AssetMap
+from htmlnode import HtmlNode, ParentNode
+from link_index import LinkIndex
+from manifest import BuildManifest, file_digest
+from page_cache import PageCache
+from page_index import PageIndex
+from pipeline import run_pipeline
+from profiling import Profiler, Span, span
+from search_index import SearchIndex
+from template import BASEPATH_MARKER, Template
 
+# Sources above this many bytes are rendered block by block by stream_large_page.
+STREAM_THRESHOLD: int = 16 * 1024 * 1024
 
-def copy_from_dir_to_dir(from_dir: Path, to_dir: Path) -> None:
-    print("Copying files from", from_dir, "to", to_dir)
-    if not from_dir.is_dir():
-        raise ValueError(f"{from_dir.name}/ is not a directory")
 
-    if to_dir.is_dir():
-        print(f"Removing dir {to_dir.name}/")
-        rmtree(to_dir)
+def read_markdown(from_path: Path, profiler: Profiler | None = None) -> str:
+    if not from_path.is_file():
+        raise ValueError(f"{from_path.name} is not a file")
+    with span(profiler, "read", str(from_path)), from_path.open("r") as from_file:
+        return from_file.read().replace("\x00", "\ufffd")
 
-    if not to_dir.exists():
-        print(f"Creating dir {to_dir.name}/")
-        to_dir.mkdir()
 
-    for file in from_dir.iterdir():
-        if file.is_file():
-            print(f"Copying file {file.name} to {to_dir.name}/")
-            _: Path | str = copy(file, to_dir)
-        elif file.is_dir():
-            print(f"Advancing to subdirectory {file.name}/")
-            copy_from_dir_to_dir(file, to_dir.joinpath(file.name).resolve())
+def parse_page(
+    from_path: Path,
+    basepath: str,
+    profiler: Profiler | None = None,
+    memo: BlockMemo | None = None,
+    markdown: str | None = None,
+) -> tuple[str, ParentNode]:
+    """
+    Reads a markdown file, unless its markdown is given, and returns its title
+    and its HTML tree.
+    """
+    page: str = str(from_path)
+    from_content: str = (
+        markdown if markdown is not None else read_markdown(from_path, profiler)
+    )
 
+    with span(profiler, "title", page):
+        page_title: str = extract_title(from_content).strip()
+    with span(profiler, "blocks", page):
+        blocks: list[Block] = list(scan_blocks(from_content.strip().split("\n")))
+    with span(profiler, "inline", page):
+        page_node: ParentNode = blocks_to_html(blocks, basepath, memo)
+    return page_title, page_node
 
-def generate_page(
-    from_path: Path, template_path: Path, to_path: Path, basepath: str
-) -> None:
-    print(
-        f"Generating page from {from_path.name} to {to_path.name} using {template_path.name}"
+
+def render_body(
+    from_path: Path,
+    profiler: Profiler | None = None,
+    memo: BlockMemo | None = None,
+    markdown: str | None = None,
+) -> tuple[str, list[str]]:
+    """
+    Renders a page body independently of the basepath and asset names.
+
+    Returns the title and the body split at every place the basepath goes, as
+    stored by PageCache; Template.resolve(fragments) gives the final body.
+    """
+    page_title, page_node = parse_page(
+        from_path, BASEPATH_MARKER, profiler, memo, markdown
     )
+    with span(profiler, "serialize", str(from_path)):
+        page_content: str = page_node.to_html()
+    return page_title, page_content.split(BASEPATH_MARKER)
+
+
+# Title, body fragments, spans and block memo update of a page rendered in a pool.
+type WorkerResult = tuple[str, list[str], list[Span], MemoUpdate | None]
+
+# Block memo of a pool worker, seeded from the parent's memo by _init_worker.
+_worker_memo: BlockMemo | None = None
+
+
+def _init_worker(memo: BlockMemo | None) -> None:
+    global _worker_memo
+    _worker_memo = memo
+    if memo is not None:
+        _ = memo.take_update()
+
+
+def _render_in_worker(from_path: Path, profile: bool) -> WorkerResult:
+    """
+    Pool entry point: returns the body, the worker's spans when profiling and
+    what the page added to the worker's block memo.
+    """
+    profiler: Profiler | None = Profiler() if profile else None
+    page_title, fragments = render_body(from_path, profiler, _worker_memo)
+    return (
+        page_title,
+        fragments,
+        profiler.spans if profiler is not None else [],
+        _worker_memo.take_update() if _worker_memo is not None else None,
+    )
+
+
+def write_page(to_path: Path, html: str) -> Change | None:
+    """
+    Atomically replaces to_path with html unless it already holds exactly that,
+    so unchanged outputs keep their mtime. Returns how the file changed.
+    """
+    data: bytes = html.encode()
+    existed: bool = to_path.is_file()
+    if existed and to_path.stat().st_size == len(data) and to_path.read_bytes() == data:
+        print(f"Unchanged file {to_path.name}")
+        return None
+
+    if not to_path.parent.is_dir():
+        print(f"Creating dir {to_path.parent}")
+        to_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Writing file {to_path.name}")
+    tmp_path: Path = to_path.with_name(to_path.name + ".tmp")
+    _ = tmp_path.write_bytes(data)
+    _ = tmp_path.replace(to_path)
+    return Change.CHANGED if existed else Change.ADDED
+
+
+def stream_page(
+    from_path: Path,
+    template: Template,
+    to_path: Path,
+    profiler: Profiler | None = None,
+    memo: BlockMemo | None = None,
+    links: LinkIndex | None = None,
+    search: SearchIndex | None = None,
+    page_index: PageIndex | None = None,
+) -> Change | None:
+    """
+    Renders a page and serializes its HTML tree straight into a temporary file
+    that replaces the output if it differs, like write_page.
+
+    When profiling, the page is rendered to a string first so that serializing,
+    templating and writing can be timed separately. With a link index, the
+    links of the page are recorded in it, with a search index its terms and with
+    a page index its metadata.
+    """
+    if profiler is not None:
+        page_title, fragments = render_body(from_path, profiler, memo)
+        return stitch_page(
+            from_path,
+            template,
+            page_title,
+            fragments,
+            to_path,
+            profiler,
+            links,
+            search,
+            page_index,
+        )
+
+    page_title, page_node = parse_page(from_path, BASEPATH_MARKER, memo=memo)
+    body: Iterator[str] = template.resolve_chunks(page_node.iter_html())
+    if search is not None:
+        body = search.tap(to_path, page_title, body)
+    if page_index is not None:
+        body = page_index.tap(to_path, from_path, page_title, body)
+    chunks: Iterator[str] = template.iter_render(page_title, body)
+    if links is not None:
+        chunks = links.tap(to_path, chunks)
+    return write_streamed(to_path, chunks)
+
+
+def stream_large_page(
+    from_path: Path,
+    template: Template,
+    to_path: Path,
+    memo: BlockMemo | None = None,
+    links: LinkIndex | None = None,
+    search: SearchIndex | None = None,
+    page_index: PageIndex | None = None,
+) -> Change | None:
+    """
+    Renders a page block by block into the template, for sources too large to
+    hold in memory.
+
+    The source is scanned twice: up to its title, then block by block, each
+    block being rendered and written before the next one is read. Memory use
+    is bounded by the largest block rather than the page, as long as the
+    template has a single Content slot. A template inlining styles needs the
+    elements of the page first, collected by another pass over the blocks.
+    """
     if not from_path.is_file():
         raise ValueError(f"{from_path.name} is not a file")
-
+    print(f"Streaming large page {from_path.name}")
     with from_path.open("r") as from_file:
-        from_content: str = from_file.read()
+        page_title: str = title_from_blocks(scan_blocks(_clean_lines(from_file)))
+    tags: set[str] | None = None
+    if template.inlines_styles:
+        with from_path.open("r") as from_file:
+            tags = page_tags(
+                _iter_body(scan_blocks(_clean_lines(from_file)), BASEPATH_MARKER, memo)
+            )
+    with from_path.open("r") as from_file:
+        body: Iterator[str] = template.resolve_chunks(
+            _iter_body(scan_blocks(_clean_lines(from_file)), BASEPATH_MARKER, memo)
+        )
+        if search is not None:
+            body = search.tap(to_path, page_title.strip(), body)
+        if page_index is not None:
+            body = page_index.tap(to_path, from_path, page_title.strip(), body)
+        chunks: Iterator[str] = template.iter_render(page_title.strip(), body, tags)
+        if links is not None:
+            chunks = links.tap(to_path, chunks)
+        return write_streamed(to_path, chunks)
 
-    with template_path.open("r") as template_file:
-        template_content: str = template_file.read()
 
-    page_title: str = extract_title(from_content).strip()
-    page_content: str = markdown_to_html(from_content.strip()).to_html()
+def _clean_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        yield line.replace("\x00", "\ufffd")
 
-    html_from_template: str = (
-        template_content.replace("{{ Title }}", page_title)
-        .replace("{{ Content }}", page_content)
-        .replace('href="/', f'href="{basepath}')
-        .replace('src="/', f'src="{basepath}')
-    )
 
+def _iter_body(
+    blocks: Iterable[Block], basepath: str, memo: BlockMemo | None
+) -> Iterator[str]:
+    """Yields the HTML of blocks_to_html(blocks) without building the tree."""
+    yield "<div>"
+    for block in blocks:
+        node: HtmlNode = (
+            render_block(block, basepath)
+            if memo is None
+            else render_block_memoized(block, basepath, memo)
+        )
+        yield from node.iter_html()
+    yield "</div>"
+
+
+def write_streamed(to_path: Path, chunks: Iterable[str]) -> Change | None:
+    """Like write_page, for HTML produced in chunks."""
     if not to_path.parent.is_dir():
         print(f"Creating dir {to_path.parent}")
         to_path.parent.mkdir(parents=True, exist_ok=True)
 
+    tmp_path: Path = to_path.with_name(to_path.name + ".tmp")
+    try:
+        with tmp_path.open("w") as to_file:
+            to_file.writelines(chunks)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    existed: bool = to_path.is_file()
+    if existed and filecmp.cmp(tmp_path, to_path, shallow=False):
+        print(f"Unchanged file {to_path.name}")
+        tmp_path.unlink()
+        return None
     print(f"Writing file {to_path.name}")
-    with to_path.open("w") as to_file:
-        _: int = to_file.write(html_from_template)
+    _ = tmp_path.replace(to_path)
+    return Change.CHANGED if existed else Change.ADDED
 
 
-def generate_pages_recursive(
-    from_dir: Path, template_path: Path, to_dir: Path, basepath: str
+def stitch_page(
+    from_path: Path,
+    template: Template,
+    page_title: str,
+    fragments: list[str],
+    to_path: Path,
+    profiler: Profiler | None = None,
+    links: LinkIndex | None = None,
+    search: SearchIndex | None = None,
+    page_index: PageIndex | None = None,
+) -> Change | None:
+    """Writes a body rendered from from_path by render_body into the template."""
+    if search is not None:
+        search.record(to_path, page_title, "".join(fragments))
+    if page_index is not None:
+        page_index.record(to_path, from_path, page_title, "".join(fragments))
+    with span(profiler, "template", str(from_path)):
+        html: str = template.render(page_title, template.resolve(fragments))
+    if links is not None:
+        links.record(to_path, html)
+    with span(profiler, "write", str(from_path)):
+        return write_page(to_path, html)
+
+
+def generate_page(
+    from_path: Path, template_path: Path, to_path: Path, basepath: str
 ) -> None:
-    print("Generating pages from", from_dir.name, "to", to_dir.name)
-    for file in from_dir.iterdir():
+    print(
+        f"Generating page from {from_path.name} to {to_path.name} using {template_path.name}"
+    )
+    _ = stream_page(from_path, Template.from_path(template_path, basepath), to_path)
+
+
+def collect_page_jobs(from_dir: Path, to_dir: Path) -> list[tuple[Path, Path]]:
+    """Returns (source, output) pairs for every '.md' file, in a stable order."""
+    jobs: list[tuple[Path, Path]] = []
+    for file in sorted(from_dir.iterdir()):
         if file.suffix == ".md":
-            print("Found '.md' file to be converted", file.name)
-            generate_page(
-                file, template_path, to_dir.joinpath(file.stem + ".html"), basepath
-            )
+            jobs.append((file, to_dir.joinpath(file.stem + ".html")))
         elif file.is_dir():
-            print("Found directory, recursing into it", file.name)
-            generate_pages_recursive(
-                file, template_path, to_dir.joinpath(file.name), basepath
+            jobs.extend(collect_page_jobs(file, to_dir.joinpath(file.name)))
+    return jobs
+
+
+def generate_pages(
+    jobs: list[tuple[Path, Path]],
+    template_path: Path,
+    basepath: str,
+    manifest: BuildManifest | None = None,
+    workers: int = 1,
+    profiler: Profiler | None = None,
+    cache: PageCache | None = None,
+    memo: BlockMemo | None = None,
+    graph: DependencyGraph | None = None,
+    pipeline_depth: int = 0,
+    report: BuildReport | None = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    assets: AssetMap | None = None,
+    minify: bool = False,
+    inliner: CssInliner | None = None,
+    links: LinkIndex | None = None,
+    search: SearchIndex | None = None,
+    page_index: PageIndex | None = None,
+) -> None:
+    """
+    Renders and writes every (source, output) job.
+
+    With more than one worker the markdown rendering runs in a process pool while
+    outputs are still written by this process in job order. With a cache, page
+    bodies are looked up by source hash first and only missing ones are parsed.
+    With a block memo, blocks already rendered are reused within and across
+    pages; pool workers start from a copy of the memo. A failing page does not
+    stop the others; all failures are reported together at the end.
+
+    With a dependency graph and a manifest, every page the graph reports as
+    affected by a changed input is rebuilt, and the graph records the inputs of
+    each page written.
+
+    With a pipeline depth, pages are read, rendered and written by overlapping
+    stages (see run_pipeline) with at most that many pages queued between two
+    stages, instead of one page after another.
+
+    Outputs are only replaced when their content changes; a report collects
+    the ones added or changed. Sources larger than stream_threshold bytes are
+    always rendered by stream_large_page, bypassing the cache and the pool.
+    With an asset map, root-relative URLs of fingerprinted assets are rewritten
+    in the template and in every page, and pages are rebuilt when it changes.
+    With minify, the template is minified, but not the page bodies. With an
+    inliner, the critical CSS of each page is inlined into it (see Template).
+    With a link index, every output is added to it and the links of every
+    page written are recorded; with a search index, every page is added to it
+    and the terms of every page written are recorded, and likewise with a page
+    index and the metadata of every page. Pages they have no record of are
+    rebuilt.
+    """
+    template: Template = Template.from_path(
+        template_path, basepath, assets, minify, inliner
+    )
+    asset_digest: str = assets.digest if assets is not None else ""
+    styles_digest: str = (
+        inliner.digest if inliner is not None and template.inlines_styles else ""
+    )
+    stale: set[str] = set()
+    if graph is not None and manifest is not None:
+        changed: set[str] = graph.changed_inputs(manifest.digest)
+        stale = graph.affected(changed, REBUILD_KINDS)
+        if changed:
+            print(f"{len(changed)} input(s) changed, affecting {len(stale)} page(s)")
+
+    pending: list[tuple[Path, Path]] = []
+    for from_path, to_path in jobs:
+        if links is not None:
+            links.add_output(to_path)
+        if search is not None:
+            search.add_page(to_path)
+        if page_index is not None:
+            page_index.add_page(to_path)
+        if (
+            manifest is not None
+            and str(to_path) not in stale
+            and (links is None or links.has_page(to_path))
+            and (search is None or search.has_page(to_path))
+            and (page_index is None or page_index.has_page(to_path))
+            and manifest.is_page_current(
+                from_path,
+                template_path,
+                to_path,
+                basepath,
+                asset_digest,
+                minify,
+                styles_digest,
             )
+        ):
+            print("Skipping unchanged '.md' file", from_path.name)
+            if graph is not None and str(to_path) not in graph.edges:
+                graph.record_page(
+                    from_path,
+                    template_path,
+                    to_path,
+                    manifest.digest,
+                    links.targets(to_path) if links is not None else (),
+                )
+        else:
+            pending.append((from_path, to_path))
+
+    errors: list[tuple[Path, Exception]] = []
+    stream: bool = cache is None and workers <= 1 and pipeline_depth <= 0
+    large: set[int] = {
+        index
+        for index, (from_path, _) in enumerate(pending)
+        if from_path.is_file() and from_path.stat().st_size > stream_threshold
+    }
+
+    source_hashes: dict[int, str] = {}
+    bodies: dict[int, tuple[str, list[str]]] = {}
+    if cache is not None:
+        for index, (from_path, _) in enumerate(pending):
+            if index in large:
+                continue
+            source_hashes[index] = (
+                manifest.digest(from_path)
+                if manifest is not None
+                else file_digest(from_path)
+            )
+            with span(profiler, "cache", str(from_path)):
+                body: tuple[str, list[str]] | None = cache.get(source_hashes[index])
+            if body is not None:
+                bodies[index] = body
+
+    to_render: list[int] = [
+        index
+        for index in range(len(pending))
+        if index not in bodies and index not in large
+    ]
+    futures: dict[int, Future[WorkerResult]] = {}
+    pool: ProcessPoolExecutor | None = None
+    if not stream and workers > 1 and len(to_render) > 1:
+        print(f"Generating {len(to_render)} pages with {workers} workers")
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(to_render)),
+            initializer=_init_worker,
+            initargs=(memo,),
+        )
+        futures = {
+            index: pool.submit(
+                _render_in_worker, pending[index][0], profiler is not None
+            )
+            for index in to_render
+        }
+
+    def page_body(index: int, markdown: str | None = None) -> tuple[str, list[str]]:
+        from_path: Path = pending[index][0]
+        if index in bodies:
+            print("Reusing cached body of", from_path.name)
+            return bodies[index]
+        if index in futures:
+            future: Future[WorkerResult] = futures[index]
+            page_title, fragments, spans, update = future.result()
+            if profiler is not None:
+                profiler.extend(spans)
+            if memo is not None and update is not None:
+                memo.apply_update(update)
+        else:
+            page_title, fragments = render_body(from_path, profiler, memo, markdown)
+        if cache is not None:
+            cache.put(source_hashes[index], page_title, fragments)
+        return page_title, fragments
+
+    def record_built(index: int, change: Change | None) -> None:
+        from_path, to_path = pending[index]
+        if report is not None and change is not None:
+            report.record(to_path, change)
+        if manifest is not None:
+            manifest.record_page(
+                from_path,
+                template_path,
+                to_path,
+                basepath,
+                asset_digest,
+                minify,
+                styles_digest,
+            )
+        if graph is not None:
+            graph.record_page(
+                from_path,
+                template_path,
+                to_path,
+                manifest.digest if manifest is not None else file_digest,
+                links.targets(to_path) if links is not None else (),
+            )
+
+    def read_stage(index: int) -> str | None:
+        from_path, to_path = pending[index]
+        print(f"Generating page from {from_path.name} to {to_path.name}")
+        if index in bodies or index in futures or index in large:
+            return None
+        return read_markdown(from_path, profiler)
+
+    def render_stage(index: int, markdown: str | None) -> str | None:
+        if index in large:
+            return None
+        page_title, fragments = page_body(index, markdown)
+        from_path, to_path = pending[index]
+        if search is not None:
+            search.record(to_path, page_title, "".join(fragments))
+        if page_index is not None:
+            page_index.record(to_path, from_path, page_title, "".join(fragments))
+        with span(profiler, "template", str(from_path)):
+            return template.render(page_title, template.resolve(fragments))
+
+    def write_stage(index: int, html: str | None) -> None:
+        from_path, to_path = pending[index]
+        change: Change | None
+        if html is None:
+            # The memo is in use by the render stage's thread.
+            with span(profiler, "stream", str(from_path)):
+                change = stream_large_page(
+                    from_path,
+                    template,
+                    to_path,
+                    links=links,
+                    search=search,
+                    page_index=page_index,
+                )
+        else:
+            if links is not None:
+                links.record(to_path, html)
+            with span(profiler, "write", str(from_path)):
+                change = write_page(to_path, html)
+        record_built(index, change)
+
+    try:
+        if pipeline_depth > 0:
+            for index, error in run_pipeline(
+                range(len(pending)),
+                read_stage,
+                render_stage,
+                write_stage,
+                pipeline_depth,
+            ):
+                print(f"Failed to generate page from {pending[index][0]}: {error}")
+                errors.append((pending[index][0], error))
+        else:
+            for index, (from_path, to_path) in enumerate(pending):
+                print(f"Generating page from {from_path.name} to {to_path.name}")
+                try:
+                    change: Change | None
+                    if index in large:
+                        with span(profiler, "stream", str(from_path)):
+                            change = stream_large_page(
+                                from_path,
+                                template,
+                                to_path,
+                                memo,
+                                links,
+                                search,
+                                page_index,
+                            )
+                    elif stream:
+                        change = stream_page(
+                            from_path,
+                            template,
+                            to_path,
+                            profiler,
+                            memo,
+                            links,
+                            search,
+                            page_index,
+                        )
+                    else:
+                        page_title, fragments = page_body(index)
+                        change = stitch_page(
+                            from_path,
+                            template,
+                            page_title,
+                            fragments,
+                            to_path,
+                            profiler,
+                            links,
+                            search,
+                            page_index,
+                        )
+                except (OSError, ValueError) as error:
+                    # Unreadable or malformed sources; anything else is a bug.
+                    print(f"Failed to generate page from {from_path}: {error}")
+                    errors.append((from_path, error))
+                    continue
+                record_built(index, change)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if cache is not None:
+        print("Page cache:", cache.summary())
+    if memo is not None:
+        print("Block memo:", memo.summary())
+    if errors:
+        details: str = "\n".join(f"  {path}: {error}" for path, error in errors)
+        raise ValueError(f"Failed to generate {len(errors)} page(s):\n{details}")
+
+
+def generate_pages_recursive(
+    from_dir: Path,
+    template_path: Path,
+    to_dir: Path,
+    basepath: str,
+    manifest: BuildManifest | None = None,
+    workers: int = 1,
+    profiler: Profiler | None = None,
+    cache: PageCache | None = None,
+    memo: BlockMemo | None = None,
+    graph: DependencyGraph | None = None,
+    pipeline_depth: int = 0,
+    report: BuildReport | None = None,
+    stream_threshold: int = STREAM_THRESHOLD,
+    assets: AssetMap | None = None,
+    minify: bool = False,
+    inliner: CssInliner | None = None,
+    links: LinkIndex | None = None,
+    search: SearchIndex | None = None,
+    page_index: PageIndex | None = None,
+) -> None:
+    print("Generating pages from", from_dir.name, "to", to_dir.name)
+    generate_pages(
+        collect_page_jobs(from_dir, to_dir),
+        template_path,
+        basepath,
+        manifest,
+        workers,
+        profiler,
+        cache,
+        memo,
+        graph,
+        pipeline_depth,
+        report,
+        stream_threshold,
+        assets,
+        minify,
+        inliner,
+        links,
+        search,
+        page_index,
+    )
 
 
 def extract_title(markdown: str) -> str:
-    for block in markdown_to_blocks(markdown):
-        if block_to_block_type(block) == BlockType.HEADING and block.strip().startswith(
-            "# "
-        ):
-            return block[2:].strip()
+    return title_from_blocks(scan_blocks(markdown.split("\n")))
+
+
+def title_from_blocks(blocks: Iterable[Block]) -> str:
+    """Returns the text of the first h1, consuming blocks only up to it."""
+    for block in blocks:
+        if block.block_type == BlockType.HEADING and block.text.startswith("# "):
+            return block.text[2:].strip()
     raise ValueError("No title found")
@@ -1,10 +1,36 @@
-from collections.abc import Sequence
-from typing import override
+from collections.abc import Iterator, Sequence
+from typing import Any, NoReturn, TextIO, override
 
 VOID_TAGS: tuple[str, ...] = ("link", "img", "br", "meta")
 
 
+def _immutable(*_args: Any, **_kwargs: Any) -> NoReturn:
+    raise TypeError("Shared empty children and props cannot be modified")
+
+
+class _EmptyChildren(list["HtmlNode"]):
+    """Immutable empty list shared by every node created without children."""
+
+    __slots__ = ()
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+
+
+class _EmptyProps(dict[str, str]):
+    """Immutable empty dict shared by every node created without props."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+EMPTY_CHILDREN: list[HtmlNode] = _EmptyChildren()
+EMPTY_PROPS: dict[str, str] = _EmptyProps()
+
+
 class HtmlNode:
+    __slots__ = ("children", "props", "tag", "value")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -14,8 +40,10 @@ class HtmlNode:
     ):
         self.tag: str | None = tag
         self.value: str | None = value
-        self.children: Sequence[HtmlNode] = children or []
-        self.props: dict[str, str] = props or {}
+        self.children: Sequence[HtmlNode] = (
+            children if children is not None else EMPTY_CHILDREN
+        )
+        self.props: dict[str, str] = props or EMPTY_PROPS
 
     @override
     def __repr__(self) -> str:
@@ -24,6 +52,37 @@ class HtmlNode:
     def to_html(self) -> str:
         raise NotImplementedError("Method 'to_html' is not implemented")
 
+    def iter_html(self) -> Iterator[str]:
+        """
+        Yields the HTML of the tree in document order without recursion.
+
+        ParentNodes whose children are all leaves are emitted as one fragment;
+        anything else is expanded through an explicit stack, so the depth of the
+        tree is not limited by the recursion limit.
+        """
+        stack: list[HtmlNode | str] = [self]
+        while stack:
+            item: HtmlNode | str = stack.pop()
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, ParentNode):
+                opening_tag, closing_tag = item.tags()
+                if all(isinstance(child, LeafNode) for child in item.children):
+                    yield (
+                        opening_tag
+                        + "".join(child.to_html() for child in item.children)
+                        + closing_tag
+                    )
+                else:
+                    yield opening_tag
+                    stack.append(closing_tag)
+                    stack.extend(reversed(item.children))
+            else:
+                yield item.to_html()
+
+    def write_html(self, fp: TextIO) -> None:
+        fp.writelines(self.iter_html())
+
     def props_to_html(self) -> str:
         if not self.props:
             return ""
@@ -31,13 +90,15 @@ class HtmlNode:
 
 
 class LeafNode(HtmlNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
         value: str | None,
         props: dict[str, str] | None = None,
     ):
-        super().__init__(tag=tag, value=value, children=[], props=props)
+        super().__init__(tag=tag, value=value, children=None, props=props)
 
     @override
     def to_html(self) -> str:
@@ -51,18 +112,23 @@ class LeafNode(HtmlNode):
 
 
 class ParentNode(HtmlNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
         children: Sequence[HtmlNode] | None,
         props: dict[str, str] | None = None,
     ):
-        super().__init__(tag=tag, value=None, children=children or [], props=props)
+        super().__init__(tag=tag, value=None, children=children, props=props)
 
-    @override
-    def to_html(self) -> str:
+    def tags(self) -> tuple[str, str]:
         if not self.tag:
             raise ValueError("ParentNode tag cannot be empty")
         elif not self.children:
             raise ValueError("ParentNode children cannot be empty")
-        return f"<{self.tag}{self.props_to_html()}>{''.join(child.to_html() for child in self.children)}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>", f"</{self.tag}>"
+
+    @override
+    def to_html(self) -> str:
+        return "".join(self.iter_html())
@@ -108,7 +108,7 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     return new_nodes
 
 
-def text_to_text_nodes(text: str) -> list[TextNode]:
+def text_to_text_nodes_legacy(text: str) -> list[TextNode]:
     nodes: list[TextNode] = [TextNode(text, TextType.TEXT)]
 
     for type in TextType:
@@ -127,3 +127,93 @@ def text_to_text_nodes(text: str) -> list[TextNode]:
                 continue
 
     return nodes
+
+
+# Link and image text may not contain inline delimiters: the delimiters take
+# precedence and split the text before links are looked for.
+_INLINE_CHARS = r"(?:[^\[\]_`*]|\*(?!\*))*"
+_INLINE_URL_CHARS = r"(?:[^()_`*]|\*(?!\*))*"
+INLINE_TOKEN_RGX = re.compile(
+    r"\*\*|_|`"
+    rf"|(?<!!)\[(?P<link_text>{_INLINE_CHARS})\]\((?P<link_url>{_INLINE_URL_CHARS})\)"
+    rf"|!\[(?P<image_alt>{_INLINE_CHARS})\]\((?P<image_url>{_INLINE_URL_CHARS})\)"
+)
+NO_CLOSING_DELIMETER: str = "No matching closing delimeter found."
+
+
+def scan_inline(text: str) -> list[TextNode]:
+    """
+    Splits text into TextNodes in one left-to-right pass.
+
+    Produces the same nodes as the multi-pass splitters: bold takes precedence
+    over italic, italic over code and code over links and images, so a
+    higher-precedence delimiter inside an italic or code span is an error.
+    """
+    token = INLINE_TOKEN_RGX.search(text)
+    if token is None:
+        return [TextNode(text, TextType.TEXT)]
+
+    nodes: list[TextNode] = []
+    position: int = 0
+    while token is not None:
+        start: int = token.start()
+        content_start: int = token.end()
+        if position < start:
+            nodes.append(TextNode(text[position:start], TextType.TEXT))
+
+        match token.group():
+            case "**":
+                position = text.find("**", content_start)
+                if position == -1:
+                    raise ValueError(NO_CLOSING_DELIMETER)
+                if position > content_start:
+                    nodes.append(TextNode(text[content_start:position], TextType.BOLD))
+                position += 2
+            case "_":
+                position = text.find("_", content_start)
+                if position == -1 or text.find("**", content_start, position) != -1:
+                    raise ValueError(NO_CLOSING_DELIMETER)
+                if position > content_start:
+                    nodes.append(
+                        TextNode(text[content_start:position], TextType.ITALIC)
+                    )
+                position += 1
+            case "`":
+                position = text.find("`", content_start)
+                if (
+                    position == -1
+                    or text.find("**", content_start, position) != -1
+                    or text.find("_", content_start, position) != -1
+                ):
+                    raise ValueError(NO_CLOSING_DELIMETER)
+                if position > content_start:
+                    nodes.append(TextNode(text[content_start:position], TextType.CODE))
+                position += 1
+            case _ if token.group("link_url") is not None:
+                nodes.append(
+                    TextNode(token["link_text"], TextType.LINK, token["link_url"])
+                )
+                position = content_start
+            case _:
+                nodes.append(
+                    TextNode(token["image_alt"], TextType.IMAGE, token["image_url"])
+                )
+                position = content_start
+
+        token = INLINE_TOKEN_RGX.search(text, position)
+
+    if position < len(text):
+        nodes.append(TextNode(text[position:], TextType.TEXT))
+    return nodes
+
+
+def text_to_text_nodes(text: str, legacy: bool = False) -> list[TextNode]:
+    """
+    Converts inline markdown to TextNodes.
+
+    Set legacy to use the original implementation, which runs one splitting pass
+    per TextType.
+    """
+    if legacy:
+        return text_to_text_nodes_legacy(text)
+    return scan_inline(text)
@@ -0,0 +1,148 @@
+import html
+import json
+import posixpath
+import re
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+from urllib.parse import SplitResult, unquote, urlsplit
+
+LINK_INDEX_VERSION: int = 1
+
+URL_ATTRIBUTE_RGX = re.compile(r'\b(?:href|src)="([^"]*)"')
+
+
+def attribute_urls(html_text: str) -> list[str]:
+    """Returns the URLs of the href and src attributes in html_text."""
+    return [html.unescape(url) for url in URL_ATTRIBUTE_RGX.findall(html_text)]
+
+
+class LinkIndex:
+    """
+    The outputs of a build and the internal links of every page, to find links
+    whose target is not built.
+
+    Outputs are registered as they are generated or synced, so checking needs
+    no filesystem access. The links of each page are kept across builds and
+    replaced when the page is rewritten, so pages skipped as unchanged are
+    checked too.
+    """
+
+    def __init__(self, path: Path, out_dir: Path, basepath: str = "/") -> None:
+        self.path: Path = path
+        self.out_dir: Path = out_dir
+        self.basepath: str = basepath
+        # Output paths relative to out_dir
+        self.outputs: set[str] = set()
+        # Page, relative to out_dir -> URLs of its href and src attributes
+        self.links: dict[str, list[str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("r") as index_file:
+                data: dict[str, Any] = json.load(index_file)
+        except OSError, ValueError:
+            print(f"Ignoring unreadable link index {self.path.name}")
+            return
+        if data.get("version") != LINK_INDEX_VERSION:
+            return
+        self.links = data.get("links", {})
+
+    def save(self) -> None:
+        """Saves the links of the pages that are still outputs."""
+        data: dict[str, Any] = {
+            "version": LINK_INDEX_VERSION,
+            "links": {
+                page: self.links[page]
+                for page in sorted(self.links)
+                if page in self.outputs
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w") as index_file:
+            json.dump(data, index_file, indent=1)
+        _ = tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.outputs.clear()
+        self.links.clear()
+
+    def _relative(self, path: Path) -> str:
+        return path.relative_to(self.out_dir).as_posix()
+
+    def add_output(self, path: Path) -> None:
+        self.outputs.add(self._relative(path))
+
+    def has_page(self, page: Path) -> bool:
+        return self._relative(page) in self.links
+
+    def record(self, page: Path, html_text: str) -> None:
+        """Replaces the links of page with those in its HTML."""
+        self.links[self._relative(page)] = attribute_urls(html_text)
+
+    def tap(self, page: Path, chunks: Iterable[str]) -> Iterator[str]:
+        """Yields chunks of the HTML of page, recording its links on the way."""
+        links: list[str] = []
+        for chunk in chunks:
+            links.extend(attribute_urls(chunk))
+            yield chunk
+        self.links[self._relative(page)] = links
+
+    def target(self, page: str, url: str) -> str | None:
+        """
+        Returns the path relative to out_dir that an internal URL on page points
+        to, or None for external URLs and same-page fragments. Root-relative
+        URLs outside the basepath map to a path starting with '/'.
+        """
+        parts: SplitResult = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        path: str = unquote(parts.path)
+        if path.startswith("/"):
+            if not path.startswith(self.basepath):
+                return path
+            path = path[len(self.basepath) :]
+        else:
+            path = posixpath.join(posixpath.dirname(page), path)
+        if path == "" or path.endswith("/"):
+            return posixpath.normpath(path + "index.html")
+        return posixpath.normpath(path)
+
+    def targets(self, page: Path) -> list[str]:
+        """Returns the paths relative to out_dir that the internal URLs of page
+        point to."""
+        name: str = self._relative(page)
+        return [
+            target
+            for url in self.links.get(name, [])
+            if (target := self.target(name, url)) is not None
+            and not target.startswith("/")
+        ]
+
+    def resolves(self, target: str) -> bool:
+        return (
+            target in self.outputs
+            or f"{target}/index.html" in self.outputs
+            or f"{target}.html" in self.outputs
+        )
+
+    def broken(self) -> dict[str, list[str]]:
+        """Returns the URLs of every output page whose target is not an output."""
+        broken: dict[str, list[str]] = {}
+        for page in sorted(self.links):
+            if page not in self.outputs:
+                continue
+            for url in self.links[page]:
+                target: str | None = self.target(page, url)
+                if target is not None and not self.resolves(target):
+                    broken.setdefault(page, []).append(url)
+        return broken
+
+    def checked(self) -> int:
+        return sum(
+            len(links) for page, links in self.links.items() if page in self.outputs
+        )
@@ -1,15 +1,403 @@
-import sys
+import argparse
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from shutil import rmtree
 
-from constants import CONTENT, DOCS, HTML_TEMPLATE, STATIC
-from gen_content import copy_from_dir_to_dir, generate_pages_recursive
+from block_memo import BlockMemo
+from build_report import BuildReport, Change
+from constants import (
+    ASSET_CACHE,
+    BLOCK_MEMO,
+    BUILD_CHANGES,
+    BUILD_DIR,
+    BUILD_GRAPH,
+    BUILD_LINKS,
+    BUILD_MANIFEST,
+    CONTENT,
+    CRITICAL_CSS,
+    DOCS,
+    HTML_TEMPLATE,
+    PAGE_CACHE,
+    PAGE_METADATA,
+    SEARCH_CACHE,
+    STATIC,
+)
+from critical_css import CssInliner
+from dep_graph import DependencyGraph
+from file_copy import DEFAULT_STRATEGY, CopyStrategy
+from fingerprint import AssetMap
+from gen_content import (
+    STREAM_THRESHOLD,
+    generate_pages_recursive,
+    write_page,
+    write_streamed,
+)
+from link_index import LinkIndex
+from manifest import BuildManifest
+from minify import CssMinifier
+from page_cache import PageCache
+from page_index import PageIndex
+from pipeline import DEFAULT_DEPTH
+from png_optimizer import PngOptimizer
+from precompress import Encoding, PrecompressResult, precompress
+from profiling import Profiler, span
+from search_index import SearchIndex
+from static_sync import SyncResult, sync_static
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the static site.")
+    _ = parser.add_argument("basepath", nargs="?", default="/")
+    _ = parser.add_argument(
+        "--full",
+        action="store_true",
+        help="delete the output directory and build manifest and rebuild everything",
+    )
+    _ = parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.process_cpu_count() or 1,
+        help="number of processes rendering pages (default: CPU count)",
+    )
+    _ = parser.add_argument(
+        "--copy-strategy",
+        choices=[strategy.value for strategy in CopyStrategy],
+        default=DEFAULT_STRATEGY.value,
+        help="how static files are copied, falling back to the later choices where "
+        + f"unsupported (default: {DEFAULT_STRATEGY.value})",
+    )
+    _ = parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="losslessly recompress PNG files copied from static/, caching the "
+        + "results in .build/assets",
+    )
+    _ = parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify the page template and the stylesheets copied from static/, "
+        + "caching the stylesheets in .build/assets",
+    )
+    _ = parser.add_argument(
+        "--inline-css",
+        nargs="?",
+        choices=["used", "all"],
+        const="used",
+        metavar="RULES",
+        help="inline the stylesheets the template links into each page: the "
+        + "rules matching elements the page uses, deferring the full stylesheet "
+        + "('used', the default), or all of them",
+    )
+    _ = parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files to content-hashed names, rewrite references to "
+        + "them and write docs/asset-manifest.json",
+    )
+    _ = parser.add_argument(
+        "--precompress",
+        nargs="*",
+        choices=[encoding.value for encoding in Encoding],
+        metavar="ENCODING",
+        help="write .gz and .zst sidecars of changed text outputs, or only those "
+        + "of the given encodings (gzip, zstd; zstd needs Python 3.14)",
+    )
+    _ = parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a client-side search index sharded by term prefix to "
+        + "docs/search/",
+    )
+    _ = parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="the URL the site is served at, such as https://example.com; writes "
+        + "docs/sitemap.xml and an Atom feed of content/blog/ to docs/blog/feed.xml",
+    )
+    _ = parser.add_argument(
+        "--pipeline",
+        nargs="?",
+        type=int,
+        const=DEFAULT_DEPTH,
+        default=0,
+        metavar="DEPTH",
+        help="overlap reading, rendering and writing pages, queueing at most DEPTH "
+        + f"pages between stages (default: {DEFAULT_DEPTH})",
+    )
+    _ = parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=STREAM_THRESHOLD // 2**20,
+        metavar="MIB",
+        help="render sources larger than MIB mebibytes block by block "
+        + f"(default: {STREAM_THRESHOLD // 2**20})",
+    )
+    _ = parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not reuse or store rendered page bodies and blocks in .build/",
+    )
+    _ = parser.add_argument(
+        "--fail-on-broken-links",
+        action="store_true",
+        help="fail the build when a page links to a path that is not built",
+    )
+    _ = parser.add_argument(
+        "--changes",
+        type=Path,
+        default=BUILD_CHANGES,
+        metavar="FILE",
+        help="where to write the JSON list of added, changed and removed outputs "
+        + "(default: .build/changes.json)",
+    )
+    _ = parser.add_argument(
+        "--dump-graph",
+        type=Path,
+        metavar="FILE",
+        help="write the build dependency graph as DOT ('.dot') or JSON",
+    )
+    _ = parser.add_argument(
+        "--affected",
+        nargs="+",
+        type=Path,
+        metavar="PATH",
+        help="print the outputs that depend on the given paths and exit",
+    )
+    _ = parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=BUILD_DIR.joinpath("trace.json"),
+        metavar="TRACE",
+        help="time every build stage, print a summary and write a Chrome trace "
+        + "(default: .build/trace.json)",
+    )
+    return parser.parse_args()
+
+
+def write_search_index(
+    search: SearchIndex | None, directory: Path, basepath: str, report: BuildReport
+) -> None:
+    """
+    Writes the files of the search index to directory and removes stale ones,
+    or all of them without a search index.
+    """
+    files: dict[str, str] = search.files(basepath) if search is not None else {}
+    for name, text in files.items():
+        path: Path = directory.joinpath(name)
+        change: Change | None = write_page(path, text)
+        if change is not None:
+            report.record(path, change)
+    if directory.is_dir():
+        for path in sorted(directory.glob("*.json")):
+            if path.name not in files:
+                path.unlink()
+                report.record(path, Change.REMOVED)
+        if not any(directory.iterdir()):
+            directory.rmdir()
+    if search is not None:
+        print(f"Search index: {search.summary()}, {len(files) - 1} shards")
+
+
+def write_feeds(
+    page_index: PageIndex | None,
+    site_url: str,
+    out_dir: Path,
+    basepath: str,
+    links: LinkIndex,
+    report: BuildReport,
+) -> None:
+    """
+    Writes the sitemap and the feed of blog/ from the page index, or removes
+    them without one.
+    """
+    feeds: dict[Path, Iterator[str] | None] = {
+        out_dir.joinpath("sitemap.xml"): None,
+        out_dir.joinpath("blog", "feed.xml"): None,
+    }
+    if page_index is not None:
+        feeds[out_dir.joinpath("sitemap.xml")] = page_index.iter_sitemap(
+            site_url, basepath
+        )
+        if page_index.has_section("blog"):
+            feeds[out_dir.joinpath("blog", "feed.xml")] = page_index.iter_feed(
+                site_url, basepath, "blog"
+            )
+        print(f"Page index: {page_index.summary()}")
+    for path, chunks in feeds.items():
+        change: Change | None = None
+        if chunks is not None:
+            links.add_output(path)
+            change = write_streamed(path, chunks)
+        elif path.is_file():
+            path.unlink()
+            change = Change.REMOVED
+        if change is not None:
+            report.record(path, change)
 
 
 def main() -> None:
-    basepath: str = sys.argv[1] if len(sys.argv) > 1 else "/"
-    copy_from_dir_to_dir(from_dir=STATIC, to_dir=DOCS)
+    args: argparse.Namespace = parse_args()
+    basepath: str = args.basepath
+    manifest: BuildManifest = BuildManifest(BUILD_MANIFEST)
+    profiler: Profiler | None = Profiler() if args.profile is not None else None
+    cache: PageCache | None = None if args.no_cache else PageCache(PAGE_CACHE)
+    memo: BlockMemo = BlockMemo()
+    graph: DependencyGraph = DependencyGraph(BUILD_GRAPH, DOCS)
+    report: BuildReport = BuildReport(DOCS)
+    links: LinkIndex = LinkIndex(BUILD_LINKS, DOCS, basepath)
+    search: SearchIndex | None = (
+        SearchIndex(SEARCH_CACHE, DOCS) if args.search else None
+    )
+    page_index: PageIndex | None = (
+        PageIndex(PAGE_METADATA, DOCS) if args.site_url is not None else None
+    )
+    if args.affected is not None:
+        for output in sorted(graph.affected(path.resolve() for path in args.affected)):
+            print(output)
+        return
+    if args.full:
+        manifest.clear()
+        graph.clear()
+        links.clear()
+        SEARCH_CACHE.unlink(missing_ok=True)
+        if search is not None:
+            search.clear()
+        PAGE_METADATA.unlink(missing_ok=True)
+        if page_index is not None:
+            page_index.clear()
+        BLOCK_MEMO.unlink(missing_ok=True)
+        CRITICAL_CSS.unlink(missing_ok=True)
+        for directory in (DOCS, PAGE_CACHE, ASSET_CACHE):
+            if directory.is_dir():
+                print(f"Removing dir {directory.name}/")
+                rmtree(directory)
+    if not args.no_cache:
+        memo.load(BLOCK_MEMO)
+
+    optimizer: PngOptimizer | None = (
+        PngOptimizer(ASSET_CACHE, workers=max(args.jobs, 1))
+        if args.optimize_images
+        else None
+    )
+    minifier: CssMinifier | None = CssMinifier(ASSET_CACHE) if args.minify else None
+    with span(profiler, "static"):
+        sync: SyncResult = sync_static(
+            from_dir=STATIC,
+            to_dir=DOCS,
+            manifest=manifest,
+            strategy=CopyStrategy(args.copy_strategy),
+            optimizer=optimizer,
+            fingerprint=args.fingerprint,
+            minifier=minifier,
+        )
+    if optimizer is not None:
+        print("Images:", optimizer.summary())
+    if minifier is not None:
+        print("Stylesheets:", minifier.summary())
+    report.record_sync(sync)
+    for dest in manifest.assets:
+        links.add_output(Path(dest))
+    graph.record_static(manifest.assets, sync.fingerprinted)
+    assets: AssetMap | None = None
+    asset_manifest: Path = DOCS.joinpath("asset-manifest.json")
+    if args.fingerprint:
+        assets = AssetMap(sync.fingerprinted)
+        links.add_output(asset_manifest)
+        change: Change | None = write_page(asset_manifest, assets.to_json())
+        if change is not None:
+            report.record(asset_manifest, change)
+    elif asset_manifest.is_file():
+        asset_manifest.unlink()
+        report.record(asset_manifest, Change.REMOVED)
+    inliner: CssInliner | None = None
+    if args.inline_css is not None:
+        inliner = CssInliner(
+            DOCS, used_only=args.inline_css == "used", basepath=basepath
+        )
+        if not args.no_cache:
+            inliner.load(CRITICAL_CSS)
     generate_pages_recursive(
-        from_dir=CONTENT, template_path=HTML_TEMPLATE, to_dir=DOCS, basepath=basepath
+        from_dir=CONTENT,
+        template_path=HTML_TEMPLATE,
+        to_dir=DOCS,
+        basepath=basepath,
+        manifest=manifest,
+        workers=max(args.jobs, 1),
+        profiler=profiler,
+        cache=cache,
+        memo=memo,
+        graph=graph,
+        pipeline_depth=args.pipeline,
+        report=report,
+        stream_threshold=args.stream_threshold * 2**20,
+        assets=assets,
+        minify=args.minify,
+        inliner=inliner,
+        links=links,
+        search=search,
+        page_index=page_index,
     )
+    for removed in manifest.prune_pages(DOCS):
+        graph.remove(removed)
+        report.record(removed, Change.REMOVED)
+    if cache is not None:
+        pruned: int = cache.prune(
+            entry["source_hash"] for entry in manifest.pages.values()
+        )
+        if pruned:
+            print(f"Pruned {pruned} stale page cache entries")
+    write_search_index(search, DOCS.joinpath("search"), basepath, report)
+    write_feeds(
+        page_index, (args.site_url or "").rstrip("/"), DOCS, basepath, links, report
+    )
+    encodings: list[Encoding] = []
+    if args.precompress is not None:
+        encodings = [Encoding(value) for value in args.precompress] or list(Encoding)
+        for encoding in encodings:
+            if not encoding.supported:
+                print(f"Skipping {encoding.value} sidecars, not supported here")
+        encodings = [encoding for encoding in encodings if encoding.supported]
+    with span(profiler, "precompress"):
+        compressed: PrecompressResult = precompress(
+            DOCS, encodings, manifest, workers=max(args.jobs, 1)
+        )
+    if encodings or compressed.removed:
+        print("Precompressed outputs:", compressed.summary())
+    report.record_precompress(compressed)
+    manifest.save()
+    graph.save()
+    links.save()
+    if search is not None:
+        search.save()
+    if page_index is not None:
+        page_index.save()
+    report.write_json(args.changes)
+    print(f"Outputs: {report.summary()}, listed in {args.changes}")
+    if not args.no_cache:
+        memo.save(BLOCK_MEMO)
+    if inliner is not None:
+        print("Critical CSS:", inliner.summary())
+        if not args.no_cache:
+            inliner.save(CRITICAL_CSS)
+
+    if profiler is not None:
+        print(profiler.summary())
+        profiler.write_chrome_trace(args.profile)
+        print(f"Wrote trace to {args.profile}")
+    if args.dump_graph is not None:
+        graph.dump(args.dump_graph)
+        print(f"Wrote dependency graph to {args.dump_graph}")
+
+    broken: dict[str, list[str]] = links.broken()
+    for page, urls in broken.items():
+        print(f"Broken links in {page}: {', '.join(urls)}")
+    count: int = sum(len(urls) for urls in broken.values())
+    print(f"Links: {links.checked()} checked, {count} broken")
+    if count and args.fail_on_broken_links:
+        raise ValueError(f"{count} broken link(s) in {len(broken)} page(s)")
 
 
 if __name__ == "__main__":
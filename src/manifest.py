@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+MANIFEST_VERSION: int = 1
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class BuildManifest:
+    """
+    Persistent record of the inputs and outputs of the last build.
+
+    Files are hashed at most once per change: the size and mtime of every hashed
+    file are stored next to its digest, and the digest is reused while they match.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        self.pages: dict[str, dict[str, str]] = {}
+        self.assets: dict[str, str] = {}
+        # Compressed sidecars written by precompress
+        self.sidecars: set[str] = set()
+        self._touched: set[str] = set()
+        self._seen_pages: set[str] = set()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("r") as manifest_file:
+                data: dict[str, Any] = json.load(manifest_file)
+        except OSError, ValueError:
+            print(f"Ignoring unreadable build manifest {self.path.name}")
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            print(f"Ignoring build manifest {self.path.name} from another version")
+            return
+        self.files = data.get("files", {})
+        self.pages = data.get("pages", {})
+        self.assets = data.get("assets", {})
+        self.sidecars = set(data.get("sidecars", []))
+
+    def save(self) -> None:
+        data: dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "files": {key: self.files[key] for key in sorted(self._touched)},
+            "pages": {key: self.pages[key] for key in sorted(self.pages)},
+            "assets": {key: self.assets[key] for key in sorted(self.assets)},
+            "sidecars": sorted(self.sidecars),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w") as manifest_file:
+            json.dump(data, manifest_file, indent=1)
+        _ = tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.files.clear()
+        self.pages.clear()
+        self.assets.clear()
+        self.sidecars.clear()
+
+    def digest(self, path: Path) -> str:
+        """Returns the sha256 of a file, rehashing only if its size or mtime changed."""
+        key: str = str(path)
+        stat: os.stat_result = path.stat()
+        self._touched.add(key)
+        entry: dict[str, Any] | None = self.files.get(key)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["hash"]
+
+        file_hash: str = file_digest(path)
+        self.files[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": file_hash,
+        }
+        return file_hash
+
+    def is_page_current(
+        self,
+        from_path: Path,
+        template_path: Path,
+        to_path: Path,
+        basepath: str,
+        asset_digest: str = "",
+        minify: bool = False,
+        styles_digest: str = "",
+    ) -> bool:
+        entry: dict[str, str] | None = self.pages.get(str(from_path))
+        if entry is None or not to_path.is_file():
+            return False
+        if (
+            entry["output"] != str(to_path)
+            or entry["basepath"] != basepath
+            or entry.get("asset_digest", "") != asset_digest
+            or entry.get("minify", "no") != ("yes" if minify else "no")
+            or entry.get("styles_digest", "") != styles_digest
+            or entry["source_hash"] != self.digest(from_path)
+            or entry["template_hash"] != self.digest(template_path)
+            or entry["output_hash"] != self.digest(to_path)
+        ):
+            return False
+        self._seen_pages.add(str(from_path))
+        return True
+
+    def record_page(
+        self,
+        from_path: Path,
+        template_path: Path,
+        to_path: Path,
+        basepath: str,
+        asset_digest: str = "",
+        minify: bool = False,
+        styles_digest: str = "",
+    ) -> None:
+        self.pages[str(from_path)] = {
+            "output": str(to_path),
+            "basepath": basepath,
+            "asset_digest": asset_digest,
+            "minify": "yes" if minify else "no",
+            "styles_digest": styles_digest,
+            "source_hash": self.digest(from_path),
+            "template_hash": self.digest(template_path),
+            "output_hash": self.digest(to_path),
+        }
+        self._seen_pages.add(str(from_path))
+
+    def prune_pages(self, to_dir: Path) -> list[Path]:
+        """Deletes outputs of pages whose source was not seen in this build."""
+        removed: list[Path] = []
+        for source in sorted(set(self.pages) - self._seen_pages):
+            output: Path = Path(self.pages.pop(source)["output"])
+            if output.is_file():
+                print(f"Removing stale page {output.name}, {source} no longer exists")
+                output.unlink()
+                removed.append(output)
+                _remove_empty_dirs(output.parent, to_dir)
+        return removed
+
+
+def _remove_empty_dirs(directory: Path, stop_at: Path) -> None:
+    while directory != stop_at and directory.is_relative_to(stop_at):
+        if any(directory.iterdir()):
+            return
+        directory.rmdir()
+        directory = directory.parent
@@ -0,0 +1,218 @@
+import hashlib
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+# Bump when a change to minify_css changes its output.
+MINIFIER_VERSION: str = "1"
+
+TAG_RGX = re.compile(r"(<!--.*?-->|<[^>]*>)", re.DOTALL)
+TAG_NAME_RGX = re.compile(r"<\s*(/?)\s*([!a-zA-Z][^\s/>]*)")
+
+# Elements whose content is kept byte for byte
+RAW_TAGS: frozenset[str] = frozenset({"pre", "textarea", "script", "style"})
+
+# Elements that are not laid out inline, so whitespace next to their tags
+# never renders and is dropped
+BLOCK_TAGS: frozenset[str] = frozenset(
+    {
+        "!doctype",
+        "html",
+        "head",
+        "body",
+        "title",
+        "meta",
+        "link",
+        "base",
+        "script",
+        "style",
+        "noscript",
+        "template",
+        "article",
+        "aside",
+        "blockquote",
+        "dd",
+        "details",
+        "div",
+        "dl",
+        "dt",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hr",
+        "li",
+        "main",
+        "nav",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "summary",
+        "table",
+        "tbody",
+        "td",
+        "tfoot",
+        "th",
+        "thead",
+        "tr",
+        "ul",
+    }
+)
+
+CSS_TOKEN_RGX = re.compile(
+    r"""("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|/\*.*?\*/)""", re.DOTALL
+)
+CSS_PUNCTUATION_RGX = re.compile(r"\s*([{};,>])\s*")
+
+
+def _tag_name(tag: str) -> tuple[bool, str]:
+    """Returns whether tag is a closing tag, and its lowercase name."""
+    match: re.Match[str] | None = TAG_NAME_RGX.match(tag)
+    if match is None:
+        return False, ""
+    return match.group(1) == "/", match.group(2).lower()
+
+
+def _collapse(text: str, before: str | None, after: str | None) -> str:
+    """
+    Collapses the whitespace of the text between the tags named before and
+    after, None standing for the edge of a segment.
+    """
+    collapsed: str = re.sub(r"\s+", " ", text)
+    if before in BLOCK_TAGS:
+        collapsed = collapsed.lstrip(" ")
+    if after in BLOCK_TAGS:
+        collapsed = collapsed.rstrip(" ")
+    return collapsed
+
+
+def minify_segments(segments: list[str]) -> list[str]:
+    """
+    Minifies the literal segments of an HTML template, in order.
+
+    Comments are dropped, whitespace runs collapse to one space and whitespace
+    next to block-level tags is dropped. The content of pre, textarea, script
+    and style elements is kept as is, also when it spans several segments.
+    """
+    raw: str | None = None
+    minified: list[str] = []
+    for segment in segments:
+        pieces: list[str] = []
+        pending: str = ""
+        before: str | None = None
+        for position, token in enumerate(TAG_RGX.split(segment)):
+            is_tag: bool = position % 2 == 1
+            if raw is not None:
+                pieces.append(token)
+                if is_tag and _tag_name(token) == (True, raw):
+                    before, raw = raw, None
+                continue
+            if not is_tag:
+                pending += token
+                continue
+            if token.startswith("<!--") and not token.startswith("<!--[if"):
+                continue
+            closing, name = _tag_name(token)
+            pieces.append(_collapse(pending, before, name))
+            pieces.append(token)
+            pending = ""
+            before = name
+            if not closing and name in RAW_TAGS and not token.endswith("/>"):
+                raw = name
+        pieces.append(_collapse(pending, before, None))
+        minified.append("".join(pieces))
+    return minified
+
+
+def minify_css(source: str) -> str:
+    """
+    Drops the comments and insignificant whitespace of a stylesheet. Strings
+    and '/*!' comments are kept as is.
+    """
+    parts: list[str] = []
+    for position, token in enumerate(CSS_TOKEN_RGX.split(source)):
+        comment: bool = position % 2 == 1 and token.startswith("/*")
+        if comment and not token.startswith("/*!"):
+            parts.append(" ")
+        else:
+            parts.append(token)
+    uncommented: str = "".join(parts)
+
+    parts = []
+    for position, token in enumerate(CSS_TOKEN_RGX.split(uncommented)):
+        if position % 2 == 1:
+            parts.append(token)
+            continue
+        code: str = re.sub(r"\s+", " ", token)
+        code = CSS_PUNCTUATION_RGX.sub(r"\1", code)
+        code = re.sub(r":\s+", ":", code)
+        parts.append(code.replace(";}", "}"))
+    return "".join(parts).strip()
+
+
+class CssMinifier:
+    """
+    Minifies stylesheets into a content-addressed cache.
+
+    Minified files are stored under the sha256 of their source and
+    MINIFIER_VERSION, so each distinct stylesheet is minified once across builds.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory: Path = directory
+        # Source path -> (source size, minified size) of files minified so far
+        self.sizes: dict[Path, tuple[int, int]] = {}
+        self.cached: int = 0
+
+    @staticmethod
+    def accepts(source: Path) -> bool:
+        return source.suffix.lower() == ".css"
+
+    def cached_path(self, source_hash: str) -> Path:
+        key: str = hashlib.sha256(
+            f"{MINIFIER_VERSION}:{source_hash}".encode()
+        ).hexdigest()
+        return self.directory.joinpath(key[:2], f"{key}.css")
+
+    def prepare(
+        self, sources: list[Path], digest: Callable[[Path], str]
+    ) -> dict[Path, Path]:
+        """Returns the minified file of every source, minifying uncached ones."""
+        minified: dict[Path, Path] = {}
+        for source in sources:
+            cached: Path = self.cached_path(digest(source))
+            minified[source] = cached
+            if cached.is_file():
+                self.cached += 1
+                continue
+            data: bytes = source.read_bytes()
+            result: bytes
+            try:
+                result = minify_css(data.decode()).encode()
+            except UnicodeDecodeError:
+                print(f"Not minifying {source.name}: not UTF-8")
+                result = data
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path: Path = cached.with_name(cached.name + ".tmp")
+            _ = tmp_path.write_bytes(result)
+            _ = tmp_path.replace(cached)
+            print(f"Minified {source.name}: {len(data)} -> {len(result)} bytes")
+            self.sizes[source] = (len(data), len(result))
+        return minified
+
+    def summary(self) -> str:
+        before: int = sum(size for size, _ in self.sizes.values())
+        after: int = sum(size for _, size in self.sizes.values())
+        return (
+            f"{len(self.sizes)} minified, {self.cached} cached, "
+            + f"{before - after} bytes saved "
+            + f"({(before - after) / max(before, 1):.1%})"
+        )
@@ -0,0 +1,71 @@
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from constants import PARSER_VERSION
+
+
+class PageCache:
+    """
+    On-disk cache of rendered page bodies and titles.
+
+    Entries are keyed by the sha256 of the markdown source and PARSER_VERSION.
+    A body is stored as the fragments between the places its basepath goes, so
+    a cached body can be stitched into any template and basepath without
+    parsing the markdown again. Entries of sources no longer built are removed
+    by prune.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory: Path = directory
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def _entry_path(self, source_hash: str) -> Path:
+        key: str = hashlib.sha256(
+            f"{PARSER_VERSION}:{source_hash}".encode()
+        ).hexdigest()
+        return self.directory.joinpath(key[:2], f"{key}.json")
+
+    def get(self, source_hash: str) -> tuple[str, list[str]] | None:
+        entry_path: Path = self._entry_path(source_hash)
+        try:
+            with entry_path.open("r") as entry_file:
+                entry: dict[str, Any] = json.load(entry_file)
+        except OSError, ValueError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["title"], entry["body"]
+
+    def put(self, source_hash: str, title: str, fragments: list[str]) -> None:
+        entry_path: Path = self._entry_path(source_hash)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = entry_path.with_name(entry_path.name + ".tmp")
+        with tmp_path.open("w") as entry_file:
+            json.dump({"title": title, "body": fragments}, entry_file)
+        _ = tmp_path.replace(entry_path)
+
+    def prune(self, source_hashes: Iterable[str]) -> int:
+        """Removes the entries of every other source. Returns how many."""
+        kept: set[Path] = {
+            self._entry_path(source_hash) for source_hash in source_hashes
+        }
+        removed: int = 0
+        if not self.directory.is_dir():
+            return removed
+        for shard in sorted(self.directory.iterdir()):
+            if not shard.is_dir():
+                continue
+            for entry_path in sorted(shard.iterdir()):
+                if entry_path not in kept:
+                    entry_path.unlink()
+                    removed += 1
+            if not any(shard.iterdir()):
+                shard.rmdir()
+        return removed
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
@@ -0,0 +1,197 @@
+import html
+import json
+import re
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from xml.sax.saxutils import escape, quoteattr
+
+from search_index import page_url
+
+PAGE_INDEX_VERSION: int = 1
+
+PARAGRAPH_RGX = re.compile(r"<p>(.*?)</p>", re.DOTALL)
+LINK_RGX = re.compile(r"<a\b[^>]*>.*?</a>", re.DOTALL)
+TAG_RGX = re.compile(r"<[^>]*>")
+
+
+def paragraph_text(html_text: str) -> str:
+    """The text of inline HTML, with whitespace runs collapsed."""
+    return " ".join(html.unescape(TAG_RGX.sub("", html_text)).split())
+
+
+def _first_paragraph(html_text: str) -> tuple[str | None, str]:
+    """
+    Returns the text of the first paragraph of html_text with text outside of
+    links, or None if there is none yet, and the rest of html_text where it
+    may still start.
+    """
+    end: int = 0
+    for match in PARAGRAPH_RGX.finditer(html_text):
+        if paragraph_text(LINK_RGX.sub("", match.group(1))):
+            return paragraph_text(match.group(1)), ""
+        end = match.end()
+    start: int = html_text.find("<p>", end)
+    return None, html_text[start if start >= 0 else max(end, len(html_text) - 2) :]
+
+
+def first_paragraph(html_text: str) -> str:
+    """
+    The text of the first paragraph of an HTML body, skipping paragraphs of
+    only links and images such as back links.
+    """
+    text, _ = _first_paragraph(html_text)
+    return text or ""
+
+
+def iso_time(mtime: float) -> str:
+    return datetime.fromtimestamp(int(mtime), UTC).isoformat()
+
+
+class PageIndex:
+    """
+    The output URL, title, source mtime and first paragraph of every page,
+    from which the sitemap and the feed are written.
+
+    Pages are recorded from their rendered body as they are written, and the
+    entries are kept across builds, so pages skipped as unchanged keep theirs
+    and only the entries of rewritten pages are updated.
+    """
+
+    def __init__(self, path: Path, out_dir: Path) -> None:
+        self.path: Path = path
+        self.out_dir: Path = out_dir
+        # Page outputs of this build, relative to out_dir
+        self.pages: set[str] = set()
+        # Page -> title, mtime and summary
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.recorded: int = 0
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("r") as index_file:
+                data: dict[str, Any] = json.load(index_file)
+        except OSError, ValueError:
+            print(f"Ignoring unreadable page index {self.path.name}")
+            return
+        if data.get("version") != PAGE_INDEX_VERSION:
+            return
+        self.entries = data.get("entries", {})
+
+    def save(self) -> None:
+        """Saves the entries of the pages that are still outputs."""
+        data: dict[str, Any] = {
+            "version": PAGE_INDEX_VERSION,
+            "entries": {
+                page: self.entries[page]
+                for page in sorted(self.pages & set(self.entries))
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w") as index_file:
+            json.dump(data, index_file, indent=1)
+        _ = tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.pages.clear()
+        self.entries.clear()
+
+    def _relative(self, path: Path) -> str:
+        return path.relative_to(self.out_dir).as_posix()
+
+    def add_page(self, path: Path) -> None:
+        self.pages.add(self._relative(path))
+
+    def has_page(self, page: Path) -> bool:
+        return self._relative(page) in self.entries
+
+    def _store(self, page: Path, source: Path, title: str, summary: str) -> None:
+        self.entries[self._relative(page)] = {
+            "title": title,
+            "mtime": source.stat().st_mtime,
+            "summary": summary,
+        }
+        self.recorded += 1
+
+    def record(self, page: Path, source: Path, title: str, body: str) -> None:
+        """Replaces the entry of page, rendered from source, with body."""
+        self._store(page, source, title, first_paragraph(body))
+
+    def tap(
+        self, page: Path, source: Path, title: str, chunks: Iterable[str]
+    ) -> Iterator[str]:
+        """Yields the chunks of the body of page, recording its entry on the way."""
+        summary: str | None = None
+        pending: str = ""
+        for chunk in chunks:
+            if summary is None:
+                summary, pending = _first_paragraph(pending + chunk)
+            yield chunk
+        self._store(page, source, title, summary or "")
+
+    def _live(self, prefix: str = "") -> list[tuple[str, dict[str, Any]]]:
+        return [
+            (page, self.entries[page])
+            for page in sorted(self.pages & set(self.entries))
+            if page.startswith(prefix)
+        ]
+
+    def iter_sitemap(self, site_url: str, basepath: str) -> Iterator[str]:
+        """Yields the sitemap.xml of the pages, by URL."""
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for page, entry in self._live():
+            yield (
+                f"<url><loc>{escape(site_url + page_url(page, basepath))}</loc>"
+                + f"<lastmod>{iso_time(entry['mtime'])}</lastmod></url>\n"
+            )
+        yield "</urlset>\n"
+
+    def has_section(self, section: str) -> bool:
+        return any(
+            page != f"{section}/index.html" for page, _ in self._live(f"{section}/")
+        )
+
+    def iter_feed(self, site_url: str, basepath: str, section: str) -> Iterator[str]:
+        """
+        Yields an Atom feed of the pages under section/, its index page aside,
+        newest first. The feed is titled after the home page.
+        """
+        home: dict[str, Any] = self.entries.get("index.html", {})
+        site_title: str = home.get("title", site_url)
+        entries: list[tuple[str, dict[str, Any]]] = sorted(
+            (
+                (page, entry)
+                for page, entry in self._live(f"{section}/")
+                if page != f"{section}/index.html"
+            ),
+            key=lambda item: (-item[1]["mtime"], item[0]),
+        )
+        feed_url: str = site_url + page_url(f"{section}/feed.xml", basepath)
+        section_url: str = site_url + page_url(f"{section}/index.html", basepath)
+        updated: float = max((entry["mtime"] for _, entry in entries), default=0)
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        yield f"<title>{escape(site_title)}</title>\n"
+        yield f"<id>{escape(section_url)}</id>\n"
+        yield f'<link href={quoteattr(feed_url)} rel="self"/>\n'
+        yield f"<link href={quoteattr(section_url)}/>\n"
+        yield f"<updated>{iso_time(updated)}</updated>\n"
+        yield f"<author><name>{escape(site_title)}</name></author>\n"
+        for page, entry in entries:
+            url: str = site_url + page_url(page, basepath)
+            yield (
+                f"<entry><title>{escape(entry['title'])}</title>"
+                + f"<link href={quoteattr(url)}/><id>{escape(url)}</id>"
+                + f"<updated>{iso_time(entry['mtime'])}</updated>"
+                + f"<summary>{escape(entry['summary'])}</summary></entry>\n"
+            )
+        yield "</feed>\n"
+
+    def summary(self) -> str:
+        return f"{len(self.pages)} pages, {self.recorded} recorded"
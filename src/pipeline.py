@@ -0,0 +1,74 @@
+import asyncio
+from collections.abc import Callable, Sequence
+
+DEFAULT_DEPTH: int = 4
+
+
+def run_pipeline[T, R, H](
+    items: Sequence[T],
+    read: Callable[[T], R],
+    render: Callable[[T, R], H],
+    write: Callable[[T, H], None],
+    depth: int = DEFAULT_DEPTH,
+) -> list[tuple[T, Exception]]:
+    """
+    Runs read, render and write over items as three overlapping stages.
+
+    Each stage handles one item at a time in a worker thread, and the stages
+    are connected by queues holding at most depth items, so reading the next
+    item and writing the previous one happen while the current one renders.
+    Items are written in order. An item failing in any stage with an OSError
+    or a ValueError, UnicodeDecodeError included, is dropped from the later
+    stages; those failures are returned instead of raised. Any other
+    exception is a bug and propagates.
+    """
+    if depth < 1:
+        raise ValueError("Pipeline depth must be at least 1")
+    return asyncio.run(_run_pipeline(items, read, render, write, depth))
+
+
+async def _run_pipeline[T, R, H](
+    items: Sequence[T],
+    read: Callable[[T], R],
+    render: Callable[[T, R], H],
+    write: Callable[[T, H], None],
+    depth: int,
+) -> list[tuple[T, Exception]]:
+    # Entries carry the item's position so failures can be reported in order;
+    # None ends a stage's input.
+    read_queue: asyncio.Queue[tuple[int, R] | None] = asyncio.Queue(depth)
+    write_queue: asyncio.Queue[tuple[int, H] | None] = asyncio.Queue(depth)
+    errors: list[tuple[int, Exception]] = []
+
+    async def reader() -> None:
+        for position, item in enumerate(items):
+            try:
+                data: R = await asyncio.to_thread(read, item)
+            except (OSError, ValueError) as error:
+                errors.append((position, error))
+                continue
+            await read_queue.put((position, data))
+        await read_queue.put(None)
+
+    async def renderer() -> None:
+        while (entry := await read_queue.get()) is not None:
+            position, data = entry
+            try:
+                output: H = await asyncio.to_thread(render, items[position], data)
+            except (OSError, ValueError) as error:
+                errors.append((position, error))
+                continue
+            await write_queue.put((position, output))
+        await write_queue.put(None)
+
+    async def writer() -> None:
+        while (entry := await write_queue.get()) is not None:
+            position, output = entry
+            try:
+                await asyncio.to_thread(write, items[position], output)
+            except (OSError, ValueError) as error:
+                errors.append((position, error))
+
+    _ = await asyncio.gather(reader(), renderer(), writer())
+    errors.sort(key=lambda error: error[0])
+    return [(items[position], error) for position, error in errors]
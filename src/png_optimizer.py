@@ -0,0 +1,192 @@
+import hashlib
+import struct
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Bump when a change to optimize_png changes its output.
+OPTIMIZER_VERSION: str = "2"
+
+PNG_SIGNATURE: bytes = b"\x89PNG\r\n\x1a\n"
+
+# Chunks that change how an image is displayed, including EXIF orientation
+# and HDR colour information; every other ancillary chunk (text, timestamps,
+# physical size, ...) is dropped.
+KEPT_CHUNKS: frozenset[bytes] = frozenset(
+    {
+        b"IHDR",
+        b"PLTE",
+        b"tRNS",
+        b"gAMA",
+        b"cHRM",
+        b"sRGB",
+        b"iCCP",
+        b"sBIT",
+        b"eXIf",
+        b"cICP",
+        b"mDCV",
+        b"cLLI",
+        b"IDAT",
+        b"IEND",
+    }
+)
+
+# Animated PNGs number their frame chunks, they are left untouched.
+ANIMATION_CHUNKS: frozenset[bytes] = frozenset({b"acTL", b"fcTL", b"fdAT"})
+
+# zlib strategies tried on the image data; the smallest result is kept.
+DEFLATE_STRATEGIES: tuple[int, ...] = (
+    zlib.Z_DEFAULT_STRATEGY,
+    zlib.Z_FILTERED,
+    zlib.Z_RLE,
+)
+
+
+def read_chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    """Splits a PNG into (type, data) chunks, checking the signature and CRCs."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    chunks: list[tuple[bytes, bytes]] = []
+    offset: int = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            raise ValueError("Truncated PNG chunk")
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        if offset + 12 + length > len(data):
+            raise ValueError(f"Truncated PNG chunk {chunk_type!r}")
+        chunk_data: bytes = data[offset + 8 : offset + 8 + length]
+        (crc,) = struct.unpack_from(">I", data, offset + 8 + length)
+        if zlib.crc32(chunk_type + chunk_data) != crc:
+            raise ValueError(f"Corrupt PNG chunk {chunk_type!r}")
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+        if chunk_type == b"IEND":
+            break
+    if not chunks or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        raise ValueError("PNG must start with IHDR and end with IEND")
+    return chunks
+
+
+def write_chunk(chunk_type: bytes, chunk_data: bytes) -> bytes:
+    crc: int = zlib.crc32(chunk_type + chunk_data)
+    return (
+        struct.pack(">I4s", len(chunk_data), chunk_type)
+        + chunk_data
+        + struct.pack(">I", crc)
+    )
+
+
+def deflate(raw: bytes, level: int = 9) -> bytes:
+    candidates: list[bytes] = []
+    for strategy in DEFLATE_STRATEGIES:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        candidates.append(compressor.compress(raw) + compressor.flush())
+    return min(candidates, key=len)
+
+
+def optimize_png(data: bytes, level: int = 9) -> bytes:
+    """
+    Losslessly shrinks a PNG: drops ancillary chunks that do not affect
+    rendering and re-deflates the image data as a single IDAT chunk.
+
+    The pixels, filters and colour information are unchanged. Returns data
+    itself if the result would not be smaller or the image is animated.
+    """
+    chunks: list[tuple[bytes, bytes]] = read_chunks(data)
+    if any(chunk_type in ANIMATION_CHUNKS for chunk_type, _ in chunks):
+        return data
+
+    image_data: bytes = b"".join(
+        chunk_data for chunk_type, chunk_data in chunks if chunk_type == b"IDAT"
+    )
+    idat: bytes = write_chunk(b"IDAT", deflate(zlib.decompress(image_data), level))
+    parts: list[bytes] = [PNG_SIGNATURE]
+    for chunk_type, chunk_data in chunks:
+        if chunk_type == b"IDAT":
+            # The image data goes where the first of the consecutive IDATs was
+            if idat:
+                parts.append(idat)
+                idat = b""
+        elif chunk_type in KEPT_CHUNKS:
+            parts.append(write_chunk(chunk_type, chunk_data))
+    optimized: bytes = b"".join(parts)
+    return optimized if len(optimized) < len(data) else data
+
+
+class PngOptimizer:
+    """
+    Optimizes PNG files into a content-addressed cache.
+
+    Optimized files are stored under the sha256 of their source and
+    OPTIMIZER_VERSION, so each distinct image is optimized once across builds.
+    Images that cannot be parsed are cached unchanged.
+    """
+
+    def __init__(self, directory: Path, workers: int | None = None) -> None:
+        self.directory: Path = directory
+        self.workers: int | None = workers
+        # Source path -> (source size, optimized size) of images optimized so far
+        self.sizes: dict[Path, tuple[int, int]] = {}
+        self.cached: int = 0
+
+    @staticmethod
+    def accepts(source: Path) -> bool:
+        return source.suffix.lower() == ".png"
+
+    def cached_path(self, source_hash: str) -> Path:
+        key: str = hashlib.sha256(
+            f"{OPTIMIZER_VERSION}:{source_hash}".encode()
+        ).hexdigest()
+        return self.directory.joinpath(key[:2], f"{key}.png")
+
+    def prepare(
+        self, sources: list[Path], digest: Callable[[Path], str]
+    ) -> dict[Path, Path]:
+        """
+        Returns the optimized file of every source, optimizing the ones not yet
+        cached in parallel.
+        """
+        optimized: dict[Path, Path] = {
+            source: self.cached_path(digest(source)) for source in sources
+        }
+        missing: list[Path] = [
+            source for source, cached in optimized.items() if not cached.is_file()
+        ]
+        self.cached += len(sources) - len(missing)
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                jobs: list[tuple[Path, Path]] = [
+                    (source, optimized[source]) for source in missing
+                ]
+                for source, sizes in zip(missing, pool.map(self._optimize, jobs)):
+                    self.sizes[source] = sizes
+        return optimized
+
+    def _optimize(self, job: tuple[Path, Path]) -> tuple[int, int]:
+        source, cached = job
+        data: bytes = source.read_bytes()
+        try:
+            result: bytes = optimize_png(data)
+        except (ValueError, zlib.error) as error:
+            print(f"Not optimizing {source.name}: {error}")
+            result = data
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = cached.with_name(cached.name + ".tmp")
+        _ = tmp_path.write_bytes(result)
+        _ = tmp_path.replace(cached)
+        saved: int = len(data) - len(result)
+        print(
+            f"Optimized {source.name}: {len(data)} -> {len(result)} bytes, "
+            + f"{saved} saved ({saved / max(len(data), 1):.1%})"
+        )
+        return len(data), len(result)
+
+    def summary(self) -> str:
+        before: int = sum(size for size, _ in self.sizes.values())
+        after: int = sum(size for _, size in self.sizes.values())
+        return (
+            f"{len(self.sizes)} optimized, {self.cached} cached, "
+            + f"{before - after} bytes saved "
+            + f"({(before - after) / max(before, 1):.1%})"
+        )
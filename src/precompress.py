@@ -0,0 +1,147 @@
+import gzip
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO
+
+from manifest import BuildManifest
+
+try:
+    from compression import zstd
+except ImportError:  # Python before 3.14, zstd sidecars are skipped
+    zstd = None
+
+# Outputs served as text, the only ones worth precompressing
+COMPRESSIBLE_SUFFIXES: frozenset[str] = frozenset(
+    {".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".xml", ".txt"}
+)
+
+# Outputs smaller than this gain nothing from compression and get no sidecars
+MIN_SIZE: int = 256
+
+GZIP_LEVEL: int = 9
+ZSTD_LEVEL: int = 19
+
+CHUNK_SIZE: int = 2**20
+
+
+class Encoding(Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+    @property
+    def suffix(self) -> str:
+        return ".gz" if self is Encoding.GZIP else ".zst"
+
+    @property
+    def supported(self) -> bool:
+        return self is Encoding.GZIP or zstd is not None
+
+    def sidecar(self, path: Path) -> Path:
+        return path.with_name(path.name + self.suffix)
+
+
+class PrecompressResult:
+    def __init__(self) -> None:
+        self.written: list[Path] = []
+        # The written sidecars that did not exist before
+        self.added: list[Path] = []
+        self.removed: list[Path] = []
+        self.unchanged: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.written)} written, {self.unchanged} unchanged, "
+            + f"{len(self.removed)} removed"
+        )
+
+
+def compressible(path: Path) -> bool:
+    return path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+def compress_file(source: Path, dest: Path, encoding: Encoding) -> None:
+    """
+    Atomically replaces dest with source compressed with encoding, giving it
+    the mtime of source. The output does not depend on when or where it is
+    written, so unchanged sources compress to identical sidecars.
+    """
+    tmp_path: Path = dest.with_name(dest.name + ".tmp")
+    with source.open("rb") as source_file, tmp_path.open("wb") as raw:
+        compressed: BinaryIO
+        if encoding is Encoding.GZIP:
+            compressed = gzip.GzipFile(
+                filename="", mode="wb", compresslevel=GZIP_LEVEL, fileobj=raw, mtime=0
+            )
+        else:
+            if zstd is None:
+                raise ValueError("zstd compression needs Python 3.14 or later")
+            compressed = zstd.ZstdFile(raw, "wb", level=ZSTD_LEVEL)
+        with compressed:
+            shutil.copyfileobj(source_file, compressed, CHUNK_SIZE)
+    source_mtime_ns: int = source.stat().st_mtime_ns
+    os.utime(tmp_path, ns=(source_mtime_ns, source_mtime_ns))
+    _ = tmp_path.replace(dest)
+
+
+def precompress(
+    out_dir: Path,
+    encodings: list[Encoding],
+    manifest: BuildManifest,
+    workers: int | None = None,
+) -> PrecompressResult:
+    """
+    Writes a sidecar per encoding (index.html.gz, index.html.zst) next to every
+    compressible output in out_dir, for servers that serve precompressed files.
+
+    A sidecar carries the mtime of its output and is rewritten only when they
+    differ, so only outputs written since the last build are compressed, by up
+    to workers threads. Sidecars are recorded in the manifest, and the ones it
+    recorded that this build did not want are removed. Static files are never
+    written or removed.
+    """
+    result: PrecompressResult = PrecompressResult()
+    wanted: set[str] = set()
+    to_compress: list[tuple[Path, Path, Encoding]] = []
+    outputs: list[Path] = []
+    if encodings and out_dir.is_dir():
+        outputs = sorted(out_dir.rglob("*"))
+    for path in outputs:
+        if (
+            not compressible(path)
+            or not path.is_file()
+            or path.stat().st_size < MIN_SIZE
+        ):
+            continue
+        mtime_ns: int = path.stat().st_mtime_ns
+        for encoding in encodings:
+            sidecar: Path = encoding.sidecar(path)
+            if str(sidecar) in manifest.assets:
+                continue
+            wanted.add(str(sidecar))
+            if sidecar.is_file() and sidecar.stat().st_mtime_ns == mtime_ns:
+                result.unchanged += 1
+                continue
+            if not sidecar.exists():
+                result.added.append(sidecar)
+            to_compress.append((path, sidecar, encoding))
+
+    for name in sorted(manifest.sidecars - wanted - set(manifest.assets)):
+        stale: Path = Path(name)
+        if stale.is_file():
+            print(f"Removing sidecar {stale.name}")
+            stale.unlink()
+            result.removed.append(stale)
+    manifest.sidecars = wanted
+
+    def compress(job: tuple[Path, Path, Encoding]) -> Path:
+        source, sidecar, encoding = job
+        compress_file(source, sidecar, encoding)
+        return sidecar
+
+    if to_compress:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            result.written.extend(pool.map(compress, to_compress))
+    return result
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any
+
+# (stage, page, start_ns, end_ns, pid, tid)
+type Span = tuple[str, str, int, int, int, int]
+
+
+class Profiler:
+    """
+    Records timed spans per build stage and page.
+
+    Timestamps come from time.perf_counter_ns, which is system-wide on Linux, so
+    spans recorded in pool workers can be merged with the parent's.
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    @contextmanager
+    def span(self, stage: str, page: str = "") -> Iterator[None]:
+        start: int = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.spans.append(
+                (
+                    stage,
+                    page,
+                    start,
+                    time.perf_counter_ns(),
+                    os.getpid(),
+                    threading.get_native_id(),
+                )
+            )
+
+    def extend(self, spans: list[Span]) -> None:
+        self.spans.extend(spans)
+
+    def summary(self, slowest: int = 10) -> str:
+        stages: dict[str, list[int]] = {}
+        pages: dict[str, int] = {}
+        for stage, page, start, end, _, _ in self.spans:
+            stages.setdefault(stage, []).append(end - start)
+            if page:
+                pages[page] = pages.get(page, 0) + end - start
+        total: int = sum(sum(durations) for durations in stages.values()) or 1
+
+        lines: list[str] = [
+            f"{'stage':<12}{'count':>8}{'total ms':>12}{'mean ms':>10}"
+            + f"{'max ms':>10}{'share':>8}"
+        ]
+        for stage, durations in sorted(stages.items(), key=lambda item: -sum(item[1])):
+            lines.append(
+                f"{stage:<12}{len(durations):>8}{sum(durations) / 1e6:>12.2f}"
+                + f"{sum(durations) / len(durations) / 1e6:>10.3f}"
+                + f"{max(durations) / 1e6:>10.3f}{sum(durations) / total:>8.1%}"
+            )
+        if pages:
+            lines.append("\nSlowest pages (all stages):")
+            ranked: list[tuple[str, int]] = sorted(
+                pages.items(), key=lambda item: -item[1]
+            )
+            for page, duration in ranked[:slowest]:
+                lines.append(f"{duration / 1e6:>10.2f} ms  {page}")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Writes the spans as Chrome trace events (chrome://tracing, Perfetto)."""
+        origin: int = min((span[2] for span in self.spans), default=0)
+        events: list[dict[str, Any]] = [
+            {
+                "name": f"{stage} {Path(page).name}" if page else stage,
+                "cat": stage,
+                "ph": "X",
+                "ts": (start - origin) / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": pid,
+                "tid": tid,
+                "args": {"page": page} if page else {},
+            }
+            for stage, page, start, end, pid, tid in self.spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def span(
+    profiler: Profiler | None, stage: str, page: str = ""
+) -> AbstractContextManager[None]:
+    """Returns a span of the profiler, or a no-op context when profiling is off."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(stage, page)
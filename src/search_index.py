@@ -0,0 +1,213 @@
+import html
+import json
+import re
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+SEARCH_INDEX_VERSION: int = 1
+
+# Terms are sharded by their first SHARD_PREFIX_LENGTH characters
+SHARD_PREFIX_LENGTH: int = 2
+
+# An occurrence in the title counts this many times one in the body
+TITLE_WEIGHT: int = 10
+
+MIN_TERM_LENGTH: int = 2
+
+STOP_WORDS: frozenset[str] = frozenset(
+    {
+        "an",
+        "and",
+        "are",
+        "as",
+        "at",
+        "be",
+        "by",
+        "for",
+        "from",
+        "in",
+        "is",
+        "it",
+        "of",
+        "on",
+        "or",
+        "that",
+        "the",
+        "this",
+        "to",
+        "was",
+        "with",
+    }
+)
+
+TAG_RGX = re.compile(r"<[^>]*>")
+TERM_RGX = re.compile(r"\w+")
+# The last tag end or whitespace of a chunk, after which a term may continue
+LAST_BREAK_RGX = re.compile(r"[\s>][^\s>]*\Z")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Yields the lowercase terms of plain text, without stop words."""
+    for term in TERM_RGX.findall(text.lower()):
+        if len(term) >= MIN_TERM_LENGTH and term not in STOP_WORDS:
+            yield term
+
+
+def html_terms(html_text: str) -> Counter[str]:
+    """Counts the terms of the text of an HTML fragment."""
+    return Counter(tokenize(html.unescape(TAG_RGX.sub(" ", html_text))))
+
+
+def page_url(page: str, basepath: str) -> str:
+    """The URL a page is served at, 'blog/index.html' -> '<basepath>blog/'."""
+    if page == "index.html":
+        return basepath
+    if page.endswith("/index.html"):
+        return basepath + page.removesuffix("index.html")
+    return basepath + page
+
+
+class SearchIndex:
+    """
+    An inverted index of the pages of the site, written as JSON shards that a
+    browser loads by term prefix.
+
+    Pages are tokenized from their rendered body as they are written, and their
+    terms are kept across builds, so pages skipped as unchanged are not
+    tokenized again. Page ids are kept too, so shards whose terms did not
+    change stay identical.
+
+    The index is written to a directory holding index.json, with the version,
+    prefix length, shard names and the [url, title] of every page id (null for
+    unused ids), and one '<prefix>.json' per shard mapping each term to its
+    [page id, score] pairs by decreasing score.
+    """
+
+    def __init__(self, path: Path, out_dir: Path) -> None:
+        self.path: Path = path
+        self.out_dir: Path = out_dir
+        # Page outputs of this build, relative to out_dir
+        self.pages: set[str] = set()
+        # Page -> title and term scores
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.ids: dict[str, int] = {}
+        self.tokenized: int = 0
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with self.path.open("r") as index_file:
+                data: dict[str, Any] = json.load(index_file)
+        except OSError, ValueError:
+            print(f"Ignoring unreadable search index {self.path.name}")
+            return
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return
+        self.entries = data.get("entries", {})
+        self.ids = data.get("ids", {})
+
+    def save(self) -> None:
+        """Saves the entries and ids of the pages that are still outputs."""
+        data: dict[str, Any] = {
+            "version": SEARCH_INDEX_VERSION,
+            "ids": {
+                page: self.ids[page] for page in sorted(self.pages & set(self.ids))
+            },
+            "entries": {
+                page: self.entries[page]
+                for page in sorted(self.pages & set(self.entries))
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w") as index_file:
+            json.dump(data, index_file)
+        _ = tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.pages.clear()
+        self.entries.clear()
+        self.ids.clear()
+
+    def _relative(self, path: Path) -> str:
+        return path.relative_to(self.out_dir).as_posix()
+
+    def add_page(self, path: Path) -> None:
+        self.pages.add(self._relative(path))
+
+    def has_page(self, page: Path) -> bool:
+        return self._relative(page) in self.entries
+
+    def _store(self, page: Path, title: str, terms: Counter[str]) -> None:
+        for term in tokenize(title):
+            terms[term] += TITLE_WEIGHT
+        self.entries[self._relative(page)] = {"title": title, "terms": dict(terms)}
+        self.tokenized += 1
+
+    def record(self, page: Path, title: str, body: str) -> None:
+        """Replaces the entry of page with the terms of its title and body."""
+        self._store(page, title, html_terms(body))
+
+    def tap(self, page: Path, title: str, chunks: Iterable[str]) -> Iterator[str]:
+        """Yields the chunks of the body of page, recording its terms on the way."""
+        terms: Counter[str] = Counter()
+        pending: str = ""
+        for chunk in chunks:
+            text: str = pending + chunk
+            last_break: re.Match[str] | None = LAST_BREAK_RGX.search(text)
+            end: int = last_break.start() + 1 if last_break is not None else 0
+            terms.update(html_terms(text[:end]))
+            pending = text[end:]
+            yield chunk
+        terms.update(html_terms(pending))
+        self._store(page, title, terms)
+
+    def files(
+        self, basepath: str, prefix_length: int = SHARD_PREFIX_LENGTH
+    ) -> dict[str, str]:
+        """Returns the JSON of index.json and of every shard, by file name."""
+        next_id: int = max(self.ids.values(), default=-1) + 1
+        for page in sorted(self.pages & set(self.entries)):
+            if page not in self.ids:
+                self.ids[page] = next_id
+                next_id += 1
+        live: dict[int, str] = {
+            self.ids[page]: page for page in self.pages & set(self.entries)
+        }
+        docs: list[list[str] | None] = [None] * (max(live, default=-1) + 1)
+        shards: dict[str, dict[str, list[list[int]]]] = {}
+        for page_id, page in sorted(live.items()):
+            entry: dict[str, Any] = self.entries[page]
+            docs[page_id] = [page_url(page, basepath), entry["title"]]
+            for term, score in entry["terms"].items():
+                shard: dict[str, list[list[int]]] = shards.setdefault(
+                    term[:prefix_length], {}
+                )
+                shard.setdefault(term, []).append([page_id, score])
+
+        files: dict[str, str] = {
+            "index.json": json.dumps(
+                {
+                    "version": SEARCH_INDEX_VERSION,
+                    "prefix": prefix_length,
+                    "shards": sorted(shards),
+                    "docs": docs,
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        }
+        for prefix, terms in shards.items():
+            for postings in terms.values():
+                postings.sort(key=lambda posting: (-posting[1], posting[0]))
+            files[f"{prefix}.json"] = json.dumps(
+                dict(sorted(terms.items())), ensure_ascii=False, separators=(",", ":")
+            )
+        return files
+
+    def summary(self) -> str:
+        return f"{len(self.pages)} pages, {self.tokenized} tokenized"
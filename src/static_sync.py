@@ -0,0 +1,152 @@
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from file_copy import DEFAULT_STRATEGY, CopyStrategy, copy_file
+from fingerprint import fingerprinted_name, should_fingerprint
+from manifest import BuildManifest, file_digest
+from minify import CssMinifier
+from png_optimizer import PngOptimizer
+
+
+class SyncResult:
+    def __init__(self) -> None:
+        self.copied: list[Path] = []
+        # The copied files that did not exist before
+        self.added: list[Path] = []
+        self.removed: list[Path] = []
+        self.unchanged: int = 0
+        # Number of files copied with each strategy
+        self.strategies: dict[CopyStrategy, int] = {}
+        # Path -> fingerprinted path, relative to to_dir, of fingerprinted files
+        self.fingerprinted: dict[str, str] = {}
+
+    def summary(self) -> str:
+        used: str = ", ".join(
+            f"{count} {strategy.value}" for strategy, count in self.strategies.items()
+        )
+        return (
+            f"{len(self.copied)} copied{f' ({used})' if used else ''}, "
+            f"{self.unchanged} unchanged, {len(self.removed)} removed"
+        )
+
+
+def files_match(
+    source: Path, dest: Path, manifest: BuildManifest | None = None
+) -> bool:
+    """
+    Compares two files by size and mtime, hashing them only when the size is
+    equal but the mtimes differ.
+    """
+    if not dest.is_file():
+        return False
+    source_stat: os.stat_result = source.stat()
+    dest_stat: os.stat_result = dest.stat()
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if manifest is not None:
+        return manifest.digest(source) == manifest.digest(dest)
+    return file_digest(source) == file_digest(dest)
+
+
+def sync_static(
+    from_dir: Path,
+    to_dir: Path,
+    manifest: BuildManifest | None = None,
+    strategy: CopyStrategy = DEFAULT_STRATEGY,
+    workers: int | None = None,
+    optimizer: PngOptimizer | None = None,
+    fingerprint: bool = False,
+    minifier: CssMinifier | None = None,
+) -> SyncResult:
+    """
+    Mirrors the files of from_dir into to_dir, copying only new or changed files.
+
+    New and changed files are copied by up to workers threads, each file with
+    the first strategy of strategy's chain that works (see copy_file). With an
+    optimizer, images it accepts are copied from their optimized version, and
+    with a minifier, stylesheets from their minified version. With
+    fingerprint, files are copied to names containing a hash of the content
+    they are copied from (see fingerprint.should_fingerprint for exceptions).
+
+    Only files this function copied in an earlier build (as recorded in the
+    manifest) are removed when their source disappears, so generated pages and
+    anything else living in to_dir are left alone.
+    """
+    print("Syncing files from", from_dir, "to", to_dir)
+    if not from_dir.is_dir():
+        raise ValueError(f"{from_dir.name}/ is not a directory")
+
+    result: SyncResult = SyncResult()
+    synced: dict[str, str] = {}
+    to_copy: list[tuple[Path, Path]] = []
+    sources: list[Path] = [
+        path for path in sorted(from_dir.rglob("*")) if path.is_file()
+    ]
+    optimized: dict[Path, Path] = {}
+    digest: Callable[[Path], str] = (
+        manifest.digest if manifest is not None else file_digest
+    )
+    if optimizer is not None:
+        optimized = optimizer.prepare(
+            [source for source in sources if optimizer.accepts(source)], digest
+        )
+    if minifier is not None:
+        optimized |= minifier.prepare(
+            [source for source in sources if minifier.accepts(source)], digest
+        )
+
+    for source in sources:
+        origin: Path = optimized.get(source, source)
+        name: str = source.relative_to(from_dir).as_posix()
+        if fingerprint and should_fingerprint(name):
+            result.fingerprinted[name] = fingerprinted_name(name, digest(origin))
+            name = result.fingerprinted[name]
+        dest: Path = to_dir.joinpath(name)
+        synced[str(dest)] = str(source)
+        if files_match(origin, dest, manifest):
+            result.unchanged += 1
+            _align_mtime(origin, dest)
+            continue
+        if not dest.parent.is_dir():
+            print(f"Creating dir {dest.parent.name}/")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+        if not dest.exists():
+            result.added.append(dest)
+        to_copy.append((origin, dest))
+
+    unsupported: set[CopyStrategy] = set()
+
+    def copy(job: tuple[Path, Path]) -> CopyStrategy:
+        source, dest = job
+        print(f"Copying file {dest.name} to {dest.parent.name}/")
+        return copy_file(source, dest, strategy, unsupported)
+
+    if to_copy:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for (_, dest), used in zip(to_copy, pool.map(copy, to_copy)):
+                result.copied.append(dest)
+                result.strategies[used] = result.strategies.get(used, 0) + 1
+
+    if manifest is not None:
+        for dest_name in sorted(set(manifest.assets) - set(synced)):
+            orphan: Path = Path(dest_name)
+            if orphan.is_file():
+                print(f"Removing orphaned file {orphan.name}")
+                orphan.unlink()
+                result.removed.append(orphan)
+        manifest.assets = synced
+
+    print("Synced static files:", result.summary())
+    return result
+
+
+def _align_mtime(source: Path, dest: Path) -> None:
+    """Gives identical files the same mtime so the next sync needs no hashing."""
+    source_mtime_ns: int = source.stat().st_mtime_ns
+    dest_stat: os.stat_result = dest.stat()
+    if dest_stat.st_mtime_ns != source_mtime_ns:
+        os.utime(dest, ns=(dest_stat.st_atime_ns, source_mtime_ns))
@@ -0,0 +1,187 @@
+import re
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+from critical_css import ROOT_HREF_RGX, STYLESHEET_RGX, CssInliner, page_tags
+from fingerprint import AssetMap
+from minify import minify_segments
+
+SLOT_RGX = re.compile(r"\{\{ (Title|Content) \}\}")
+ROOT_URL_RGX = re.compile(r'(href|src)="/([^"]*)"')
+
+# Loads a stylesheet without blocking rendering, applying it once loaded
+DEFERRED_STYLESHEET: str = (
+    'rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'"'
+)
+
+# Rendered in place of the basepath in page bodies, which are split at it and
+# resolved by Template.resolve. NUL cannot occur in page text, parse_page
+# replaces it in the markdown source.
+BASEPATH_MARKER: str = "\x00"
+
+
+def resolve_url(url: str, basepath: str) -> str:
+    """Prefixes site-root URLs ('/...') with the basepath."""
+    if basepath != "/" and url.startswith("/"):
+        return basepath + url[1:]
+    return url
+
+
+class Template:
+    """
+    A page template parsed once into literal segments and the slots between them.
+
+    The basepath, and with an asset map the fingerprinted asset names, are
+    applied to root-relative 'href' and 'src' attributes of the literal
+    segments at compile time, so rendering a page is a single join. Page
+    bodies are rendered with BASEPATH_MARKER and resolved the same way.
+    With minify, the literal segments are minified first; page bodies, and
+    so code blocks, never are.
+
+    With an inliner, stylesheet links to files it accepts become Styles slots,
+    rendered as the page's critical CSS followed by a deferred link to the
+    stylesheet (see CssInliner).
+    """
+
+    def __init__(
+        self,
+        source: str,
+        basepath: str = "/",
+        assets: AssetMap | None = None,
+        minify: bool = False,
+        inliner: CssInliner | None = None,
+    ) -> None:
+        self.basepath: str = basepath
+        self.assets: AssetMap | None = assets
+        self.inliner: CssInliner | None = inliner
+        self.segments: list[str] = []
+        self.slots: list[str] = []
+        # Stylesheet path and resolved link tag of each Styles slot, in order
+        self.stylesheets: list[tuple[str, str]] = []
+
+        literals: list[str] = []
+        position: int = 0
+        for match in SLOT_RGX.finditer(source):
+            literals.append(source[position : match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        literals.append(source[position:])
+        if minify:
+            literals = minify_segments(literals)
+        if inliner is not None:
+            literals = self._split_stylesheets(literals, inliner)
+        self.segments = [self._rewrite(literal) for literal in literals]
+        # Elements of the template itself, part of every page
+        self.tags: set[str] = page_tags(self.segments)
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Path,
+        basepath: str = "/",
+        assets: AssetMap | None = None,
+        minify: bool = False,
+        inliner: CssInliner | None = None,
+    ) -> Template:
+        with path.open("r") as template_file:
+            return cls(template_file.read(), basepath, assets, minify, inliner)
+
+    def _split_stylesheets(self, literals: list[str], inliner: CssInliner) -> list[str]:
+        """Turns the links to stylesheets inliner accepts into Styles slots."""
+        split: list[str] = []
+        slots: list[str] = []
+        for index, literal in enumerate(literals):
+            position: int = 0
+            for match in STYLESHEET_RGX.finditer(literal):
+                href: re.Match[str] | None = ROOT_HREF_RGX.search(match.group())
+                if href is None:
+                    continue
+                path: str = href.group(1)
+                if self.assets is not None:
+                    path = self.assets.rewrite(path)
+                if not inliner.accepts(path):
+                    continue
+                split.append(literal[position : match.start()])
+                slots.append("Styles")
+                self.stylesheets.append((path, self._rewrite(match.group())))
+                position = match.end()
+            split.append(literal[position:])
+            if index < len(self.slots):
+                slots.append(self.slots[index])
+        self.slots = slots
+        return split
+
+    @property
+    def inlines_styles(self) -> bool:
+        return bool(self.stylesheets)
+
+    def _styles(self, stylesheet: tuple[str, str], tags: set[str]) -> str:
+        path, link = stylesheet
+        if self.inliner is None:
+            return link
+        css: str = self.inliner.critical(path, tags | self.tags)
+        style: str = "<style>" + css.replace("</style", "<\\/style") + "</style>"
+        if not self.inliner.used_only:
+            return style
+        deferred: str = link.replace('rel="stylesheet"', DEFERRED_STYLESHEET)
+        return f"{style}{deferred}<noscript>{link}</noscript>"
+
+    def _rewrite(self, segment: str) -> str:
+        if self.basepath == "/" and self.assets is None:
+            return segment
+        return ROOT_URL_RGX.sub(self._rewrite_match, segment)
+
+    def _rewrite_match(self, match: re.Match[str]) -> str:
+        return f'{match.group(1)}="{self._resolve_fragment(match.group(2))}"'
+
+    def _resolve_fragment(self, fragment: str) -> str:
+        """Resolves the root-relative URL path fragment starts with."""
+        if self.assets is None:
+            return self.basepath + fragment
+        end: int = fragment.find('"')
+        if end == -1:
+            end = len(fragment)
+        return self.basepath + self.assets.rewrite(fragment[:end]) + fragment[end:]
+
+    def resolve(self, fragments: list[str]) -> str:
+        """Joins a body rendered with BASEPATH_MARKER and split at the marker."""
+        if self.assets is None:
+            return self.basepath.join(fragments)
+        return fragments[0] + "".join(map(self._resolve_fragment, fragments[1:]))
+
+    def resolve_chunks(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Resolves a body rendered with BASEPATH_MARKER chunk by chunk."""
+        for chunk in chunks:
+            if BASEPATH_MARKER in chunk:
+                yield self.resolve(chunk.split(BASEPATH_MARKER))
+            else:
+                yield chunk
+
+    def iter_render(
+        self, title: str, content: Iterable[str], tags: set[str] | None = None
+    ) -> Iterator[str]:
+        """
+        Yields the page in fragments, streaming content into its slot.
+
+        Inlining styles needs the elements of the page: unless given as tags,
+        they are collected from content, which is then joined first.
+        """
+        if not isinstance(content, Sequence) and (
+            self.slots.count("Content") > 1 or (self.inlines_styles and tags is None)
+        ):
+            content = ["".join(content)]
+        if self.inlines_styles and tags is None:
+            tags = page_tags(content)
+        stylesheets: Iterator[tuple[str, str]] = iter(self.stylesheets)
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot == "Title":
+                yield title
+            elif slot == "Styles":
+                yield self._styles(next(stylesheets), tags or set())
+            else:
+                yield from content
+            yield segment
+
+    def render(self, title: str, content: str) -> str:
+        return "".join(self.iter_render(title, (content,)))
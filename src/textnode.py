@@ -3,6 +3,7 @@ from enum import Enum
 from typing import override
 
 from htmlnode import LeafNode
+from template import resolve_url
 
 
 class TextType(Enum):
@@ -21,6 +22,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str | None = None) -> None:
         self.text: str = text
         self.text_type: TextType = text_type
@@ -37,7 +40,7 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+def text_node_to_html_node(text_node: TextNode, basepath: str = "/") -> LeafNode:
     match text_node.text_type:
         case TextType.TEXT:
             return LeafNode(tag=None, value=html.escape(text_node.text))
@@ -53,7 +56,7 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode:
             return LeafNode(
                 tag="a",
                 value=html.escape(text_node.text),
-                props={"href": text_node.url},
+                props={"href": resolve_url(text_node.url, basepath)},
             )
         case TextType.IMAGE:
             if text_node.url is None:
@@ -61,5 +64,8 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode:
             return LeafNode(
                 tag="img",
                 value="",
-                props={"src": text_node.url, "alt": html.escape(text_node.text)},
+                props={
+                    "src": resolve_url(text_node.url, basepath),
+                    "alt": html.escape(text_node.text),
+                },
             )
@@ -5,6 +5,7 @@ from block_markdown import (
     block_to_block_type,
     markdown_to_blocks,
     markdown_to_html,
+    scan_blocks,
 )
 
 
@@ -423,5 +424,66 @@ This paragraph should be **properly** _formatted_. Including `code`.
         self.assertEqual(node_html, expected_html)
 
 
+class TestScanBlocks(unittest.TestCase):
+    def test_typed_blocks(self):
+        md = """
+## Heading two
+
+```
+code
+  indented
+```
+
+> quote one
+> quote two
+
+- item one
+- item two
+
+1. first
+2. second
+
+Paragraph
+on two lines
+"""
+        blocks = list(scan_blocks(md.split("\n")))
+        self.assertEqual(
+            [block.block_type for block in blocks],
+            [
+                BlockType.HEADING,
+                BlockType.CODE,
+                BlockType.QUOTE,
+                BlockType.UNORDERED_LIST,
+                BlockType.ORDERED_LIST,
+                BlockType.PARAGRAPH,
+            ],
+        )
+        heading, code, quote, unordered, ordered, paragraph = blocks
+        self.assertEqual((heading.level, heading.content), (2, "Heading two"))
+        self.assertEqual(code.content, "code\n  indented")
+        self.assertEqual(quote.content, "quote one quote two")
+        self.assertEqual(unordered.items, ["item one", "item two"])
+        self.assertEqual(ordered.items, ["first", "second"])
+        self.assertEqual(paragraph.content, "Paragraph\non two lines")
+
+    def test_accepts_lines_with_newlines(self):
+        lines = ["# Title\n", "\n", "\n", "text\n"]
+        self.assertEqual(
+            [block.text for block in scan_blocks(lines)], ["# Title", "text"]
+        )
+
+    def test_whitespace_only_lines_do_not_split_blocks(self):
+        blocks = list(scan_blocks(["  first", "   ", "second  ", "", "   "]))
+        self.assertEqual([block.text for block in blocks], ["first\n   \nsecond"])
+
+    def test_is_lazy(self):
+        def lines():
+            yield "# One"
+            yield ""
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(scan_blocks(lines())).content, "One")
+
+
 if __name__ == "__main__":
     _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from block_markdown import markdown_to_html
+from block_memo import BlockMemo
+
+MARKDOWN = """# Title
+
+Shared **disclaimer** with a [link](/about).
+
+- one
+- two
+
+Shared **disclaimer** with a [link](/about).
+
+```
+code
+```"""
+
+
+class TestBlockMemo(unittest.TestCase):
+    def test_get_put(self):
+        memo = BlockMemo()
+        self.assertIsNone(memo.get("text", "/"))
+        memo.put("text", "/", "<p>text</p>")
+        self.assertEqual(memo.get("text", "/"), "<p>text</p>")
+        self.assertIsNone(memo.get("text", "/site/"))
+        self.assertEqual((memo.hits, memo.misses), (1, 2))
+
+    def test_least_recently_used_is_evicted(self):
+        memo = BlockMemo(maxsize=2)
+        memo.put("a", "/", "A")
+        memo.put("b", "/", "B")
+        _ = memo.get("a", "/")
+        memo.put("c", "/", "C")
+        self.assertEqual(memo.get("a", "/"), "A")
+        self.assertIsNone(memo.get("b", "/"))
+        self.assertEqual(len(memo.entries), 2)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            _ = BlockMemo(maxsize=0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("blocks.json")
+            memo = BlockMemo()
+            memo.put("a", "/", "A")
+            memo.save(path)
+
+            loaded = BlockMemo()
+            loaded.load(path)
+            self.assertEqual(loaded.get("a", "/"), "A")
+
+            with mock.patch("block_memo.PARSER_VERSION", "next"):
+                stale = BlockMemo()
+                stale.load(path)
+            self.assertEqual(len(stale.entries), 0)
+
+    def test_load_missing_file(self):
+        memo = BlockMemo()
+        memo.load(Path("/nonexistent/blocks.json"))
+        self.assertEqual(len(memo.entries), 0)
+
+    def test_update_round_trip(self):
+        worker = BlockMemo()
+        _ = worker.get("a", "/")
+        worker.put("a", "/", "A")
+        update = worker.take_update()
+        self.assertEqual(worker.take_update(), (0, 0, {}))
+
+        parent = BlockMemo()
+        parent.apply_update(update)
+        self.assertEqual(parent.misses, 1)
+        self.assertEqual(parent.get("a", "/"), "A")
+
+
+class TestMemoizedMarkdown(unittest.TestCase):
+    def test_same_html_as_without_memo(self):
+        memo = BlockMemo()
+        for basepath in ("/", "/site/"):
+            self.assertEqual(
+                markdown_to_html(MARKDOWN, basepath, memo).to_html(),
+                markdown_to_html(MARKDOWN, basepath).to_html(),
+            )
+
+    def test_repeated_blocks_render_once(self):
+        memo = BlockMemo()
+        _ = markdown_to_html(MARKDOWN, "/", memo)
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+        with mock.patch("block_markdown.render_block", side_effect=AssertionError):
+            html = markdown_to_html(MARKDOWN, "/", memo).to_html()
+        self.assertIn('<a href="/about">link</a>', html)
+        self.assertEqual(memo.hits, 6)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from build_report import BuildReport, Change
+from gen_content import collect_page_jobs, generate_pages, stream_page, write_page
+from manifest import BuildManifest
+from precompress import Encoding, precompress
+from static_sync import sync_static
+from template import Template
+
+
+class TestBuildReport(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.report = BuildReport(self.out)
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_paths_are_relative_to_out_dir(self):
+        self.report.record(self.out.joinpath("blog", "index.html"), Change.ADDED)
+        self.report.record(self.out.joinpath("old.html"), Change.REMOVED)
+        self.assertEqual(
+            self.report.to_json(),
+            {"added": ["blog/index.html"], "changed": [], "removed": ["old.html"]},
+        )
+
+    def test_latest_change_wins(self):
+        page = self.out.joinpath("index.html")
+        self.report.record(page, Change.REMOVED)
+        self.report.record(page, Change.ADDED)
+        self.assertEqual(self.report.summary(), "1 added, 0 changed, 0 removed")
+
+    def test_record_sync(self):
+        static = self.root.joinpath("static")
+        static.mkdir()
+        _ = static.joinpath("a.css").write_text("a")
+        _ = static.joinpath("b.css").write_text("b")
+        self.out.mkdir()
+        _ = self.out.joinpath("b.css").write_text("old b")
+        self.report.record_sync(sync_static(static, self.out))
+        self.assertEqual(
+            self.report.to_json(),
+            {"added": ["a.css"], "changed": ["b.css"], "removed": []},
+        )
+
+    def test_record_precompress(self):
+        self.out.mkdir()
+        _ = self.out.joinpath("index.html").write_text("<p>a</p>" * 100)
+        manifest = BuildManifest(self.root.joinpath(".build", "manifest.json"))
+        self.report.record_precompress(precompress(self.out, [Encoding.GZIP], manifest))
+        self.assertEqual(self.report.to_json()["added"], ["index.html.gz"])
+
+    def test_write_json(self):
+        self.report.record(self.out.joinpath("index.html"), Change.CHANGED)
+        path = self.root.joinpath(".build", "changes.json")
+        self.report.write_json(path)
+        self.assertEqual(json.loads(path.read_text())["changed"], ["index.html"])
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.page = self.root.joinpath("out", "index.html")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def age(self, path: Path) -> int:
+        os.utime(path, ns=(0, 1_000_000_000))
+        return path.stat().st_mtime_ns
+
+    def test_write_page(self):
+        self.assertEqual(write_page(self.page, "<p>a</p>"), Change.ADDED)
+        mtime = self.age(self.page)
+        self.assertIsNone(write_page(self.page, "<p>a</p>"))
+        self.assertEqual(self.page.stat().st_mtime_ns, mtime)
+        self.assertEqual(write_page(self.page, "<p>b</p>"), Change.CHANGED)
+        self.assertEqual(self.page.read_text(), "<p>b</p>")
+        self.assertEqual(list(self.page.parent.iterdir()), [self.page])
+
+    def test_stream_page(self):
+        source = self.root.joinpath("index.md")
+        _ = source.write_text("# Title\n\ntext")
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(stream_page(source, template, self.page), Change.ADDED)
+        mtime = self.age(self.page)
+        self.assertIsNone(stream_page(source, template, self.page))
+        self.assertEqual(self.page.stat().st_mtime_ns, mtime)
+        self.assertEqual(list(self.page.parent.iterdir()), [self.page])
+
+    def test_generate_pages_reports_changes(self):
+        content = self.root.joinpath("content")
+        content.mkdir()
+        _ = content.joinpath("a.md").write_text("# A")
+        _ = content.joinpath("b.md").write_text("# B")
+        template = self.root.joinpath("template.html")
+        _ = template.write_text("{{ Title }}")
+        jobs = collect_page_jobs(content, self.page.parent)
+        generate_pages(jobs, template, "/")
+
+        _ = content.joinpath("b.md").write_text("# B2")
+        report = BuildReport(self.page.parent)
+        generate_pages(jobs, template, "/", report=report, pipeline_depth=2)
+        self.assertEqual(
+            report.to_json(), {"added": [], "changed": ["b.html"], "removed": []}
+        )
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,182 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from critical_css import (
+    CssInliner,
+    page_tags,
+    parse_rules,
+    rebase_urls,
+    selector_used,
+    type_selectors,
+    used_rules,
+)
+from template import Template
+
+CSS = """/* site */
+body { margin: 0; }
+h1, h2 { color: red; }
+pre code { padding: 0; }
+a:hover, .note > a::after { content: "}"; }
+:root { --x: 1; }
+@font-face { font-family: "X"; src: url(x.woff2); }
+@media (max-width: 600px) {
+    h2 { margin: 0; }
+    img { width: 100%; }
+}
+"""
+
+TEMPLATE = """<head><title>{{ Title }}</title>
+<link href="/index.css" rel="stylesheet" /></head>
+<body>{{ Content }}</body>"""
+
+
+class TestRules(unittest.TestCase):
+    def test_parse_rules_round_trip(self):
+        rules = parse_rules(CSS)
+        self.assertEqual(
+            [rule.prelude for rule in rules],
+            [
+                "body",
+                "h1,h2",
+                "pre code",
+                "a:hover,.note>a::after",
+                ":root",
+                "@font-face",
+                "@media (max-width:600px)",
+            ],
+        )
+        self.assertEqual(rules[3].to_css(), 'a:hover,.note>a::after{content:"}"}')
+        self.assertEqual(
+            rules[6].to_css(), "@media (max-width:600px){h2{margin:0}img{width:100%}}"
+        )
+
+    def test_type_selectors(self):
+        self.assertEqual(type_selectors("pre code"), {"pre", "code"})
+        self.assertEqual(type_selectors("ul > li:not(p) + LI"), {"ul", "li"})
+        self.assertEqual(type_selectors(".a[href='x y'] ::after"), set())
+
+    def test_selector_used(self):
+        self.assertTrue(selector_used("h1,h2", {"h2"}))
+        self.assertFalse(selector_used("pre code", {"code"}))
+        self.assertTrue(selector_used(":is(h1, h2)", set()))
+
+    def test_used_rules(self):
+        css = "".join(rule.to_css() for rule in used_rules(parse_rules(CSS), {"h1"}))
+        self.assertEqual(
+            css,
+            "h1,h2{color:red}:root{--x:1}"
+            + '@font-face{font-family:"X";src:url(x.woff2)}',
+        )
+
+    def test_page_tags(self):
+        self.assertEqual(
+            page_tags(["<div><P>a &lt;b&gt;</P>", "<img src=x></div>"]),
+            {"div", "p", "img"},
+        )
+
+    def test_rebase_urls(self):
+        css = (
+            '@import "base.css";@import url(../print.css);'
+            + "a{background:url( ../img/a.png#x )}"
+            + "b{background:url('./b.png?v=1'),url(\"/c.png\")}"
+            + "i{background:url(data:image/png;base64,AA==),url(//cdn/d.png)}"
+            + "u{background:url(../../../e.png)}"
+        )
+        self.assertEqual(
+            rebase_urls(css, "css/site.css", "/site/"),
+            '@import "/site/css/base.css";@import url(/site/print.css);'
+            + "a{background:url( /site/img/a.png#x )}"
+            + "b{background:url('/site/css/b.png?v=1'),url(\"/c.png\")}"
+            + "i{background:url(data:image/png;base64,AA==),url(//cdn/d.png)}"
+            + "u{background:url(/site/e.png)}",
+        )
+
+
+class TestCssInliner(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        _ = self.out.joinpath("index.css").write_text(CSS)
+        self.inliner = CssInliner(self.out)
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_accepts_stylesheets_in_out_dir(self):
+        self.assertTrue(self.inliner.accepts("index.css"))
+        self.assertFalse(self.inliner.accepts("missing.css"))
+
+    def test_critical_is_cached_by_tags(self):
+        _ = self.inliner.accepts("index.css")
+        first = self.inliner.critical("index.css", {"body", "img"})
+        self.assertIn("img{width:100%}", first)
+        self.assertNotIn("h1", first)
+        self.assertEqual(self.inliner.critical("index.css", {"img", "body"}), first)
+        self.assertEqual(self.inliner.summary(), "1 hits, 1 misses")
+
+    def test_save_and_load(self):
+        _ = self.inliner.accepts("index.css")
+        _ = self.inliner.critical("index.css", {"h1"})
+        path = self.out.joinpath(".build", "critical.json")
+        self.inliner.save(path)
+        inliner = CssInliner(self.out)
+        inliner.load(path)
+        _ = inliner.accepts("index.css")
+        _ = inliner.critical("index.css", {"h1"})
+        self.assertEqual(inliner.summary(), "1 hits, 0 misses")
+
+    def test_digest_follows_stylesheet(self):
+        _ = self.inliner.accepts("index.css")
+        _ = self.out.joinpath("index.css").write_text(CSS + "p{margin:0}")
+        inliner = CssInliner(self.out)
+        _ = inliner.accepts("index.css")
+        self.assertNotEqual(inliner.digest, self.inliner.digest)
+
+    def test_template_inlines_used_rules(self):
+        template = Template(TEMPLATE, "/site/", inliner=self.inliner)
+        self.assertEqual(template.slots, ["Title", "Styles", "Content"])
+        html = template.render("T", "<h1>x</h1>")
+        self.assertIn("<style>body{margin:0}h1,h2{color:red}", html)
+        self.assertIn(
+            '<link href="/site/index.css" rel="preload" as="style" onload=', html
+        )
+        self.assertIn(
+            '<noscript><link href="/site/index.css" rel="stylesheet" /></noscript>',
+            html,
+        )
+        self.assertNotIn("img{", html)
+
+    def test_template_inlines_whole_stylesheet(self):
+        inliner = CssInliner(self.out, used_only=False)
+        html = Template(TEMPLATE, inliner=inliner).render("T", "<p>x</p>")
+        self.assertIn("img{width:100%}", html)
+        self.assertNotIn("<link", html)
+
+    def test_template_rebases_urls_of_nested_stylesheets(self):
+        self.out.joinpath("css").mkdir()
+        _ = self.out.joinpath("css", "site.css").write_text(
+            "p{background:url(../img/bg.png)}"
+        )
+        inliner = CssInliner(self.out, basepath="/site/")
+        template = Template(
+            '<link href="/css/site.css" rel="stylesheet" />{{ Content }}',
+            "/site/",
+            inliner=inliner,
+        )
+        self.assertIn(
+            "<style>p{background:url(/site/img/bg.png)}</style>",
+            template.render("T", "<p>x</p>"),
+        )
+
+    def test_template_streams_with_given_tags(self):
+        template = Template(TEMPLATE, inliner=self.inliner)
+        html = "".join(template.iter_render("T", iter(["<p>x</p>"]), {"img"}))
+        self.assertIn("img{width:100%}", html)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,156 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from dep_graph import DependencyGraph, EdgeKind
+from gen_content import collect_page_jobs, generate_pages
+from manifest import BuildManifest, file_digest
+
+
+class TestDependencyGraph(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.graph = DependencyGraph(self.root.joinpath("graph.json"), self.out)
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("{{ Title }}{{ Content }}")
+        self.source = self.root.joinpath("content", "index.md")
+        self.source.parent.mkdir()
+        _ = self.source.write_text(
+            "# Home\n\n![pic](/images/a.png) [post](/blog/post) [me](/)"
+        )
+        self.page = self.out.joinpath("index.html")
+        self.targets = ["images/a.png", "blog/post", "index.html"]
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_url_to_output(self):
+        self.assertEqual(
+            self.graph.url_to_output("/blog/post#top"),
+            self.out.joinpath("blog", "post", "index.html"),
+        )
+        self.assertEqual(
+            self.graph.url_to_output("/images/a.png"),
+            self.out.joinpath("images", "a.png"),
+        )
+
+    def test_record_page(self):
+        self.graph.record_page(
+            self.source, self.template, self.page, file_digest, self.targets
+        )
+        self.assertEqual(
+            self.graph.edges[str(self.page)],
+            {
+                str(self.source): EdgeKind.SOURCE,
+                str(self.template): EdgeKind.TEMPLATE,
+                str(self.out.joinpath("images", "a.png")): EdgeKind.ASSET,
+                str(self.out.joinpath("blog", "post", "index.html")): EdgeKind.LISTS,
+            },
+        )
+        self.assertEqual(
+            self.graph.fingerprints[str(self.source)], file_digest(self.source)
+        )
+
+    def test_back_links_are_not_listings(self):
+        post = self.out.joinpath("blog", "post", "index.html")
+        self.graph.record_page(
+            self.source, self.template, post, file_digest, ["index.html"]
+        )
+        self.assertNotIn(str(self.page), self.graph.edges[str(post)])
+        about = self.out.joinpath("about.html")
+        self.graph.record_page(
+            self.source, self.template, about, file_digest, ["blog/post"]
+        )
+        self.assertNotIn(str(post), self.graph.edges[str(about)])
+
+    def test_affected_is_transitive(self):
+        self.graph.record_page(
+            self.source, self.template, self.page, file_digest, self.targets
+        )
+        static = self.root.joinpath("static", "images", "a.png")
+        asset = self.out.joinpath("images", "a.png")
+        self.graph.record_static({str(asset): str(static)})
+        self.assertEqual(
+            self.graph.affected([static], EdgeKind), {str(asset), str(self.page)}
+        )
+        self.assertEqual(self.graph.affected([static]), {str(asset)})
+        self.assertEqual(self.graph.affected([self.template]), {str(self.page)})
+        post = self.out.joinpath("blog", "post", "index.html")
+        self.assertEqual(self.graph.affected([post]), set())
+        self.assertEqual(
+            self.graph.affected([post], [EdgeKind.LISTS]), {str(self.page)}
+        )
+
+    def test_record_static_replaces_previous_assets(self):
+        self.graph.record_static({"/docs/a.png": "/static/a.png"})
+        self.graph.record_static({"/docs/b.png": "/static/b.png"})
+        self.assertEqual(list(self.graph.edges), ["/docs/b.png"])
+
+    def test_changed_inputs(self):
+        self.graph.record_page(self.source, self.template, self.page, file_digest)
+        self.assertEqual(self.graph.changed_inputs(file_digest), set())
+        _ = self.template.write_text("changed {{ Content }}")
+        self.assertEqual(self.graph.changed_inputs(file_digest), {str(self.template)})
+        self.source.unlink()
+        self.assertEqual(
+            self.graph.changed_inputs(file_digest),
+            {str(self.template), str(self.source)},
+        )
+
+    def test_save_and_load(self):
+        self.graph.record_page(self.source, self.template, self.page, file_digest)
+        orphan = self.root.joinpath("y")
+        self.graph.add(self.root.joinpath("x"), orphan, EdgeKind.SOURCE, "h")
+        self.graph.remove(self.root.joinpath("x"))
+        self.graph.save()
+        loaded = DependencyGraph(self.graph.path, self.out)
+        self.assertEqual(loaded.edges, self.graph.edges)
+        self.assertNotIn(str(orphan), loaded.fingerprints)
+
+    def test_dump(self):
+        self.graph.record_page(self.source, self.template, self.page, file_digest)
+        dot = self.root.joinpath("graph.dot")
+        self.graph.dump(dot)
+        self.assertIn(
+            f'"{self.source}" -> "{self.page}" [label="source"];', dot.read_text()
+        )
+        dumped = self.root.joinpath("dump.json")
+        self.graph.dump(dumped)
+        edges = json.loads(dumped.read_text())["edges"]
+        self.assertEqual(edges[str(self.page)][str(self.template)], "template")
+
+
+class TestGraphDrivenBuild(unittest.TestCase):
+    def test_affected_page_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            content = root.joinpath("content")
+            content.mkdir()
+            _ = content.joinpath("a.md").write_text("# A")
+            _ = content.joinpath("b.md").write_text("# B")
+            template = root.joinpath("template.html")
+            _ = template.write_text("{{ Title }}")
+            out = root.joinpath("docs")
+            jobs = collect_page_jobs(content, out)
+            manifest = BuildManifest(root.joinpath("manifest.json"))
+            graph = DependencyGraph(root.joinpath("graph.json"), out)
+            generate_pages(jobs, template, "/", manifest, graph=graph)
+            self.assertEqual(set(graph.edges), {str(out_path) for _, out_path in jobs})
+
+            graph.fingerprints[str(content.joinpath("a.md"))] = "outdated"
+            _ = out.joinpath("a.html").write_text("stale")
+            manifest.record_page(
+                content.joinpath("a.md"), template, out.joinpath("a.html"), "/"
+            )
+            generate_pages(jobs, template, "/", manifest, graph=graph)
+            self.assertEqual(out.joinpath("a.html").read_text(), "A")
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,101 @@
+import errno
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+from unittest import mock
+
+from file_copy import CopyStrategy, copy_file
+
+# What a strategy failing in the kernel falls back to on this platform
+FALLBACK: CopyStrategy = (
+    CopyStrategy.COPY_FILE_RANGE
+    if hasattr(os, "copy_file_range")
+    else CopyStrategy.COPY
+)
+
+
+class TestCopyFile(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root.joinpath("source.png")
+        _ = self.source.write_bytes(bytes(range(256)) * 100)
+        os.utime(self.source, ns=(0, 1_000_000_000))
+        self.dest = self.root.joinpath("dest.png")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def assertCopied(self) -> None:
+        self.assertEqual(self.dest.read_bytes(), self.source.read_bytes())
+        self.assertEqual(self.dest.stat().st_mtime_ns, 1_000_000_000)
+        self.assertFalse(self.root.joinpath("dest.png.tmp").exists())
+
+    def test_chain(self):
+        self.assertEqual(
+            CopyStrategy.chain(CopyStrategy.COPY_FILE_RANGE),
+            [CopyStrategy.COPY_FILE_RANGE, CopyStrategy.COPY],
+        )
+
+    def test_every_strategy_copies(self):
+        for strategy in CopyStrategy:
+            with self.subTest(strategy=strategy):
+                # Unlink first, dest may be a hardlink to source
+                self.dest.unlink(missing_ok=True)
+                _ = self.dest.write_bytes(b"old")
+                used = copy_file(self.source, self.dest, strategy)
+                self.assertIn(used, CopyStrategy.chain(strategy))
+                self.assertCopied()
+
+    def test_hardlink_shares_the_inode(self):
+        used = copy_file(self.source, self.dest, CopyStrategy.HARDLINK)
+        self.assertEqual(used, CopyStrategy.HARDLINK)
+        self.assertTrue(self.dest.samefile(self.source))
+
+    def test_unsupported_strategy_falls_back(self):
+        def unsupported(source: Path, tmp_path: Path) -> None:
+            _ = tmp_path.write_bytes(b"partial")
+            raise OSError(errno.EXDEV, "cross-device")
+
+        failing = {
+            CopyStrategy.HARDLINK: unsupported,
+            CopyStrategy.REFLINK: unsupported,
+        }
+        skipped: set[CopyStrategy] = set()
+        with mock.patch.dict("file_copy._COPIERS", failing):
+            used = copy_file(self.source, self.dest, CopyStrategy.HARDLINK, skipped)
+        self.assertEqual(used, FALLBACK)
+        self.assertEqual(
+            skipped - {CopyStrategy.COPY_FILE_RANGE},
+            {CopyStrategy.HARDLINK, CopyStrategy.REFLINK},
+        )
+        self.assertCopied()
+
+    def test_known_unsupported_strategy_is_skipped(self):
+        with mock.patch.dict(
+            "file_copy._COPIERS", {CopyStrategy.REFLINK: mock.Mock()}
+        ) as copiers:
+            used = copy_file(
+                self.source, self.dest, CopyStrategy.REFLINK, {CopyStrategy.REFLINK}
+            )
+            copiers[CopyStrategy.REFLINK].assert_not_called()
+        self.assertEqual(used, FALLBACK)
+
+    def test_other_errors_are_raised(self):
+        def denied(source: Path, tmp_path: Path) -> None:
+            raise OSError(errno.ENOSPC, "no space left")
+
+        with (
+            mock.patch.dict("file_copy._COPIERS", {CopyStrategy.REFLINK: denied}),
+            self.assertRaises(OSError),
+        ):
+            _ = copy_file(self.source, self.dest, CopyStrategy.REFLINK)
+        self.assertFalse(self.dest.exists())
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,93 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from fingerprint import AssetMap, fingerprinted_name, should_fingerprint
+from gen_content import collect_page_jobs, generate_pages
+from manifest import BuildManifest
+from static_sync import sync_static
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprinted_name(self):
+        self.assertEqual(
+            fingerprinted_name("images/a.png", "0123456789abcdef"),
+            "images/a.01234567.png",
+        )
+        self.assertEqual(
+            fingerprinted_name("LICENSE", "0123456789"), "LICENSE.01234567"
+        )
+
+    def test_should_fingerprint(self):
+        self.assertTrue(should_fingerprint("index.css"))
+        self.assertFalse(should_fingerprint("robots.txt"))
+        self.assertFalse(should_fingerprint("blog/page.html"))
+
+    def test_rewrite(self):
+        assets = AssetMap({"index.css": "index.abc.css"})
+        self.assertEqual(assets.rewrite("index.css"), "index.abc.css")
+        self.assertEqual(assets.rewrite("index.css?v=1#top"), "index.abc.css?v=1#top")
+        self.assertEqual(assets.rewrite("other.css"), "other.css")
+
+    def test_digest_depends_on_content_only(self):
+        first = AssetMap({"a.css": "a.1.css", "b.png": "b.2.png"})
+        second = AssetMap({"b.png": "b.2.png", "a.css": "a.1.css"})
+        self.assertEqual(first.digest, second.digest)
+        self.assertNotEqual(first.digest, AssetMap({"a.css": "a.3.css"}).digest)
+
+    def test_to_json(self):
+        assets = AssetMap({"index.css": "index.abc.css"})
+        self.assertEqual(json.loads(assets.to_json()), {"/index.css": "/index.abc.css"})
+
+
+class TestFingerprintedBuild(unittest.TestCase):
+    def test_sync_and_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            static = root.joinpath("static")
+            static.joinpath("images").mkdir(parents=True)
+            _ = static.joinpath("index.css").write_text("body {}")
+            _ = static.joinpath("images", "a.png").write_bytes(b"png")
+            _ = static.joinpath("robots.txt").write_text("")
+            content = root.joinpath("content")
+            content.mkdir()
+            _ = content.joinpath("index.md").write_text(
+                "# Home\n\n![a](/images/a.png) [css](/index.css) [home](/)"
+            )
+            template = root.joinpath("template.html")
+            _ = template.write_text('<link href="/index.css">{{ Content }}')
+            out = root.joinpath("docs")
+            manifest = BuildManifest(root.joinpath("manifest.json"))
+
+            def build() -> str:
+                sync = sync_static(static, out, manifest, fingerprint=True)
+                generate_pages(
+                    collect_page_jobs(content, out),
+                    template,
+                    "/site/",
+                    manifest,
+                    assets=AssetMap(sync.fingerprinted),
+                )
+                return out.joinpath("index.html").read_text()
+
+            html = build()
+            css_hash = manifest.digest(static.joinpath("index.css"))
+            css = fingerprinted_name("index.css", css_hash)
+            self.assertTrue(out.joinpath(css).is_file())
+            self.assertTrue(out.joinpath("robots.txt").is_file())
+            self.assertFalse(out.joinpath("index.css").exists())
+            self.assertIn(f'<link href="/site/{css}">', html)
+            self.assertIn(f'<a href="/site/{css}">css</a>', html)
+            self.assertRegex(html, r'<img src="/site/images/a\.[0-9a-f]{8}\.png"')
+            self.assertIn('<a href="/site/">home</a>', html)
+            self.assertEqual(build(), html)
+
+            _ = static.joinpath("index.css").write_text("body { margin: 0 }")
+            changed = build()
+            self.assertNotIn(css, changed)
+            self.assertFalse(out.joinpath(css).exists())
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
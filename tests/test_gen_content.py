@@ -1,6 +1,21 @@
+import tempfile
 import unittest
+from pathlib import Path
+from typing import override
+from unittest import mock
 
-from gen_content import extract_title
+from block_markdown import scan_blocks
+from block_memo import BlockMemo
+from gen_content import (
+    collect_page_jobs,
+    extract_title,
+    generate_pages,
+    stream_large_page,
+    stream_page,
+    title_from_blocks,
+)
+from page_cache import PageCache
+from template import Template
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -20,6 +35,157 @@ class TestExtractTitle(unittest.TestCase):
         markdown = ""
         self.assertRaisesRegex(ValueError, "No title found", extract_title, markdown)
 
+    def test_title_from_blocks_stops_at_title(self):
+        lines = iter(["intro", "", "# Title", "", "rest"])
+        self.assertEqual(title_from_blocks(scan_blocks(lines)), "Title")
+        self.assertEqual(list(lines), ["rest"])
+
+
+class TestGeneratePages(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        for name in ("a", "b", "c"):
+            self.content.joinpath(name).mkdir(parents=True)
+            _ = self.content.joinpath(name, "index.md").write_text(
+                f"# Page {name}\n\nSee [home](/) and **{name}**"
+            )
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def render(
+        self, to_dir: Path, workers: int, pipeline_depth: int = 0
+    ) -> dict[str, str]:
+        jobs = collect_page_jobs(self.content, to_dir)
+        generate_pages(
+            jobs,
+            self.template,
+            "/base/",
+            workers=workers,
+            pipeline_depth=pipeline_depth,
+        )
+        return {
+            str(path.relative_to(to_dir)): path.read_text()
+            for path in sorted(to_dir.rglob("*.html"))
+        }
+
+    def test_collect_page_jobs_is_sorted(self):
+        jobs = collect_page_jobs(self.content, self.root.joinpath("out"))
+        self.assertEqual([to_path.parent.name for _, to_path in jobs], ["a", "b", "c"])
+
+    def test_parallel_output_matches_serial(self):
+        serial = self.render(self.root.joinpath("serial"), workers=1)
+        parallel = self.render(self.root.joinpath("parallel"), workers=3)
+        self.assertEqual(len(serial), 3)
+        self.assertEqual(serial, parallel)
+        self.assertIn('<a href="/base/">home</a>', serial["a/index.html"])
+
+    def test_errors_are_reported_per_page(self):
+        _ = self.content.joinpath("b", "index.md").write_text("No title here")
+        with self.assertRaisesRegex(ValueError, "1 page\\(s\\)") as context:
+            _ = self.render(self.root.joinpath("out"), workers=2)
+        self.assertIn("No title found", str(context.exception))
+        self.assertTrue(self.root.joinpath("out", "c", "index.html").is_file())
+
+    def test_programming_errors_are_raised(self):
+        with (
+            mock.patch("gen_content.stream_page", side_effect=TypeError("bug")),
+            self.assertRaisesRegex(TypeError, "bug"),
+        ):
+            _ = self.render(self.root.joinpath("out"), workers=1)
+
+    def test_pipelined_output_matches_serial(self):
+        serial = self.render(self.root.joinpath("serial"), workers=1)
+        for workers in (1, 3):
+            pipelined = self.render(
+                self.root.joinpath(f"pipelined-{workers}"), workers, pipeline_depth=1
+            )
+            self.assertEqual(serial, pipelined)
+
+    def test_pipelined_errors_are_reported_per_page(self):
+        _ = self.content.joinpath("a", "index.md").write_text("No title here")
+        with self.assertRaisesRegex(ValueError, "1 page\\(s\\)"):
+            _ = self.render(self.root.joinpath("out"), workers=1, pipeline_depth=2)
+        self.assertTrue(self.root.joinpath("out", "c", "index.html").is_file())
+
+
+class TestStreamLargePage(unittest.TestCase):
+    MARKDOWN = """Intro with [home](/) before the title
+
+# Large page
+
+> quoted
+> text
+
+- item **one**
+- item ![two](/two.png)
+
+```
+code \x00 block
+```
+
+1. first
+2. second
+"""
+
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root.joinpath("content", "page.md")
+        self.source.parent.mkdir()
+        _ = self.source.write_text(self.MARKDOWN)
+        self.template = Template("<h1>{{ Title }}</h1>{{ Content }}", "/base/")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_matches_tree_rendering(self):
+        tree = self.root.joinpath("tree.html")
+        streamed = self.root.joinpath("streamed.html")
+        _ = stream_page(self.source, self.template, tree)
+        _ = stream_large_page(self.source, self.template, streamed)
+        self.assertEqual(streamed.read_text(), tree.read_text())
+
+        memoized = self.root.joinpath("memoized.html")
+        _ = stream_large_page(self.source, self.template, memoized, BlockMemo())
+        self.assertEqual(memoized.read_text(), tree.read_text())
+
+    def test_missing_title(self):
+        _ = self.source.write_text("no title")
+        with self.assertRaisesRegex(ValueError, "No title found"):
+            _ = stream_large_page(self.source, self.template, self.root.joinpath("x"))
+        self.assertEqual(list(self.root.glob("x*")), [])
+
+    def test_generate_pages_streams_above_threshold(self):
+        out = self.root.joinpath("out")
+        jobs = collect_page_jobs(self.source.parent, out)
+        template_path = self.root.joinpath("template.html")
+        _ = template_path.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        generate_pages(jobs, template_path, "/base/", stream_threshold=10**9)
+        expected = out.joinpath("page.html").read_text()
+        out.joinpath("page.html").unlink()
+
+        cache = PageCache(self.root.joinpath("cache"))
+        for depth in (0, 2):
+            generate_pages(
+                jobs,
+                template_path,
+                "/base/",
+                cache=cache,
+                pipeline_depth=depth,
+                stream_threshold=0,
+            )
+            self.assertEqual(out.joinpath("page.html").read_text(), expected)
+        self.assertFalse(cache.directory.exists())
+
 
 if __name__ == "__main__":
     _: unittest.TestProgram = unittest.main()
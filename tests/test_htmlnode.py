@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HtmlNode, LeafNode, ParentNode
@@ -113,5 +114,80 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "ParentNode children cannot be empty"):
             _ = parent_node.to_html()
 
-    if __name__ == "__main__":
-        _: unittest.TestProgram = unittest.main()
+
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HtmlNode(), LeafNode("b", "x"), ParentNode("p", [])):
+            with self.subTest(node=type(node).__name__):
+                self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_absent_children_and_props_are_shared(self):
+        first = LeafNode(None, "a")
+        second = LeafNode("b", "b")
+        self.assertIs(first.children, second.children)
+        self.assertIs(first.props, second.props)
+        self.assertEqual(first.children, [])
+        self.assertEqual(first.props, {})
+
+    def test_shared_empties_are_immutable(self):
+        node = LeafNode(None, "a")
+        with self.assertRaises(TypeError):
+            node.props["class"] = "x"
+        with self.assertRaises(TypeError):
+            node.children.append(LeafNode(None, "b"))
+
+    def test_given_children_and_props_are_kept(self):
+        children = [LeafNode(None, "a")]
+        props = {"class": "x"}
+        node = ParentNode("p", children, props)
+        self.assertIs(node.children, children)
+        self.assertIs(node.props, props)
+
+
+class TestStreamingHtml(unittest.TestCase):
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "text "), LeafNode("b", "bold")]),
+                ParentNode("ul", [ParentNode("li", [LeafNode(None, "item")])]),
+                LeafNode("img", "", props={"src": "/a.png"}),
+            ],
+            props={"class": "page"},
+        )
+        self.assertEqual(
+            "".join(node.iter_html()),
+            '<div class="page"><p>text <b>bold</b></p><ul><li>item</li></ul>'
+            + '<img src="/a.png"></div>',
+        )
+        self.assertEqual(node.to_html(), "".join(node.iter_html()))
+
+    def test_iter_html_yields_fragments(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a")])] * 3)
+        self.assertEqual(len(list(node.iter_html())), 5)
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+
+    def test_write_html(self):
+        node = ParentNode("p", [LeafNode(None, "Hello "), LeafNode("i", "world")])
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<p>Hello <i>world</i></p>")
+
+    def test_iter_html_raises_for_invalid_child(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaisesRegex(ValueError, "ParentNode children cannot be empty"):
+            _ = node.to_html()
+
+    def test_iter_html_base_node_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            _ = list(HtmlNode("div").iter_html())
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
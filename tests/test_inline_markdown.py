@@ -8,6 +8,7 @@ from inline_markdown import (
     split_nodes_image,
     split_nodes_link,
     text_to_text_nodes,
+    text_to_text_nodes_legacy,
 )
 from textnode import TextNode, TextType
 
@@ -553,5 +554,76 @@ class TestTextToTextNodes(unittest.TestCase):
         self.assertListEqual(expected_nodes, text_to_text_nodes(text))
 
 
+def as_tuples(nodes: list[TextNode]) -> list[tuple[str, TextType, str | None]]:
+    return [(node.text, node.text_type, node.url) for node in nodes]
+
+
+class TestScanInlineMatchesLegacy(unittest.TestCase):
+    SAMPLES: tuple[str, ...] = (
+        "",
+        "plain text",
+        "****",
+        "***a***",
+        "a****b",
+        "**bold** and _italic_ and `code`",
+        "snake_case_name",
+        "`code` with [a link](/blog) and ![an image](/images/a.png)",
+        "_italic with `tick`_ and **bold with _under_ and [link](/x)**",
+        "[a*b](/c*d) [empty]() ![](/x.png)",
+        "![img](/a.png)[link](/b)!not [an image](/c)",
+        "[link with _italic_](/x) after",
+        "**a** _b_ `c` [d](/e) ![f](/g) **h**",
+    )
+    ERROR_SAMPLES: tuple[str, ...] = (
+        "**unclosed",
+        "_a **b** c_",
+        "`a_b`",
+        "`**`",
+        "**a** _b",
+        "`open",
+    )
+
+    def test_same_nodes_as_legacy(self):
+        for text in self.SAMPLES:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    as_tuples(text_to_text_nodes(text)),
+                    as_tuples(text_to_text_nodes_legacy(text)),
+                )
+
+    def test_same_errors_as_legacy(self):
+        for text in self.ERROR_SAMPLES:
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(ValueError, "No matching closing"):
+                    _ = text_to_text_nodes_legacy(text)
+                with self.assertRaisesRegex(ValueError, "No matching closing"):
+                    _ = text_to_text_nodes(text)
+
+    def test_legacy_flag(self):
+        text = "![a](/b) and [a](/b)"
+        self.assertEqual(
+            as_tuples(text_to_text_nodes(text, legacy=True)),
+            as_tuples(text_to_text_nodes_legacy(text)),
+        )
+
+    def test_image_and_link_with_same_markdown(self):
+        self.assertEqual(
+            as_tuples(text_to_text_nodes("![a](/b) and [a](/b)")),
+            [
+                ("a", TextType.IMAGE, "/b"),
+                (" and ", TextType.TEXT, None),
+                ("a", TextType.LINK, "/b"),
+            ],
+        )
+
+    def test_many_links(self):
+        text = " ".join(f"[link {i}](/page/{i})" for i in range(2000))
+        nodes = text_to_text_nodes(text)
+        self.assertEqual(len(nodes), 3999)
+        self.assertEqual(
+            as_tuples(nodes[-1:]), [("link 1999", TextType.LINK, "/page/1999")]
+        )
+
+
 if __name__ == "__main__":
     _: unittest.TestProgram = unittest.main()
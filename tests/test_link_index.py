@@ -0,0 +1,131 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from gen_content import collect_page_jobs, generate_pages
+from link_index import LinkIndex, attribute_urls
+from manifest import BuildManifest
+
+TEMPLATE = '<link href="/index.css" rel="stylesheet" /><main>{{ Content }}</main>'
+
+
+class TestLinkIndex(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.path = self.root.joinpath(".build", "links.json")
+        self.index = LinkIndex(self.path, self.out, "/site/")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_attribute_urls(self):
+        self.assertEqual(
+            attribute_urls('<a href="/a?x=1&amp;y=2">a</a><img src="b.png" alt="">'),
+            ["/a?x=1&y=2", "b.png"],
+        )
+
+    def test_target(self):
+        page = "blog/tom/index.html"
+        self.assertEqual(self.index.target(page, "/site/"), "index.html")
+        self.assertEqual(self.index.target(page, "/site/blog/a%20b#x"), "blog/a b")
+        self.assertEqual(
+            self.index.target(page, "../majesty/"), "blog/majesty/index.html"
+        )
+        self.assertEqual(self.index.target(page, "/elsewhere/"), "/elsewhere/")
+        self.assertIsNone(self.index.target(page, "https://example.com/"))
+        self.assertIsNone(self.index.target(page, "mailto:a@example.com"))
+        self.assertIsNone(self.index.target(page, "#top"))
+
+    def test_targets(self):
+        page = self.out.joinpath("blog", "index.html")
+        self.index.record(
+            page,
+            '<a href="/site/">home</a><a href="tom/">tom</a>'
+            + '<a href="/elsewhere/">x</a><a href="https://example.com/">y</a>',
+        )
+        self.assertEqual(
+            self.index.targets(page), ["index.html", "blog/tom/index.html"]
+        )
+
+    def test_broken(self):
+        for name in ("index.html", "blog/tom/index.html", "index.css"):
+            self.index.add_output(self.out.joinpath(name))
+        self.index.record(
+            self.out.joinpath("index.html"),
+            '<a href="/site/blog/tom">t</a><a href="/site/blog/gone">g</a>'
+            + '<img src="/site/index.css"><a href="/other/">o</a>',
+        )
+        self.assertEqual(
+            self.index.broken(), {"index.html": ["/site/blog/gone", "/other/"]}
+        )
+        self.assertEqual(self.index.checked(), 4)
+
+    def test_links_of_removed_pages_are_dropped(self):
+        self.index.add_output(self.out.joinpath("index.html"))
+        self.index.record(self.out.joinpath("old.html"), '<a href="/site/x">x</a>')
+        self.assertEqual(self.index.broken(), {})
+        self.index.save()
+        self.assertEqual(LinkIndex(self.path, self.out).links, {})
+
+
+class TestGenerateLinks(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.joinpath("blog").mkdir(parents=True)
+        _ = self.content.joinpath("index.md").write_text(
+            "# Home\n\n[post](/blog/post) and [gone](/blog/gone)"
+        )
+        _ = self.content.joinpath("blog", "post.md").write_text(
+            "# Post\n\n![img](/images/a.png)"
+        )
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text(TEMPLATE)
+        self.out = self.root.joinpath("docs")
+        self.build_dir = self.root.joinpath(".build")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def build(self, **kwargs: int) -> dict[str, list[str]]:
+        manifest = BuildManifest(self.build_dir.joinpath("manifest.json"))
+        links = LinkIndex(self.build_dir.joinpath("links.json"), self.out, "/site/")
+        links.add_output(self.out.joinpath("index.css"))
+        generate_pages(
+            collect_page_jobs(self.content, self.out),
+            self.template,
+            "/site/",
+            manifest,
+            links=links,
+            **kwargs,
+        )
+        manifest.save()
+        links.save()
+        return links.broken()
+
+    def test_reports_broken_links_per_page(self):
+        expected = {
+            "blog/post.html": ["/site/images/a.png"],
+            "index.html": ["/site/blog/gone"],
+        }
+        self.assertEqual(self.build(), expected)
+        # Unchanged pages are skipped but keep their links
+        self.assertEqual(self.build(), expected)
+
+    def test_streamed_and_pipelined_pages(self):
+        streamed = self.build(stream_threshold=0)
+        self.out.joinpath("index.html").unlink()
+        self.assertEqual(self.build(pipeline_depth=2), streamed)
+        self.assertEqual(len(streamed), 2)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
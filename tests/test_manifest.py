@@ -0,0 +1,124 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from gen_content import generate_pages_recursive
+from manifest import BuildManifest, file_digest
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestBuildManifest(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.joinpath("blog").mkdir(parents=True)
+        self.content.joinpath("index.md").write_text("# Home\n\nWelcome")
+        self.content.joinpath("blog", "post.md").write_text("# Post\n\nText")
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text(TEMPLATE)
+        self.out = self.root.joinpath("out")
+        self.manifest_path = self.root.joinpath(".build", "manifest.json")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def build(self) -> BuildManifest:
+        manifest = BuildManifest(self.manifest_path)
+        generate_pages_recursive(
+            self.content, self.template, self.out, "/", manifest=manifest
+        )
+        _ = manifest.prune_pages(self.out)
+        manifest.save()
+        return manifest
+
+    def test_digest_matches_file_digest(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(manifest.digest(self.template), file_digest(self.template))
+
+    def test_manifest_round_trip(self):
+        _ = self.build()
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(len(manifest.pages), 2)
+
+    def test_unchanged_pages_are_current(self):
+        _ = self.build()
+        manifest = BuildManifest(self.manifest_path)
+        self.assertTrue(
+            manifest.is_page_current(
+                self.content.joinpath("index.md"),
+                self.template,
+                self.out.joinpath("index.html"),
+                "/",
+            )
+        )
+
+    def test_unchanged_pages_are_not_rewritten(self):
+        _ = self.build()
+        page = self.out.joinpath("blog", "post.html")
+        page.write_text("tampered")
+        _ = self.build()
+        self.assertIn("<main>", page.read_text())
+
+        mtime = page.stat().st_mtime_ns
+        _ = self.build()
+        self.assertEqual(page.stat().st_mtime_ns, mtime)
+
+    def test_changed_source_is_rebuilt(self):
+        _ = self.build()
+        _ = self.content.joinpath("index.md").write_text("# Home\n\nChanged text")
+        _ = self.build()
+        self.assertIn("Changed text", self.out.joinpath("index.html").read_text())
+
+    def test_changed_template_rebuilds_all_pages(self):
+        _ = self.build()
+        _ = self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(
+            manifest.is_page_current(
+                self.content.joinpath("blog", "post.md"),
+                self.template,
+                self.out.joinpath("blog", "post.html"),
+                "/",
+            )
+        )
+
+    def test_changed_basepath_is_not_current(self):
+        _ = self.build()
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(
+            manifest.is_page_current(
+                self.content.joinpath("index.md"),
+                self.template,
+                self.out.joinpath("index.html"),
+                "/docs/",
+            )
+        )
+
+    def test_minify_is_not_current(self):
+        _ = self.build()
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(
+            manifest.is_page_current(
+                self.content.joinpath("index.md"),
+                self.template,
+                self.out.joinpath("index.html"),
+                "/",
+                minify=True,
+            )
+        )
+
+    def test_removed_source_deletes_output(self):
+        _ = self.build()
+        self.content.joinpath("blog", "post.md").unlink()
+        manifest = self.build()
+        self.assertFalse(self.out.joinpath("blog").exists())
+        self.assertEqual(len(manifest.pages), 1)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from manifest import file_digest
+from minify import CssMinifier, minify_css, minify_segments
+
+
+class TestMinifySegments(unittest.TestCase):
+    def test_drops_whitespace_between_block_tags(self):
+        self.assertEqual(
+            minify_segments(["<html>\n  <head>\n  <title>", "</title>\n</head>\n"]),
+            ["<html><head><title>", "</title></head>"],
+        )
+
+    def test_keeps_one_space_between_inline_tags(self):
+        self.assertEqual(
+            minify_segments(["<p><b>a</b>\n   <i>b</i>  text</p>"]),
+            ["<p><b>a</b> <i>b</i> text</p>"],
+        )
+
+    def test_keeps_space_next_to_slots(self):
+        self.assertEqual(
+            minify_segments(["<p>Hi ", " there</p>"]), ["<p>Hi ", " there</p>"]
+        )
+
+    def test_drops_comments(self):
+        self.assertEqual(
+            minify_segments(["<div><!-- note -->\n<!--[if IE]>x<![endif]--></div>"]),
+            ["<div><!--[if IE]>x<![endif]--></div>"],
+        )
+
+    def test_keeps_preformatted_content(self):
+        self.assertEqual(
+            minify_segments(["<div>\n<pre>  a <!-- b -->\n", "  </pre>\n<p> c</p>"]),
+            ["<div><pre>  a <!-- b -->\n", "  </pre><p>c</p>"],
+        )
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_drops_comments_and_whitespace(self):
+        css = "/* theme */\nbody {\n    color: #fff;\n    margin: 0 auto;\n}\n\n"
+        css += "h1,\nh2 > a {\n    top: 0;\n}\n"
+        self.assertEqual(
+            minify_css(css), "body{color:#fff;margin:0 auto}h1,h2>a{top:0}"
+        )
+
+    def test_keeps_strings_and_license_comments(self):
+        css = '/*! MIT */\na::before { content: "  ;  }  /* x */"; }'
+        self.assertEqual(
+            minify_css(css), '/*! MIT */ a::before{content:"  ;  }  /* x */"}'
+        )
+
+    def test_keeps_significant_spaces(self):
+        self.assertEqual(
+            minify_css(".a :hover { width: calc(1px + 2px); }"),
+            ".a :hover{width:calc(1px + 2px)}",
+        )
+
+
+class TestCssMinifier(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.minifier = CssMinifier(self.root.joinpath("cache"))
+        self.source = self.root.joinpath("index.css")
+        _ = self.source.write_text("body {\n    margin: 0;\n}\n")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_minifies_into_cache(self):
+        minified = self.minifier.prepare([self.source], file_digest)
+        self.assertEqual(minified[self.source].read_text(), "body{margin:0}")
+        self.assertEqual(
+            self.minifier.summary(), "1 minified, 0 cached, 10 bytes saved (41.7%)"
+        )
+
+    def test_reuses_cached_files(self):
+        _ = self.minifier.prepare([self.source], file_digest)
+        minifier = CssMinifier(self.root.joinpath("cache"))
+        _ = minifier.prepare([self.source], file_digest)
+        self.assertEqual((minifier.sizes, minifier.cached), ({}, 1))
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
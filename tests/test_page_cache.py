@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+from unittest import mock
+
+from gen_content import collect_page_jobs, generate_pages, render_body
+from page_cache import PageCache
+from template import BASEPATH_MARKER
+
+
+class TestPageCache(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = PageCache(self.root.joinpath("pages"))
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("abc"))
+        self.cache.put("abc", "Title", ["<p>", "x</p>"])
+        self.assertEqual(self.cache.get("abc"), ("Title", ["<p>", "x</p>"]))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_parser_version_is_part_of_key(self):
+        self.cache.put("abc", "Title", ["body"])
+        with mock.patch("page_cache.PARSER_VERSION", "next"):
+            self.assertIsNone(self.cache.get("abc"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.put("abc", "Title", ["body"])
+        for entry in self.root.joinpath("pages").rglob("*.json"):
+            _ = entry.write_text("{")
+        self.assertIsNone(self.cache.get("abc"))
+
+    def test_prune_keeps_current_sources(self):
+        self.cache.put("old", "Old", ["body"])
+        self.cache.put("new", "New", ["body"])
+        self.assertEqual(self.cache.prune(["new", "missing"]), 1)
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual(self.cache.get("new"), ("New", ["body"]))
+        self.assertEqual(self.cache.prune([]), 1)
+        self.assertEqual(list(self.root.joinpath("pages").iterdir()), [])
+
+    def test_render_body_splits_at_basepath(self):
+        source = self.root.joinpath("page.md")
+        _ = source.write_text("# T\n\n[home](/) and [out](https://x.y) ![i](/a.png)")
+        title, fragments = render_body(source)
+        self.assertEqual(title, "T")
+        self.assertEqual(len(fragments), 3)
+        self.assertNotIn(BASEPATH_MARKER, "".join(fragments))
+        self.assertIn('<a href="/site/">home</a>', "/site/".join(fragments))
+        self.assertIn('src="/site/a.png"', "/site/".join(fragments))
+
+    def test_nul_in_source_does_not_break_body(self):
+        source = self.root.joinpath("page.md")
+        _ = source.write_text("# T\n\nbad \x00 byte [home](/)")
+        _, fragments = render_body(source)
+        self.assertEqual(len(fragments), 2)
+
+
+class TestCachedGeneration(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.mkdir()
+        _ = self.content.joinpath("a.md").write_text("# A\n\n[home](/)")
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.out = self.root.joinpath("out")
+        self.cache = PageCache(self.root.joinpath("pages"))
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def generate(self, basepath: str) -> str:
+        jobs = collect_page_jobs(self.content, self.out)
+        generate_pages(jobs, self.template, basepath, cache=self.cache)
+        return self.out.joinpath("a.html").read_text()
+
+    def test_template_and_basepath_change_reuse_body(self):
+        _ = self.generate("/")
+        _ = self.template.write_text("<h1>{{ Title }}</h1><main>{{ Content }}</main>")
+        with mock.patch("gen_content.parse_page", side_effect=AssertionError):
+            html = self.generate("/site/")
+        self.assertTrue(html.startswith("<h1>A</h1><main><div>"))
+        self.assertIn('<a href="/site/">home</a>', html)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_changed_source_is_parsed_again(self):
+        _ = self.generate("/")
+        _ = self.content.joinpath("a.md").write_text("# A\n\nchanged")
+        self.assertIn("changed", self.generate("/"))
+        self.assertEqual(self.cache.misses, 2)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from gen_content import collect_page_jobs, generate_pages
+from manifest import BuildManifest
+from page_index import PageIndex, first_paragraph, iso_time
+
+BODY: str = (
+    '<div><h1>Tom</h1><p><a href="/">&lt; Back Home</a></p>'
+    + '<p><img src="/tom.png" alt="Tom" /></p>'
+    + "<p>Old <b>Tom</b> Bombadil,\na merry &amp; fellow.</p><p>Second</p></div>"
+)
+
+
+class TestFirstParagraph(unittest.TestCase):
+    def test_skips_link_and_image_paragraphs(self):
+        self.assertEqual(first_paragraph(BODY), "Old Tom Bombadil, a merry & fellow.")
+
+    def test_no_paragraph(self):
+        self.assertEqual(first_paragraph("<div><h1>Tom</h1></div>"), "")
+
+    def test_iso_time(self):
+        self.assertEqual(iso_time(1_700_000_000.5), "2023-11-14T22:13:20+00:00")
+
+
+class TestPageIndex(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.path = self.root.joinpath(".build", "metadata.json")
+        self.index = PageIndex(self.path, self.out)
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def add(self, name: str, title: str, body: str, mtime: int) -> None:
+        source = self.root.joinpath(name.replace("/", "_") + ".md")
+        _ = source.write_text(title)
+        os.utime(source, (mtime, mtime))
+        page = self.out.joinpath(name)
+        self.index.add_page(page)
+        self.index.record(page, source, title, body)
+
+    def test_tap_matches_record(self):
+        source = self.root.joinpath("tom.md")
+        _ = source.write_text("# Tom")
+        page = self.out.joinpath("tom.html")
+        chunks = [BODY[start : start + 3] for start in range(0, len(BODY), 3)]
+        tapped_chunks = list(self.index.tap(page, source, "Tom", iter(chunks)))
+        self.assertEqual(tapped_chunks, chunks)
+        tapped = self.index.entries["tom.html"]
+        self.index.record(page, source, "Tom", BODY)
+        self.assertEqual(self.index.entries["tom.html"], tapped)
+        self.assertEqual(tapped["summary"], "Old Tom Bombadil, a merry & fellow.")
+
+    def test_sitemap(self):
+        self.add("index.html", "Home", "<p>Home</p>", 1_700_000_000)
+        self.add("blog/tom/index.html", "Tom", "<p>Tom</p>", 1_700_000_060)
+        self.assertEqual(
+            "".join(self.index.iter_sitemap("https://example.com", "/site/")),
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            + '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            + "<url><loc>https://example.com/site/blog/tom/</loc>"
+            + "<lastmod>2023-11-14T22:14:20+00:00</lastmod></url>\n"
+            + "<url><loc>https://example.com/site/</loc>"
+            + "<lastmod>2023-11-14T22:13:20+00:00</lastmod></url>\n"
+            + "</urlset>\n",
+        )
+
+    def test_feed(self):
+        self.assertFalse(self.index.has_section("blog"))
+        self.add("index.html", "Fans & Co", "<p>Home</p>", 1_700_000_000)
+        self.add("blog/index.html", "Blog", "<p>All posts</p>", 1_700_000_900)
+        self.assertFalse(self.index.has_section("blog"))
+        self.add("blog/old/index.html", "Old", "<p>Old <i>post</i></p>", 1_700_000_000)
+        self.add("blog/new/index.html", "New", "<p>New &lt;post&gt;</p>", 1_700_000_060)
+        self.assertTrue(self.index.has_section("blog"))
+        self.assertEqual(
+            "".join(self.index.iter_feed("https://example.com", "/", "blog")),
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            + '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+            + "<title>Fans &amp; Co</title>\n"
+            + "<id>https://example.com/blog/</id>\n"
+            + '<link href="https://example.com/blog/feed.xml" rel="self"/>\n'
+            + '<link href="https://example.com/blog/"/>\n'
+            + "<updated>2023-11-14T22:14:20+00:00</updated>\n"
+            + "<author><name>Fans &amp; Co</name></author>\n"
+            + '<entry><title>New</title><link href="https://example.com/blog/new/"/>'
+            + "<id>https://example.com/blog/new/</id>"
+            + "<updated>2023-11-14T22:14:20+00:00</updated>"
+            + "<summary>New &lt;post&gt;</summary></entry>\n"
+            + '<entry><title>Old</title><link href="https://example.com/blog/old/"/>'
+            + "<id>https://example.com/blog/old/</id>"
+            + "<updated>2023-11-14T22:13:20+00:00</updated>"
+            + "<summary>Old post</summary></entry>\n"
+            + "</feed>\n",
+        )
+
+    def test_save_keeps_current_pages(self):
+        self.add("a.html", "A", "<p>a</p>", 1_700_000_000)
+        self.add("b.html", "B", "<p>b</p>", 1_700_000_000)
+        self.index.pages.discard("b.html")
+        self.index.save()
+        self.assertEqual(list(PageIndex(self.path, self.out).entries), ["a.html"])
+
+
+class TestGeneratePageIndex(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.joinpath("blog").mkdir(parents=True)
+        _ = self.content.joinpath("index.md").write_text("# Home\n\n[Tom](/blog/tom)")
+        self.post = self.content.joinpath("blog", "tom.md")
+        _ = self.post.write_text("# Tom\n\n[< Back](/)\n\nOld Tom Bombadil")
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.out = self.root.joinpath("docs")
+        self.build_dir = self.root.joinpath(".build")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def build(self, **kwargs: int) -> PageIndex:
+        manifest = BuildManifest(self.build_dir.joinpath("manifest.json"))
+        page_index = PageIndex(self.build_dir.joinpath("metadata.json"), self.out)
+        generate_pages(
+            collect_page_jobs(self.content, self.out),
+            self.template,
+            "/",
+            manifest,
+            page_index=page_index,
+            **kwargs,
+        )
+        manifest.save()
+        page_index.save()
+        return page_index
+
+    def test_only_changed_pages_are_recorded(self):
+        first = self.build()
+        self.assertEqual(first.recorded, 2)
+        self.assertEqual(first.entries["blog/tom.html"]["summary"], "Old Tom Bombadil")
+        _ = self.post.write_text("# Tom\n\nYoung Tom")
+        os.utime(self.post, (1_700_000_000, 1_700_000_000))
+        second = self.build()
+        self.assertEqual(second.recorded, 1)
+        self.assertEqual(second.entries["index.html"], first.entries["index.html"])
+        self.assertEqual(
+            second.entries["blog/tom.html"],
+            {"title": "Tom", "mtime": 1_700_000_000, "summary": "Young Tom"},
+        )
+
+    def test_streamed_pages(self):
+        expected = self.build().entries
+        self.build_dir.joinpath("metadata.json").unlink()
+        self.assertEqual(self.build(stream_threshold=0).entries, expected)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
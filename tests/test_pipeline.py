@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_items_flow_through_in_order(self):
+        written: list[tuple[int, str]] = []
+        errors = run_pipeline(
+            range(10),
+            lambda item: item * 2,
+            lambda item, data: f"{item}:{data}",
+            lambda item, output: written.append((item, output)),
+            depth=2,
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(written, [(item, f"{item}:{item * 2}") for item in range(10)])
+
+    def test_failures_skip_later_stages(self):
+        written: list[int] = []
+
+        def read(item: int) -> int:
+            if item == 1:
+                raise ValueError("unreadable")
+            return item
+
+        def render(item: int, data: int) -> int:
+            if item == 2:
+                raise ValueError("unrenderable")
+            return data
+
+        def write(item: int, output: int) -> None:
+            if item == 3:
+                raise OSError("unwritable")
+            written.append(output)
+
+        errors = run_pipeline(range(5), read, render, write)
+        self.assertEqual(written, [0, 4])
+        self.assertEqual(
+            [(item, str(error)) for item, error in errors],
+            [(1, "unreadable"), (2, "unrenderable"), (3, "unwritable")],
+        )
+
+    def test_programming_errors_are_raised(self):
+        def render(item: int, data: int) -> int:
+            raise TypeError("bug")
+
+        with self.assertRaisesRegex(TypeError, "bug"):
+            _ = run_pipeline(range(5), lambda item: item, render, lambda *_: None)
+
+    def test_stages_overlap(self):
+        # The first item can only finish rendering once the second was read.
+        second_read = threading.Event()
+
+        def read(item: int) -> int:
+            if item == 1:
+                second_read.set()
+            return item
+
+        def render(item: int, data: int) -> bool:
+            return item != 0 or second_read.wait(timeout=5)
+
+        rendered: list[bool] = []
+        _ = run_pipeline(range(2), read, render, lambda _, ok: rendered.append(ok))
+        self.assertEqual(rendered, [True, True])
+
+    def test_reads_are_bounded_by_depth(self):
+        read: list[int] = []
+        release = threading.Event()
+        reads_when_blocked: list[int] = []
+
+        def render(item: int, data: int) -> int:
+            if item == 0:
+                _ = release.wait(timeout=0.2)
+                reads_when_blocked.append(len(read))
+            return data
+
+        _ = run_pipeline(
+            range(20), lambda item: read.append(item), render, lambda *_: None, depth=2
+        )
+        # One item rendering, two queued and one read waiting for queue space.
+        self.assertLessEqual(reads_when_blocked[0], 4)
+
+    def test_invalid_depth(self):
+        with self.assertRaises(ValueError):
+            _ = run_pipeline([], lambda _: None, lambda *_: None, lambda *_: None, 0)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
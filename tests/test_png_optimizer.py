@@ -0,0 +1,126 @@
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from typing import override
+
+from manifest import file_digest
+from png_optimizer import (
+    PNG_SIGNATURE,
+    PngOptimizer,
+    optimize_png,
+    read_chunks,
+    write_chunk,
+)
+from static_sync import sync_static
+
+# 16x16 RGB, filter type 0 on every row
+RAW = b"".join(
+    b"\x00" + b"".join(bytes((x * 16, y * 16, 128)) for x in range(16))
+    for y in range(16)
+)
+
+
+def make_png(*extra: tuple[bytes, bytes]) -> bytes:
+    ihdr = (16).to_bytes(4) + (16).to_bytes(4) + bytes((8, 2, 0, 0, 0))
+    image_data = zlib.compress(RAW, 0)
+    middle = len(image_data) // 2
+    chunks = [
+        (b"IHDR", ihdr),
+        (b"tEXt", b"Comment\x00made by a test"),
+        *extra,
+        (b"IDAT", image_data[:middle]),
+        (b"IDAT", image_data[middle:]),
+        (b"tIME", bytes(7)),
+        (b"IEND", b""),
+    ]
+    return PNG_SIGNATURE + b"".join(write_chunk(*chunk) for chunk in chunks)
+
+
+class TestOptimizePng(unittest.TestCase):
+    def test_lossless_and_smaller(self):
+        data = make_png(
+            (b"sRGB", b"\x00"), (b"cICP", bytes((1, 13, 0, 1))), (b"tRNS", bytes(6))
+        )
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        chunks = read_chunks(optimized)
+        self.assertEqual(
+            [chunk_type for chunk_type, _ in chunks],
+            [b"IHDR", b"sRGB", b"cICP", b"tRNS", b"IDAT", b"IEND"],
+        )
+        self.assertEqual(zlib.decompress(chunks[4][1]), RAW)
+        self.assertEqual(chunks[0], read_chunks(data)[0])
+
+    def test_animated_png_is_untouched(self):
+        data = make_png((b"acTL", bytes(8)))
+        self.assertIs(optimize_png(data), data)
+
+    def test_invalid_png(self):
+        with self.assertRaisesRegex(ValueError, "Not a PNG"):
+            _ = optimize_png(b"GIF89a")
+        corrupt = bytearray(make_png())
+        corrupt[20] ^= 0xFF
+        with self.assertRaisesRegex(ValueError, "Corrupt"):
+            _ = optimize_png(bytes(corrupt))
+
+    def test_truncated_png(self):
+        data = make_png()
+        for size in (len(PNG_SIGNATURE) + 10, len(data) - 20, len(data) - 2):
+            with self.assertRaisesRegex(ValueError, "Truncated"):
+                _ = read_chunks(data[:size])
+
+
+class TestPngOptimizer(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root.joinpath("static")
+        self.static.mkdir()
+        self.image = self.static.joinpath("a.png")
+        _ = self.image.write_bytes(make_png())
+        self.optimizer = PngOptimizer(self.root.joinpath("cache"), workers=2)
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_results_are_cached_by_content(self):
+        optimized = self.optimizer.prepare([self.image], file_digest)
+        self.assertEqual(optimized[self.image].read_bytes(), optimize_png(make_png()))
+        self.assertEqual(list(self.optimizer.sizes), [self.image])
+
+        copy = self.static.joinpath("b.png")
+        _ = copy.write_bytes(make_png())
+        again = PngOptimizer(self.optimizer.directory)
+        self.assertEqual(
+            again.prepare([copy], file_digest), {copy: optimized[self.image]}
+        )
+        self.assertEqual((again.sizes, again.cached), ({}, 1))
+
+    def test_broken_image_is_kept(self):
+        _ = self.image.write_bytes(b"\x89PNG broken")
+        optimized = self.optimizer.prepare([self.image], file_digest)
+        self.assertEqual(optimized[self.image].read_bytes(), b"\x89PNG broken")
+
+    def test_truncated_image_is_kept(self):
+        truncated = make_png()[:-20]
+        _ = self.image.write_bytes(truncated)
+        optimized = self.optimizer.prepare([self.image], file_digest)
+        self.assertEqual(optimized[self.image].read_bytes(), truncated)
+
+    def test_sync_copies_optimized_images(self):
+        _ = self.static.joinpath("index.css").write_text("body {}")
+        out = self.root.joinpath("out")
+        result = sync_static(self.static, out, optimizer=self.optimizer)
+        self.assertEqual(len(result.copied), 2)
+        self.assertEqual(out.joinpath("a.png").read_bytes(), optimize_png(make_png()))
+        self.assertEqual(out.joinpath("index.css").read_text(), "body {}")
+
+        result = sync_static(self.static, out, optimizer=self.optimizer)
+        self.assertEqual((result.copied, result.unchanged), ([], 2))
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
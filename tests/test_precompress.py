@@ -0,0 +1,116 @@
+import gzip
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from manifest import BuildManifest
+from precompress import MIN_SIZE, Encoding, compress_file, precompress, zstd
+
+HTML: str = "<p>" + "hello world " * 100 + "</p>"
+
+
+class TestPrecompress(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.manifest = BuildManifest(self.root.joinpath(".build", "manifest.json"))
+        self.page = self.out.joinpath("blog", "index.html")
+        self.page.parent.mkdir(parents=True)
+        _ = self.page.write_text(HTML)
+        os.utime(self.page, ns=(0, 1_000_000_000))
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_writes_gzip_sidecars(self):
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        sidecar = self.out.joinpath("blog", "index.html.gz")
+        self.assertEqual(result.written, [sidecar])
+        self.assertEqual(result.added, [sidecar])
+        self.assertEqual(gzip.decompress(sidecar.read_bytes()).decode(), HTML)
+        self.assertEqual(sidecar.stat().st_mtime_ns, 1_000_000_000)
+
+    def test_gzip_output_is_reproducible(self):
+        first = self.out.joinpath("first.gz")
+        second = self.out.joinpath("second.gz")
+        compress_file(self.page, first, Encoding.GZIP)
+        compress_file(self.page, second, Encoding.GZIP)
+        self.assertEqual(first.read_bytes(), second.read_bytes())
+
+    def test_skips_unchanged_outputs(self):
+        _ = precompress(self.out, [Encoding.GZIP], self.manifest)
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.assertEqual((result.written, result.unchanged), ([], 1))
+        _ = self.page.write_text(HTML + "<p>more</p>")
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.assertEqual(result.written, [self.out.joinpath("blog", "index.html.gz")])
+        self.assertEqual(result.added, [])
+
+    def test_skips_small_and_binary_outputs(self):
+        _ = self.out.joinpath("small.css").write_text("a" * (MIN_SIZE - 1))
+        _ = self.out.joinpath("image.png").write_bytes(b"\x89PNG" * MIN_SIZE)
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.assertEqual(len(result.written), 1)
+        self.assertFalse(self.out.joinpath("small.css.gz").exists())
+        self.assertFalse(self.out.joinpath("image.png.gz").exists())
+
+    def test_removes_stale_sidecars(self):
+        _ = precompress(self.out, [Encoding.GZIP], self.manifest)
+        sidecar = self.out.joinpath("blog", "index.html.gz")
+        result = precompress(self.out, [], self.manifest)
+        self.assertEqual(result.removed, [sidecar])
+        _ = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.page.unlink()
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.assertEqual(result.removed, [sidecar])
+        self.assertFalse(sidecar.exists())
+
+    def test_keeps_other_compressed_files(self):
+        archive = self.out.joinpath("site.tar.gz")
+        _ = archive.write_bytes(b"archive")
+        result = precompress(self.out, [], self.manifest)
+        self.assertEqual(result.removed, [])
+        self.assertTrue(archive.is_file())
+
+    def test_never_touches_static_files(self):
+        data = self.out.joinpath("data.json")
+        _ = data.write_text("[]" * MIN_SIZE)
+        archive = self.out.joinpath("data.json.gz")
+        _ = archive.write_bytes(b"shipped as is")
+        self.manifest.assets = {str(data): "static/data.json"}
+        self.manifest.assets[str(archive)] = "static/data.json.gz"
+        result = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.assertEqual(result.written, [self.out.joinpath("blog", "index.html.gz")])
+        result = precompress(self.out, [], self.manifest)
+        self.assertEqual(result.removed, [self.out.joinpath("blog", "index.html.gz")])
+        self.assertEqual(archive.read_bytes(), b"shipped as is")
+
+    def test_keeps_unrecorded_sidecars(self):
+        sidecar = self.out.joinpath("blog", "index.html.gz")
+        _ = sidecar.write_bytes(b"not ours")
+        result = precompress(self.out, [], self.manifest)
+        self.assertEqual(result.removed, [])
+        self.assertTrue(sidecar.is_file())
+
+    def test_sidecars_are_saved_in_the_manifest(self):
+        _ = precompress(self.out, [Encoding.GZIP], self.manifest)
+        self.manifest.save()
+        manifest = BuildManifest(self.manifest.path)
+        result = precompress(self.out, [], manifest)
+        self.assertEqual(result.removed, [self.out.joinpath("blog", "index.html.gz")])
+
+    @unittest.skipIf(zstd is None, "compression.zstd needs Python 3.14")
+    def test_writes_zstd_sidecars(self):
+        _ = precompress(self.out, [Encoding.GZIP, Encoding.ZSTD], self.manifest)
+        sidecar = self.out.joinpath("blog", "index.html.zst")
+        assert zstd is not None
+        self.assertEqual(zstd.decompress(sidecar.read_bytes()).decode(), HTML)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,85 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from gen_content import collect_page_jobs, generate_pages
+from profiling import Profiler, span
+
+PAGE_STAGES = {"read", "title", "blocks", "inline", "serialize", "template", "write"}
+
+
+class TestProfiler(unittest.TestCase):
+    def test_span_records_stage_and_page(self):
+        profiler = Profiler()
+        with profiler.span("read", "index.md"):
+            pass
+        self.assertEqual(len(profiler.spans), 1)
+        stage, page, start, end, _, _ = profiler.spans[0]
+        self.assertEqual((stage, page), ("read", "index.md"))
+        self.assertLessEqual(start, end)
+
+    def test_span_recorded_on_error(self):
+        profiler = Profiler()
+        with self.assertRaises(ValueError), profiler.span("title", "a.md"):
+            raise ValueError("No title found")
+        self.assertEqual(len(profiler.spans), 1)
+
+    def test_span_helper_without_profiler(self):
+        with span(None, "read"):
+            pass
+
+    def test_summary(self):
+        profiler = Profiler()
+        with profiler.span("read", "a.md"):
+            pass
+        with profiler.span("static"):
+            pass
+        summary = profiler.summary()
+        self.assertIn("read", summary)
+        self.assertIn("static", summary)
+        self.assertIn("a.md", summary)
+
+    def test_chrome_trace(self):
+        profiler = Profiler()
+        with profiler.span("blocks", "/content/a.md"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = Path(tmp, "trace.json")
+            profiler.write_chrome_trace(trace_path)
+            trace = json.loads(trace_path.read_text())
+        event = trace["traceEvents"][0]
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["cat"], "blocks")
+        self.assertEqual(event["name"], "blocks a.md")
+        self.assertEqual(event["args"], {"page": "/content/a.md"})
+
+
+class TestProfiledBuild(unittest.TestCase):
+    def test_every_page_stage_is_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            content = root.joinpath("content")
+            content.mkdir()
+            for name in ("a", "b"):
+                _ = content.joinpath(f"{name}.md").write_text(f"# {name}\n\ntext")
+            template = root.joinpath("template.html")
+            _ = template.write_text("{{ Title }}{{ Content }}")
+            jobs = collect_page_jobs(content, root.joinpath("out"))
+            for workers in (1, 2):
+                with self.subTest(workers=workers):
+                    profiler = Profiler()
+                    generate_pages(
+                        jobs, template, "/", workers=workers, profiler=profiler
+                    )
+                    for page in ("a.md", "b.md"):
+                        stages = {
+                            stage
+                            for stage, path, *_ in profiler.spans
+                            if path.endswith(page)
+                        }
+                        self.assertEqual(stages, PAGE_STAGES)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
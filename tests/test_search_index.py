@@ -0,0 +1,160 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from gen_content import collect_page_jobs, generate_pages
+from manifest import BuildManifest
+from search_index import TITLE_WEIGHT, SearchIndex, html_terms, page_url, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(
+            list(tokenize("The Lord of the Rings, 3rd Age: Eä!")),
+            ["lord", "rings", "3rd", "age", "eä"],
+        )
+
+    def test_html_terms(self):
+        self.assertEqual(
+            html_terms('<p>Tom &amp; <a href="/tom">Tom</a><b>bo</b>mbadil</p>'),
+            {"tom": 2, "bo": 1, "mbadil": 1},
+        )
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/site/"), "/site/")
+        self.assertEqual(page_url("blog/tom/index.html", "/site/"), "/site/blog/tom/")
+        self.assertEqual(page_url("about.html", "/"), "/about.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.out = self.root.joinpath("docs")
+        self.path = self.root.joinpath(".build", "search.json")
+        self.index = SearchIndex(self.path, self.out)
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def add(self, name: str, title: str, body: str) -> None:
+        page = self.out.joinpath(name)
+        self.index.add_page(page)
+        self.index.record(page, title, body)
+
+    def test_files(self):
+        self.add("index.html", "Home", "<p>Welcome home, hobbit</p>")
+        self.add("blog/index.html", "Hobbits", "<p>Home of hobbits</p>")
+        files = self.index.files("/site/")
+        self.assertEqual(
+            json.loads(files["index.json"]),
+            {
+                "version": 1,
+                "prefix": 2,
+                "shards": ["ho", "we"],
+                "docs": [["/site/blog/", "Hobbits"], ["/site/", "Home"]],
+            },
+        )
+        self.assertEqual(
+            json.loads(files["ho.json"]),
+            {
+                "hobbit": [[1, 1]],
+                "hobbits": [[0, TITLE_WEIGHT + 1]],
+                "home": [[1, TITLE_WEIGHT + 1], [0, 1]],
+            },
+        )
+
+    def test_tap_matches_record(self):
+        chunks = ["<div><p>", "Tom", "<b>", "bom", "</b>", "badil sings", "</p></div>"]
+        page = self.out.joinpath("tom.html")
+        self.index.add_page(page)
+        self.assertEqual(list(self.index.tap(page, "Tom", iter(chunks))), chunks)
+        tapped = self.index.entries["tom.html"]
+        self.index.record(page, "Tom", "".join(chunks))
+        self.assertEqual(self.index.entries["tom.html"], tapped)
+
+    def test_ids_are_stable(self):
+        self.add("b.html", "B", "<p>beta</p>")
+        _ = self.index.files("/")
+        self.index.save()
+        index = SearchIndex(self.path, self.out)
+        for name in ("a.html", "b.html"):
+            index.add_page(self.out.joinpath(name))
+        index.record(self.out.joinpath("a.html"), "A", "<p>alpha</p>")
+        files = index.files("/")
+        self.assertEqual(json.loads(files["be.json"]), {"beta": [[0, 1]]})
+        self.assertEqual(json.loads(files["al.json"]), {"alpha": [[1, 1]]})
+
+    def test_removed_pages_are_dropped(self):
+        self.add("a.html", "A", "<p>alpha</p>")
+        _ = self.index.files("/")
+        self.index.save()
+        index = SearchIndex(self.path, self.out)
+        self.assertEqual(json.loads(index.files("/")["index.json"])["docs"], [])
+
+
+class TestGenerateSearch(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root.joinpath("content")
+        self.content.mkdir()
+        _ = self.content.joinpath("index.md").write_text("# Home\n\nHello **hobbits**")
+        _ = self.content.joinpath("tom.md").write_text("# Tom\n\nOld Tom Bombadil")
+        self.template = self.root.joinpath("template.html")
+        _ = self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.out = self.root.joinpath("docs")
+        self.build_dir = self.root.joinpath(".build")
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def build(self, **kwargs: int) -> SearchIndex:
+        manifest = BuildManifest(self.build_dir.joinpath("manifest.json"))
+        search = SearchIndex(self.build_dir.joinpath("search.json"), self.out)
+        generate_pages(
+            collect_page_jobs(self.content, self.out),
+            self.template,
+            "/",
+            manifest,
+            search=search,
+            **kwargs,
+        )
+        _ = search.files("/")
+        manifest.save()
+        search.save()
+        return search
+
+    def test_unchanged_pages_are_not_tokenized(self):
+        first = self.build()
+        self.assertEqual(first.tokenized, 2)
+        _ = self.content.joinpath("tom.md").write_text("# Tom\n\nOld Tom")
+        second = self.build()
+        self.assertEqual(second.tokenized, 1)
+        self.assertEqual(second.entries["index.html"], first.entries["index.html"])
+        self.assertEqual(
+            second.entries["tom.html"]["terms"], {"tom": 2 + TITLE_WEIGHT, "old": 1}
+        )
+
+    def test_pages_missing_from_the_index_are_rebuilt(self):
+        manifest = BuildManifest(self.build_dir.joinpath("manifest.json"))
+        generate_pages(
+            collect_page_jobs(self.content, self.out), self.template, "/", manifest
+        )
+        manifest.save()
+        self.assertEqual(self.build().tokenized, 2)
+
+    def test_streamed_pages(self):
+        expected = self.build().entries
+        self.build_dir.joinpath("search.json").unlink()
+        self.assertEqual(self.build(stream_threshold=0).entries, expected)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
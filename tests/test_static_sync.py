@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import override
+
+from file_copy import CopyStrategy
+from manifest import BuildManifest
+from static_sync import files_match, sync_static
+
+
+class TestStaticSync(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root.joinpath("static")
+        self.static.joinpath("images").mkdir(parents=True)
+        _ = self.static.joinpath("index.css").write_text("body {}")
+        _ = self.static.joinpath("images", "a.png").write_bytes(b"\x89PNG a")
+        self.out = self.root.joinpath("out")
+        self.manifest = BuildManifest(self.root.joinpath("manifest.json"))
+
+    @override
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_first_sync_copies_everything(self):
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(len(result.copied), 2)
+        self.assertEqual(self.out.joinpath("index.css").read_text(), "body {}")
+
+    def test_strategies_are_reported(self):
+        result = sync_static(
+            self.static, self.out, self.manifest, CopyStrategy.HARDLINK, workers=2
+        )
+        self.assertEqual(result.strategies, {CopyStrategy.HARDLINK: 2})
+        self.assertIn("2 copied (2 hardlink)", result.summary())
+        self.assertTrue(
+            self.out.joinpath("index.css").samefile(self.static.joinpath("index.css"))
+        )
+        result = sync_static(self.static, self.out, self.manifest, CopyStrategy.COPY)
+        self.assertEqual((result.strategies, result.unchanged), ({}, 2))
+
+    def test_second_sync_copies_nothing(self):
+        _ = sync_static(self.static, self.out, self.manifest)
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(result.copied, [])
+        self.assertEqual(result.unchanged, 2)
+
+    def test_changed_file_is_copied(self):
+        _ = sync_static(self.static, self.out, self.manifest)
+        _ = self.static.joinpath("index.css").write_text("body { margin: 0 }")
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(result.copied, [self.out.joinpath("index.css")])
+
+    def test_same_size_different_content_is_copied(self):
+        _ = sync_static(self.static, self.out, self.manifest)
+        css = self.static.joinpath("index.css")
+        _ = css.write_text("html {}")
+        os.utime(css, ns=(0, css.stat().st_mtime_ns + 1_000_000_000))
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(len(result.copied), 1)
+        self.assertEqual(self.out.joinpath("index.css").read_text(), "html {}")
+
+    def test_touched_file_is_hashed_not_copied(self):
+        _ = sync_static(self.static, self.out, self.manifest)
+        css = self.static.joinpath("index.css")
+        os.utime(css, ns=(0, css.stat().st_mtime_ns + 1_000_000_000))
+        self.assertTrue(files_match(css, self.out.joinpath("index.css")))
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(result.copied, [])
+
+    def test_orphans_removed_and_generated_files_kept(self):
+        _ = sync_static(self.static, self.out, self.manifest)
+        _ = self.out.joinpath("index.html").write_text("<p>generated</p>")
+        self.static.joinpath("images", "a.png").unlink()
+        result = sync_static(self.static, self.out, self.manifest)
+        self.assertEqual(result.removed, [self.out.joinpath("images", "a.png")])
+        self.assertTrue(self.out.joinpath("index.html").is_file())
+
+    def test_missing_source_dir_raises(self):
+        with self.assertRaisesRegex(ValueError, "is not a directory"):
+            _ = sync_static(self.root.joinpath("missing"), self.out)
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+from fingerprint import AssetMap
+from template import BASEPATH_MARKER, Template, resolve_url
+
+TEMPLATE = """<head><title>{{ Title }}</title><link href="/index.css" /></head>
+<body><img src="/logo.png" /><a href="https://example.com">x</a>{{ Content }}</body>"""
+
+
+class TestResolveUrl(unittest.TestCase):
+    def test_root_url_gets_basepath(self):
+        self.assertEqual(resolve_url("/blog/tom", "/site/"), "/site/blog/tom")
+
+    def test_root_itself(self):
+        self.assertEqual(resolve_url("/", "/site/"), "/site/")
+
+    def test_external_url_unchanged(self):
+        self.assertEqual(resolve_url("https://boot.dev", "/site/"), "https://boot.dev")
+
+    def test_default_basepath_unchanged(self):
+        self.assertEqual(resolve_url("/images/a.png", "/"), "/images/a.png")
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compiles_segments_and_slots(self):
+        template = Template(TEMPLATE)
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(len(template.segments), 3)
+
+    def test_render(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(template.render("Hi", "<p>x</p>"), "<h1>Hi</h1><p>x</p>")
+
+    def test_basepath_applied_to_template(self):
+        html = Template(TEMPLATE, "/site/").render("T", "")
+        self.assertIn('href="/site/index.css"', html)
+        self.assertIn('src="/site/logo.png"', html)
+        self.assertIn('href="https://example.com"', html)
+
+    def test_basepath_not_applied_to_content(self):
+        html = Template(TEMPLATE, "/site/").render("T", '<code>href="/x"</code>')
+        self.assertIn('<code>href="/x"</code>', html)
+
+    def test_template_without_slots(self):
+        template = Template("<p>static</p>")
+        self.assertEqual(template.render("T", "C"), "<p>static</p>")
+
+    def test_iter_render_streams_content(self):
+        template = Template("<main>{{ Content }}</main>")
+        parts = list(template.iter_render("T", iter(["<p>", "x", "</p>"])))
+        self.assertEqual(parts, ["<main>", "<p>", "x", "</p>", "</main>"])
+
+    def test_iter_render_repeated_content_slot(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        html = "".join(template.iter_render("T", iter(["a", "b"])))
+        self.assertEqual(html, "ab|ab")
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render("T", "C"), "T|T")
+
+    def test_minify_leaves_content_alone(self):
+        template = Template(TEMPLATE, "/site/", minify=True)
+        body = "<pre><code>a\n    b\n</code></pre>\n\n<p>x</p>"
+        self.assertEqual(
+            template.render("T", body),
+            '<head><title>T</title><link href="/site/index.css" /></head>'
+            + '<body><img src="/site/logo.png" /><a href="https://example.com">x</a>'
+            + f"{body}</body>",
+        )
+
+
+class TestResolve(unittest.TestCase):
+    ASSETS = AssetMap({"index.css": "index.abc.css", "logo.png": "logo.def.png"})
+
+    def test_assets_applied_to_template(self):
+        template = Template(TEMPLATE, "/site/", self.ASSETS)
+        html = template.render("T", "")
+        self.assertIn('<link href="/site/index.abc.css" />', html)
+        self.assertIn('<img src="/site/logo.def.png" />', html)
+        self.assertIn('<a href="https://example.com">', html)
+
+    def test_resolve_body(self):
+        fragments = ['<a href="', '">home</a><img src="', 'logo.png">']
+        self.assertEqual(
+            Template("", "/site/").resolve(fragments),
+            '<a href="/site/">home</a><img src="/site/logo.png">',
+        )
+        self.assertEqual(
+            Template("", "/", self.ASSETS).resolve(fragments),
+            '<a href="/">home</a><img src="/logo.def.png">',
+        )
+
+    def test_resolve_chunks(self):
+        chunks = ["<p>", f'<img src="{BASEPATH_MARKER}logo.png">', "</p>"]
+        self.assertEqual(
+            list(Template("", "/s/", self.ASSETS).resolve_chunks(iter(chunks))),
+            ["<p>", '<img src="/s/logo.def.png">', "</p>"],
+        )
+
+
+if __name__ == "__main__":
+    _: unittest.TestProgram = unittest.main()